@@ -0,0 +1,10 @@
+import sys
+
+from .cli import main as batch_main
+from .notes_app import main
+
+# python -m app            -> interactive menu
+# python -m app <command>  -> batch mode (see cli.py)
+if len(sys.argv) > 1:
+    sys.exit(batch_main(sys.argv[1:]))
+main()
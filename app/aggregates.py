@@ -0,0 +1,146 @@
+from __future__ import annotations
+import os
+from collections import Counter
+from typing import Dict, List
+
+from .hooks import NoteHooks
+from .utils import normalize, trace
+
+NotesDict = Dict[str, List[str]]
+
+# Statistics aggregates
+# category_counts / category_note_lengths / category_token_counts /
+# category_word_counts scan every note. NoteStats keeps the same answers as
+# running totals -- notes and characters per category, per category how many
+# notes contain each normalized word, and for the last SUBSTRINGS_MAX
+# substrings asked for (category_word_counts) how many notes contain them --
+# updated by the hooks in time proportional to the one note that changed.
+# Asking then costs one lookup per category (a substring's first time: one
+# scan, which starts its running total).
+#
+# Categories come and go with the notes dict (a move can leave an empty one
+# behind without telling the hooks), so the answers take `notes` for the
+# category list and the totals for the numbers.
+#
+# NOTES_VERIFY_STATS=1 cross-checks every answer against the full scan and
+# warns (and rebuilds) when they disagree -- for tests and debugging.
+
+VERIFY = os.getenv("NOTES_VERIFY_STATS", 0) in ("1", "true", "True")
+SUBSTRINGS_MAX = 64   # substrings whose per-category counts are kept up to date
+
+
+def _words(text: str) -> set[str]:
+    return set(normalize(text).split())
+
+
+class NoteStats(NoteHooks):
+    """Per-category note count, character count and word -> notes table."""
+
+    def __init__(self):
+        self.counts: dict[str, int] = {}
+        self.chars: dict[str, int] = {}
+        self.words: dict[str, Counter] = {}
+        self.substrings: dict[str, Counter] = {}   # lowercased substring -> notes containing it, per category
+
+    @classmethod
+    def build(cls, notes: NotesDict) -> "NoteStats":
+        stats = cls()
+        stats.reloaded(notes)
+        return stats
+
+    # --- answers ------------------------------------------------------------------
+    def note_counts(self, notes: NotesDict) -> dict[str, int]:
+        """category_counts(notes), without reading the notes."""
+        return {cat: self.counts.get(cat, 0) for cat in notes}
+
+    def note_lengths(self, notes: NotesDict) -> dict[str, int]:
+        """category_note_lengths(notes), without reading the notes."""
+        return {cat: self.chars.get(cat, 0) for cat in notes}
+
+    def token_counts(self, notes: NotesDict, word: str) -> dict[str, int]:
+        """category_token_counts(notes, word), without reading the notes."""
+        key = normalize(word)
+        return {cat: self.words[cat][key] if cat in self.words else 0 for cat in notes}
+
+    def substring_counts(self, notes: NotesDict, word: str) -> dict[str, int]:
+        """category_word_counts(notes, word): scanned the first time `word` is
+        asked for, then kept up to date by the hooks (for the last SUBSTRINGS_MAX)."""
+        word = word.lower()
+        table = self.substrings.pop(word, None)
+        if table is None:
+            table = Counter({cat: sum(1 for note in items if word in note.lower()) for cat, items in notes.items()})
+            if len(self.substrings) >= SUBSTRINGS_MAX:
+                del self.substrings[next(iter(self.substrings))]   # the least recently asked
+        self.substrings[word] = table
+        return {cat: table[cat] for cat in notes}
+
+    def verify(self, notes: NotesDict) -> list[str]:
+        """Compare every total with a full scan of `notes`; the categories that differ."""
+        fresh = NoteStats.build(notes)
+        for word in self.substrings:
+            fresh.substring_counts(notes, word)
+        return [cat for cat in notes
+                if (self.counts.get(cat, 0), self.chars.get(cat, 0), self.words.get(cat, Counter()),
+                    [t[cat] for t in self.substrings.values()])
+                != (fresh.counts.get(cat, 0), fresh.chars.get(cat, 0), fresh.words.get(cat, Counter()),
+                    [t[cat] for t in fresh.substrings.values()])]
+
+    def checked(self, notes: NotesDict, answer: dict, scanned: dict, what: str) -> dict:
+        """In VERIFY mode: `scanned` (the full-scan result) when `answer` disagrees."""
+        if answer == scanned:
+            return answer
+        print(f"[WARN] stats aggregates out of step ({what}); rebuilding.")
+        trace("[stats] %s: %r != %r", what, answer, scanned)
+        self.reloaded(notes)
+        return scanned
+
+    # --- NoteHooks ----------------------------------------------------------------
+    def added(self, cat, pos, text):
+        self.counts[cat] = self.counts.get(cat, 0) + 1
+        self.chars[cat] = self.chars.get(cat, 0) + len(text)
+        self.words.setdefault(cat, Counter()).update(_words(text))
+        if self.substrings:
+            lower = text.lower()
+            for word, table in self.substrings.items():
+                if word in lower:
+                    table[cat] += 1
+
+    def removed(self, cat, pos, text):
+        if cat not in self.counts:
+            return
+        self.counts[cat] -= 1
+        self.chars[cat] -= len(text)
+        table = self.words[cat]
+        for word in _words(text):
+            table[word] -= 1
+            if table[word] <= 0:
+                del table[word]
+        if self.substrings:
+            lower = text.lower()
+            for word, table in self.substrings.items():
+                if word in lower:
+                    table[cat] -= 1
+
+    def edited(self, cat, pos, old, new):
+        self.removed(cat, pos, old)
+        self.added(cat, pos, new)
+
+    def renamed(self, old, new, offset, texts):
+        # whole tables are merged: no note is looked at
+        count, chars = self.counts.pop(old, 0), self.chars.pop(old, 0)
+        table = self.words.pop(old, Counter())
+        self.counts[new] = self.counts.get(new, 0) + count
+        self.chars[new] = self.chars.get(new, 0) + chars
+        self.words.setdefault(new, Counter()).update(table)
+        for table in self.substrings.values():
+            table[new] += table.pop(old, 0)
+
+    def reloaded(self, notes):
+        self.counts, self.chars, self.words = {}, {}, {}
+        self.substrings = {}   # scanned again when asked
+        for cat, items in notes.items():
+            self.counts[cat] = len(items)
+            self.chars[cat] = sum(len(n) for n in items)
+            table = self.words[cat] = Counter()
+            for note in items:
+                table.update(_words(note))
@@ -0,0 +1,125 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Callable
+
+from .hooks import NoteHooks
+from .utils import trace
+
+# Background autosave
+# Autosaver listens to the mutation hooks and counts changes in a generation
+# number. A worker thread waits until the notes have been quiet for
+# `debounce` seconds (or dirty for `max_delay`), then saves once for the whole
+# burst. The save is split in two: `snapshot()` copies the state while holding
+# `lock` -- the input loop takes the same lock around each mutation, so the
+# copy is consistent and the loop waits at most for the copy -- and
+# `write(copy)` does the slow file work with no lock held. A failed write
+# leaves the generation dirty: `fallback()` runs (e.g. fsync the journal)
+# and the save is retried after `retry` seconds. close() flushes in the
+# caller's thread.
+
+
+class Autosaver(NoteHooks):
+    def __init__(self, snapshot: Callable[[], object], write: Callable[[object], bool],
+                 debounce: float = 2.0, max_delay: float = 30.0, retry: float = 10.0,
+                 fallback: Callable[[], object] | None = None):
+        self.snapshot = snapshot
+        self.write = write
+        self.fallback = fallback
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.retry = retry
+        self.lock = threading.RLock()          # held around mutations and snapshot()
+        self.generation = 0                    # bumped by every mutation
+        self.saved = 0                         # last generation written
+        self.failures = 0
+        self._cond = threading.Condition()     # guards the counters/timestamps below
+        self._first: float | None = None       # first unsaved change
+        self._last = 0.0                       # latest change
+        self._retry_at = 0.0
+        self._stopping = False
+        self._save_lock = threading.Lock()     # one save at a time (worker vs flush)
+        self._worker = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._worker.start()
+
+    @property
+    def dirty(self) -> bool:
+        return self.generation != self.saved
+
+    def touch(self) -> None:
+        """Record one mutation (the hooks below call this)."""
+        with self._cond:
+            now = time.monotonic()
+            self.generation += 1
+            self._last = now
+            if self._first is None:
+                self._first = now
+            self._cond.notify()
+
+    def added(self, cat, pos, text):
+        self.touch()
+
+    def removed(self, cat, pos, text):
+        self.touch()
+
+    def edited(self, cat, pos, old, new):
+        self.touch()
+
+    def moved(self, src, pos, dest, dest_pos, text):
+        self.touch()
+
+    def renamed(self, old, new, offset, texts):
+        self.touch()
+    #--------------------------------------------------------------------------------
+
+    def _wait_time(self) -> float | None:
+        """Seconds until the next save is due; None while clean."""
+        if not self.dirty:
+            return None
+        due = min(self._last + self.debounce, self._first + self.max_delay)
+        return max(due, self._retry_at) - time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopping:
+                        return
+                    wait = self._wait_time()
+                    if wait is not None and wait <= 0:
+                        break
+                    self._cond.wait(wait)
+            self.flush()
+
+    def flush(self) -> bool:
+        """Save now if dirty. True when everything up to now is on disk."""
+        with self._save_lock:
+            with self.lock:
+                gen = self.generation
+                if gen == self.saved:
+                    return True
+                data = self.snapshot()
+            ok = data is not None and self.write(data)
+            with self._cond:
+                if ok:
+                    self.saved = max(self.saved, gen)
+                    self.failures = 0
+                    self._retry_at = 0.0
+                    # changes made while writing start a new burst
+                    self._first = self._last if self.dirty else None
+                else:
+                    self.failures += 1
+                    self._retry_at = time.monotonic() + (self.retry if data is not None else self.debounce)
+            if ok:
+                trace("autosave: saved generation %d", gen)
+            elif data is not None and self.fallback is not None:
+                self.fallback()
+            return ok
+
+    def close(self) -> bool:
+        """Stop the worker and flush synchronously. Returns flush()'s result."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._worker.join()
+        return self.flush()
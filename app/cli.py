@@ -0,0 +1,481 @@
+"""
+Non-interactive batch interface to the notes file.
+
+    python -m app add "buy milk" "call mom" --category home
+    python -m app add --split < lines.txt          # one "category|note" per line
+    python -m app import other_notes.json
+    python -m app import notes.csv notes.jsonl notes.md   # format by extension (or --format)
+    python -m app delete work 3 1 7
+    python -m app delete '#17' '#42'                # by note id (see show --ids)
+    python -m app move work 2 5 --to archive
+    python -m app search milk invoice --limit 20 --offset 40
+    python -m app show -c work --limit 50           # list notes, a window at a time
+    python -m app stats
+    python -m app dupes --threshold 0.5             # groups of near-duplicate notes
+    python -m app export -o backup.json
+    python -m app export -o notes.jsonl             # also .csv, .md (Markdown); --format for stdout
+    python -m app migrate notes.db                  # then: --file notes.db, or the menu app
+    python -m app migrate notes.snap                # binary snapshot, likewise
+    python -m app serve --port 8080                 # HTTP/JSON API, see server.py
+
+Every command loads the notes once, applies its whole batch in memory and
+(for the mutating ones) saves once at the end. No prompts. Each change is
+also logged to the journal, so a batch run while the menu app is open is
+merged with its changes instead of overwriting them (see journal.py).
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from itertools import groupby
+from typing import Iterable, Iterator
+
+from .formats import BUFFER_SIZE, FORMATS, READERS, export_file, guess_format, write_notes
+from .fuzzy import fuzzy_matches
+from .index import KeyIndex, SearchIndex, TrigramIndex
+from .hooks import HookList, LazyIndex
+from .journal import Journal
+from .neardup import THRESHOLD, NearDupIndex, find_clusters
+from .notes_app import (NotesDict, add_note, bulk_add, category_counts, delete_note,
+                        move_note_to, save_notes, search_notes, show_fuzzy, show_notes_grouped,
+                        show_ranked, show_stats, storage_path)
+from .parallel import ParallelSearch
+from .ranking import ranked_matches
+from .shards import ensure_sharded, is_sharded
+from .sqlite_store import SqliteStore, is_sqlite
+from .store import NotesStore
+from .streaming import iter_notes
+
+
+def _lines(sources: list[str]) -> Iterator[str]:
+    """Non-empty lines of each file in `sources` ("-" or none: stdin)."""
+    for src in sources or ["-"]:
+        if src == "-":
+            f = sys.stdin
+        else:
+            f = open(src, "r", encoding="utf-8")
+        try:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+@contextlib.contextmanager
+def _quiet(verbose: bool):
+    """The mutators print a line per note; a batch prints a summary instead."""
+    if verbose:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+#--------------------------------------------------------------------------------
+
+def _add_all(notes: NotesDict, pairs: Iterable[tuple[str, Iterable[str]]], seen,
+             workers: int, hooks=None) -> dict[str, int]:
+    """bulk_add each (category, texts) group; return the summed summary."""
+    total = {"added": 0, "duplicates": 0, "empty": 0}
+    for cat, texts in pairs:
+        for k, v in bulk_add(notes, texts, cat, seen, hooks, workers=workers).items():
+            total[k] += v
+    return total
+
+
+def _add_similar(notes: NotesDict, pairs: Iterable[tuple[str, Iterable[str]]], seen,
+                 hooks=None) -> dict[str, int]:
+    """add_note one text at a time, warning about near-duplicates of each
+    (against the store and the notes added before it)."""
+    near = NearDupIndex.build(notes)
+    if getattr(hooks, "peers", None) is not None:   # the journal: rebuilt with `seen`
+        hooks.peers = HookList([hooks.peers, near])
+    hooks = HookList([near, hooks])
+    total = {"added": 0, "duplicates": 0, "empty": 0}
+    for cat, texts in pairs:
+        for text in texts:
+            if not text.strip():
+                total["empty"] += 1
+            elif add_note(notes, text, cat, seen, hooks, near=near):
+                total["added"] += 1
+            else:
+                total["duplicates"] += 1
+    return total
+
+
+def _summary(verb: str, total: dict[str, int]) -> str:
+    return (f"{verb} {total['added']} note(s), skipped {total['duplicates']} duplicate(s)"
+            f" and {total['empty']} empty.")
+
+
+def cmd_add(notes, seen, args, store=None, ids=None) -> int:
+    texts = args.notes or _lines(args.input)
+    if args.split:
+        # consecutive lines of one category go to bulk_add together
+        rows = (t.split("|", 1) if "|" in t else (args.category, t) for t in texts)
+        pairs = ((cat, (text for _, text in group))
+                 for cat, group in groupby(rows, key=lambda row: row[0]))
+    else:
+        pairs = [(args.category, texts)]
+    if args.similar:
+        total = _add_similar(notes, pairs, seen, store)
+    else:
+        total = _add_all(notes, pairs, seen, args.workers, store)
+    print(_summary("Added", total))
+    return total["added"]
+
+
+def cmd_import(notes, seen, args, store=None, ids=None) -> int:
+    def pairs():
+        for src in args.files:
+            fmt = args.format or guess_format(src)
+            f = sys.stdin if src == "-" else open(src, "r", encoding="utf-8", newline="",
+                                                  buffering=BUFFER_SIZE)
+            try:
+                if fmt != "json":
+                    # one (category, text) per line/row; consecutive ones go to bulk_add together
+                    rows = READERS[fmt](f)
+                    yield from ((cat, (text for _, text in group))
+                                for cat, group in groupby(rows, key=lambda row: row[0]))
+                    continue
+                for cat, items in iter_notes(f):
+                    if not isinstance(items, list):
+                        print(f"[WARN] {src}: dropping malformed entry for category {cat!r}.")
+                        continue
+                    yield cat, items
+            except json.JSONDecodeError as e:
+                print(f"[ERROR] {src} is not a notes file: {e}")
+            finally:
+                if f is not sys.stdin:
+                    f.close()
+    start = time.perf_counter()
+    total = _add_all(notes, pairs(), seen, args.workers, store)
+    print(_summary("Imported", total))
+    elapsed = time.perf_counter() - start
+    read = sum(total.values())
+    print(f"Read {read} note(s) in {elapsed:.2f}s ({read / max(elapsed, 1e-6):,.0f} notes/s).")
+    return total["added"]
+
+
+def _positions(args, fields: int) -> Iterator[list[str]]:
+    """The (category, position[, dest]) rows of a delete/move batch; a
+    position may be a note id ("#17"), which needs no category."""
+    positions, cat = args.positions, args.category
+    if cat is not None and cat.startswith("#"):
+        positions, cat = [cat, *positions], None
+    for pos in positions:
+        yield [cat, pos] + ([args.to] if fields == 3 else [])
+    if args.batch:
+        for line in _lines([args.batch]):
+            row = [part.strip() for part in line.split("|")]
+            if row[0].startswith("#") and len(row) == fields - 1:
+                row.insert(0, "")
+            if len(row) != fields:
+                print(f"[WARN] Skipping malformed line {line!r}.")
+                continue
+            yield row
+
+
+def _descending(rows, fields: int, ids=None) -> list[tuple]:
+    """Parse positions, turn note ids into theirs, and sort them last-first
+    per category, so that removing one note never shifts the position of
+    another one still to be removed."""
+    parsed = set()
+    for row in rows:
+        cat = (row[0] or "").strip().lower()
+        try:
+            if row[1].startswith("#"):
+                cat, pos = ids.locate(int(row[1][1:]))
+                pos += 1
+            else:
+                pos = int(row[1])
+        except ValueError:
+            print(f"[WARN] Not a position: {row[1]!r}")
+            continue
+        except (KeyError, AttributeError):
+            print(f"[WARN] No note {row[1]}.")
+            continue
+        parsed.add((cat, pos, *row[2:]))
+    return sorted(parsed, key=lambda r: (r[0], -r[1]))
+
+
+def cmd_delete(notes, seen, args, store=None, ids=None) -> int:
+    rows = _descending(_positions(args, 2), 2, ids)
+    done = failed = 0
+    with _quiet(args.verbose):
+        for cat, pos in rows:
+            if cat in notes and delete_note(notes, cat, pos, seen, store, ask=False) is not None:
+                done += 1
+            else:
+                failed += 1
+    print(f"Deleted {done} note(s), {failed} failed.")
+    return done
+
+
+def cmd_move(notes, seen, args, store=None, ids=None) -> int:
+    if args.positions and not args.to:
+        print("move: --to is required with positions.")
+        return 0
+    rows = _descending(_positions(args, 3), 3, ids)
+    done = failed = 0
+    with _quiet(args.verbose):
+        for src, pos, dest in rows:
+            if move_note_to(notes, src, pos, dest, seen, store) is not None:
+                done += 1
+            else:
+                failed += 1
+    print(f"Moved {done} note(s), {failed} failed.")
+    return done
+
+
+def cmd_search(notes, seen, args, store=None, ids=None) -> int:
+    terms = args.terms or list(_lines(args.input))
+    # the database has its own index; building one only pays off over several terms
+    if args.rank:
+        index = SearchIndex.build(notes) if len(terms) > 1 else None   # the store keeps no term stats
+    elif args.fuzzy:
+        index = TrigramIndex.build(notes) if len(terms) > 1 else None
+    elif args.jobs and store is None:
+        index = None   # scanned in parallel instead
+    else:
+        index = store if store is not None else SearchIndex.build(notes) if len(terms) > 1 else None
+    parallel = ParallelSearch(args.jobs) if args.jobs and index is None else None   # no index: scan on N cores
+    try:
+        for term in terms:
+            if len(terms) > 1:
+                print(f"== {term}")
+            if args.rank:
+                if matches := ranked_matches(notes, term, index, k=args.top, categories=args.category):
+                    show_ranked(matches)
+                else:
+                    print("No results.")
+            elif not args.fuzzy:
+                search_notes(notes, term, index, offset=args.offset, limit=args.limit,
+                             ids=ids if args.ids else None, parallel=parallel)
+            elif matches := fuzzy_matches(notes, term, index, k=args.top):
+                show_fuzzy(matches)
+            else:
+                print("No results.")
+    finally:
+        if parallel is not None:
+            parallel.close()
+    return 0
+
+
+def cmd_show(notes, seen, args, store=None, ids=None) -> int:
+    if args.category:
+        cats = [c.strip().lower() for c in args.category]
+        notes = {cat: notes[cat] for cat in cats if cat in notes}
+    show_notes_grouped(notes, offset=args.offset, limit=args.limit, ids=ids if args.ids else None)
+    return 0
+
+
+def cmd_stats(notes, seen, args, store=None, ids=None) -> int:
+    show_stats(notes)
+    return 0
+
+
+def cmd_dupes(notes, seen, args, store=None, ids=None) -> int:
+    clusters = find_clusters(notes, args.threshold)
+    if not clusters:
+        print("No near-duplicate notes.")
+        return 0
+    print(f"{len(clusters)} group(s) of near-duplicate notes:")
+    for group in clusters:
+        print()
+        for cat, pos in group:
+            print(f"  {cat}: {pos + 1}. {notes[cat][pos]}")
+    return 0
+
+
+def cmd_export(notes, seen, args, store=None, ids=None) -> int:
+    if args.category:
+        cats = [c.strip().lower() for c in args.category]
+        data = {cat: notes[cat] for cat in cats if cat in notes}
+    else:
+        data = notes
+    fmt = args.format or guess_format(args.output)
+    if args.output in (None, "-"):
+        write_notes(data, sys.stdout, fmt)
+    else:
+        start = time.perf_counter()
+        count = export_file(data, args.output, fmt)
+        elapsed = time.perf_counter() - start
+        print(f"Exported {count} note(s) to {args.output} in {elapsed:.2f}s "
+              f"({count / max(elapsed, 1e-6):,.0f} notes/s).")
+    return 0
+
+
+def migrate(notes, args, ids=None, journal=None) -> int:
+    """
+    Write the loaded notes (journal included) and their ids to another
+    storage. From a journal, the new snapshot also carries its journal_seq
+    and etag: the ops it already holds are not replayed on top of it.
+    """
+    if os.path.abspath(args.dest) == os.path.abspath(args.file):
+        print("migrate: destination is the source.")
+        return 1
+    data = notes
+    if ids is not None:
+        data = {"next_note_id": ids.next_id, "notes": notes, "ids": ids.to_dict()}
+        if journal is not None:   # etag first: snapshot_etag() reads it from the head of a JSON file
+            data = {"etag": journal.etag, "journal_seq": journal.seq, **data}
+    if not save_notes(data, args.dest):
+        print(f"Could not write {args.dest}.")
+        return 1
+    kind = ("SQLite database" if is_sqlite(args.dest) else "shard directory" if is_sharded(args.dest)
+            else "binary snapshot" if args.dest.endswith(".snap") else "JSON file")
+    print(f"Migrated {sum(category_counts(notes).values())} note(s) in {len(notes)} "
+          f"categories to {kind} {args.dest}.")
+    if os.path.abspath(args.dest) == os.path.abspath(storage_path()):
+        print(f"The menu app and the batch commands use {args.dest} from now on.")
+    return 0
+
+
+BATCH = 1 << 62   # journal thresholds that a batch never reaches
+
+COMMANDS = {
+    "add": (cmd_add, True),          # name: (handler, mutates)
+    "import": (cmd_import, True),
+    "delete": (cmd_delete, True),
+    "move": (cmd_move, True),
+    "search": (cmd_search, False),
+    "show": (cmd_show, False),
+    "stats": (cmd_stats, False),
+    "dupes": (cmd_dupes, False),
+    "export": (cmd_export, False),
+}
+#--------------------------------------------------------------------------------
+
+def _count(text: str) -> int:
+    """argparse type for --limit/--offset: a whole number, 0 or more."""
+    try:
+        n = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a whole number: {text!r}") from None
+    if n < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, not {n}")
+    return n
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app", description="Batch operations on a notes file.")
+    parser.add_argument("--file", help="notes file, shard directory, binary snapshot (*.snap) or SQLite "
+                                       "database (default: the one the menu app uses -- notes.db, "
+                                       "notes.snap or notes.d)")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-v", "--verbose", action="store_true", help="print a line per deleted/moved note")
+    window = argparse.ArgumentParser(add_help=False)
+    window.add_argument("--limit", type=_count, help="show at most this many notes")
+    window.add_argument("--offset", type=_count, default=0, help="skip this many notes first")
+    window.add_argument("--ids", action="store_true", help="show each note's id (for '#id' positions)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("add", parents=[common], help="add notes from arguments, files or stdin")
+    p.add_argument("notes", nargs="*", help="note texts (default: read lines from --input)")
+    p.add_argument("-c", "--category", default="General")
+    p.add_argument("-i", "--input", action="append", default=[], help="file with one note per line (- = stdin)")
+    p.add_argument("--split", action="store_true", help="lines are 'category|note'")
+    p.add_argument("-w", "--workers", type=int, default=0, help="processes for normalizing big inputs")
+    p.add_argument("--similar", action="store_true",
+                   help="warn about notes worded almost the same (adds one at a time, a line per note)")
+
+    p = sub.add_parser("import", parents=[common], help="merge the notes of other notes files")
+    p.add_argument("files", nargs="+", help="notes files: JSON, .jsonl, .csv or .md (- = stdin)")
+    p.add_argument("-f", "--format", choices=FORMATS, help="input format (default: by file extension, else json)")
+    p.add_argument("-w", "--workers", type=int, default=0, help="processes for normalizing big inputs")
+
+    p = sub.add_parser("delete", parents=[common], help="delete notes by position")
+    p.add_argument("category", nargs="?")
+    p.add_argument("positions", nargs="*", help="1-based positions as shown by the app, or '#id'")
+    p.add_argument("--from", dest="batch", help="file of 'category|position' lines (- = stdin)")
+
+    p = sub.add_parser("move", parents=[common], help="move notes by position to another category")
+    p.add_argument("category", nargs="?")
+    p.add_argument("positions", nargs="*")
+    p.add_argument("--to", help="destination category")
+    p.add_argument("--from", dest="batch", help="file of 'category|position|dest' lines (- = stdin)")
+
+    p = sub.add_parser("search", parents=[common, window], help="search for one or more terms")
+    p.add_argument("terms", nargs="*", help="terms (default: one per line from --input)")
+    p.add_argument("-i", "--input", action="append", default=[])
+    p.add_argument("--fuzzy", action="store_true", help="rank the closest notes, typos allowed")
+    p.add_argument("--rank", action="store_true", help="rank the notes by relevance (BM25)")
+    p.add_argument("-k", "--top", type=int, default=10, help="results per term with --fuzzy/--rank")
+    p.add_argument("-c", "--category", action="append", help="only these categories (with --rank)")
+    p.add_argument("-j", "--jobs", type=int, default=0,
+                   help="scan large stores with N processes instead of building an index")
+
+    p = sub.add_parser("show", parents=[common, window], help="list the notes by category")
+    p.add_argument("-c", "--category", action="append", help="only these categories")
+
+    sub.add_parser("stats", parents=[common], help="notes per category")
+
+    p = sub.add_parser("dupes", parents=[common], help="list groups of near-duplicate notes")
+    p.add_argument("-t", "--threshold", type=float, default=THRESHOLD,
+                   help=f"word overlap (Jaccard) that counts as a duplicate (default: {THRESHOLD})")
+
+    p = sub.add_parser("export", parents=[common], help="write the notes as JSON, JSON Lines, CSV or Markdown")
+    p.add_argument("-o", "--output", help="output file (default: stdout)")
+    p.add_argument("-f", "--format", choices=FORMATS, help="output format (default: by file extension, else json)")
+    p.add_argument("-c", "--category", action="append", help="only these categories")
+
+    p = sub.add_parser("migrate", parents=[common], help="copy the notes to another storage")
+    p.add_argument("dest", help="notes.json, a shard directory (*.d), an SQLite database (*.db) or a binary snapshot (*.snap)")
+
+    p = sub.add_parser("serve", parents=[common], help="serve the notes as an HTTP/JSON API")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8080, help="0 = any free port")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    args.file = args.file or storage_path()   # never a second snapshot of notes.journal
+    if args.command == "serve":
+        from .server import serve   # asyncio is only needed here
+        return serve(args.file, args.host, args.port)
+    if is_sqlite(args.file):
+        if args.command == "migrate":
+            store = SqliteStore(args.file)
+            try:
+                return migrate(store.load(), args, store.ids)
+            finally:
+                store.close()
+        return _main_sqlite(args)
+    # same files as the interactive app: <file> + <file>.journal
+    if is_sharded(args.file):
+        ensure_sharded(args.file, legacy=os.path.splitext(args.file)[0] + ".json")
+    # fsync and compaction once, at the end of the batch
+    journal = Journal(os.path.splitext(args.file)[0] + ".journal", args.file,
+                      sync_every=BATCH, compact_ops=BATCH, compact_bytes=BATCH)
+    with contextlib.redirect_stdout(sys.stderr):   # keep `export` output clean
+        notes = journal.open(into=NotesStore())
+    if args.command == "migrate":
+        journal.close(compact=False)
+        return migrate(notes, args, journal.ids, journal)
+    handler, mutates = COMMANDS[args.command]
+    seen = LazyIndex(KeyIndex, notes)   # only the commands that look up keys read every shard
+    journal.peers = seen
+    changed = handler(notes, seen, args, journal if mutates else None, ids=journal.ids)
+    # one save for the whole batch: compaction rewrites <file> from memory
+    journal.close(compact=bool(mutates and changed))
+    return 0
+
+
+def _main_sqlite(args) -> int:
+    """The same commands on an SQLite database: the database is `seen` and
+    the search index, and the batch is written through as one transaction."""
+    handler, mutates = COMMANDS[args.command]
+    store = SqliteStore(args.file)
+    try:
+        notes = store.load(into=NotesStore())
+        with store.batch():
+            handler(notes, store, args, store, ids=store.ids)
+    finally:
+        store.close()
+    return 0
@@ -0,0 +1,164 @@
+from __future__ import annotations
+import csv
+import json
+import os
+import sys
+from itertools import islice
+from typing import Dict, Iterator, List, TextIO
+
+NotesDict = Dict[str, List[str]]
+
+# Export/import formats
+#   jsonl      one {"category": ..., "text": ...} object per line
+#   csv        header "category,text", then one row per note
+#   md         "## category" headings, one "- note" item per note (extra
+#              lines of a multi-line note indented under its item, blank
+#              ones too, as "  "); whitespace is kept. A note with a carriage
+#              return cannot be told from a line break: it is left out, with
+#              a warning
+#   json       the app's own file format (streaming.py reads it)
+# Writers are generators of text that the caller writes a batch of lines
+# at a time through a buffered file; readers yield (category, text) pairs
+# line by line. Neither holds more than a batch of lines, so memory stays
+# flat whatever the size of the store.
+
+FORMATS = ("json", "jsonl", "csv", "md")
+_EXTENSIONS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv", ".md": "md", ".markdown": "md"}
+WRITE_BATCH = 4096        # lines per write
+BUFFER_SIZE = 1 << 16     # bytes of file buffer
+
+
+def guess_format(path: str | None, default: str = "json") -> str:
+    """The format a file name suggests (by extension), else `default`."""
+    if not path or path == "-":
+        return default
+    return _EXTENSIONS.get(os.path.splitext(path)[1].lower(), default)
+
+
+# --- writers ------------------------------------------------------------------------
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def iter_jsonl(notes: NotesDict) -> Iterator[str]:
+    for cat, items in notes.items():
+        head = '{"category": %s, "text": ' % _encode(cat)   # the same for the whole category
+        for text in items:
+            yield f"{head}{_encode(str(text))}}}\n"
+
+
+class _Line:
+    """A file-like sink for csv.writer that keeps the last row written."""
+    def write(self, s: str) -> None:
+        self.value = s
+
+
+def iter_csv(notes: NotesDict) -> Iterator[str]:
+    line = _Line()
+    writer = csv.writer(line, lineterminator="\n")
+    writer.writerow(("category", "text"))
+    yield line.value
+    for cat, items in notes.items():
+        for text in items:
+            writer.writerow((cat, str(text)))
+            yield line.value
+
+
+def iter_markdown(notes: NotesDict) -> Iterator[str]:
+    for i, (cat, items) in enumerate(notes.items()):
+        yield ("\n" if i else "") + f"## {cat}\n\n"
+        for text in items:
+            text = str(text)
+            if "\r" in text:
+                print(f"[WARN] {cat}: {text[:40]!r} has a carriage return; not written as Markdown.",
+                      file=sys.stderr)
+                continue
+            yield "- " + text.replace("\n", "\n  ") + "\n"
+
+
+def iter_json(notes: NotesDict) -> Iterator[str]:
+    """The notes as the app's JSON file, indented like save_notes, a note per chunk."""
+    yield "{"
+    for i, (cat, items) in enumerate(notes.items()):
+        yield f'{"," if i else ""}\n  {_encode(cat)}: ['
+        for j, text in enumerate(items):
+            yield f'{"," if j else ""}\n    {_encode(str(text))}'
+        yield "\n  ]" if items else "]"
+    yield "\n}\n" if notes else "}\n"
+
+
+WRITERS = {"json": iter_json, "jsonl": iter_jsonl, "csv": iter_csv, "md": iter_markdown}
+
+
+def write_notes(notes: NotesDict, out: TextIO, fmt: str = "json") -> int:
+    """Write `notes` to `out` in `fmt`, WRITE_BATCH chunks per write; returns the notes written."""
+    chunks = WRITERS[fmt](notes)
+    while batch := list(islice(chunks, WRITE_BATCH)):
+        out.write("".join(batch))
+    count = sum(len(items) for items in notes.values())
+    if fmt == "md":   # minus the notes iter_markdown leaves out
+        count -= sum("\r" in str(text) for items in notes.values() for text in items)
+    return count
+
+
+def export_file(notes: NotesDict, path: str, fmt: str | None = None) -> int:
+    """write_notes() into `path` (via <path>.tmp, so a failed export leaves no half file)."""
+    fmt = fmt or guess_format(path)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="", buffering=BUFFER_SIZE) as f:
+        count = write_notes(notes, f, fmt)
+    os.replace(tmp, path)
+    return count
+
+
+# --- readers ------------------------------------------------------------------------
+def read_jsonl(f: TextIO) -> Iterator[tuple[str, str]]:
+    for n, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"[WARN] line {n}: not JSON ({e.msg}), skipped.")
+            continue
+        if not isinstance(row, dict) or not isinstance(row.get("text"), str):
+            print(f"[WARN] line {n}: no \"text\", skipped.")
+            continue
+        yield str(row.get("category") or "General"), row["text"]
+
+
+def read_csv(f: TextIO) -> Iterator[tuple[str, str]]:
+    rows = csv.reader(f)
+    header = [h.strip().lower() for h in next(rows, [])]
+    if "text" not in header:
+        print("[WARN] CSV without a 'text' column, nothing imported.")
+        return
+    text_col = header.index("text")
+    cat_col = header.index("category") if "category" in header else None
+    for row in rows:
+        if len(row) <= text_col:
+            continue
+        cat = row[cat_col] if cat_col is not None and cat_col < len(row) else ""
+        yield cat or "General", row[text_col]
+
+
+def read_markdown(f: TextIO) -> Iterator[tuple[str, str]]:
+    cat, text = "General", None
+    for line in f:
+        line = line.rstrip("\r\n")
+        if text is not None and line.startswith("  "):
+            text += "\n" + line[2:]           # continuation of a multi-line note (blank: "  ")
+            continue
+        if text is not None:
+            yield cat, text
+            text = None
+        stripped = line.strip()
+        if stripped.startswith("#"):
+            cat = stripped.lstrip("#").strip() or "General"
+        elif stripped[:2] in ("- ", "* "):
+            text = line.lstrip()[2:]           # as written: trailing whitespace is the note's
+    if text is not None:
+        yield cat, text
+
+
+READERS = {"jsonl": read_jsonl, "csv": read_csv, "md": read_markdown}
+
@@ -0,0 +1,128 @@
+from __future__ import annotations
+import heapq
+from collections import Counter
+from typing import Dict, List
+
+from .index import TrigramIndex, trigrams
+from .profiling import traced
+from .utils import normalize
+
+NotesDict = Dict[str, List[str]]
+
+# Typo-tolerant search
+# Each query token may be off by up to `limit` edits (default: 1 per 4
+# characters, at least 1). One edit changes at most 3 of a token's padded
+# trigrams, so a close vocabulary token shares at least
+# len(trigrams) - 3 * limit of them: the trigram index turns that into a
+# short list of words, which a banded edit distance (giving up past `limit`)
+# checks. The notes holding those words come from the token postings and
+# are scored from their indexed tokens -- no note text is read. A note's
+# distance is the sum over the query tokens of the edits to its closest
+# token; the k best are returned.
+
+K = 10
+
+
+def default_limit(token: str) -> int:
+    return max(1, len(token) // 4)
+
+
+def bounded_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance of a and b, or limit + 1 if it is larger."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if a == b:
+        return 0
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        lo, hi = max(1, i - limit), min(len(b), i + limit)   # only the band can stay <= limit
+        if lo > 1:
+            cur[lo - 1] = limit + 1
+        for j in range(lo, hi + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+        if hi < len(b):
+            cur[hi + 1:] = [limit + 1] * (len(b) - hi)
+        if min(cur[lo - 1:hi + 1]) > limit:
+            return limit + 1
+        prev = cur
+    return min(prev[-1], limit + 1)
+
+
+def _similar(index: TrigramIndex, token: str, limit: int) -> dict[str, int]:
+    """{vocabulary token: distance} for the indexed tokens within `limit` of `token`."""
+    grams = set(trigrams(token))
+    need = max(1, len(grams) - 3 * limit)
+    counts: Counter = Counter()
+    for g in grams:
+        counts.update(index.grams.get(g, ()))
+    near = {}
+    for word, n in counts.items():
+        if n < need:
+            continue
+        if word not in index.postings:   # its last note is gone
+            index.forget(word)
+            continue
+        d = bounded_distance(token, word, limit)
+        if d <= limit:
+            near[word] = d
+    return near
+
+
+def _score(words, tokens, limits, near) -> int | None:
+    total = 0
+    for token, lim, close in zip(tokens, limits, near):
+        best = min((close.get(w, lim + 1) for w in words), default=lim + 1)
+        if best > lim:
+            return None
+        total += best
+    return total
+
+
+@traced
+def fuzzy_matches(notes: NotesDict, term: str, index: TrigramIndex | None = None,
+                  k: int = K, limit: int | None = None) -> list[tuple[int, str, int, str]]:
+    """
+    The k notes closest to `term`: (distance, category, 0-based position,
+    note), best first, ties in display order. Notes where some query token
+    is more than its limit away from every word are left out. Without an
+    index every note is scored.
+    """
+    tokens = list(dict.fromkeys(normalize(term).split()))
+    if not tokens:
+        return []
+    limits = [limit if limit is not None else default_limit(t) for t in tokens]
+    order = {cat: i for i, cat in enumerate(notes)}
+    scored = []
+
+    if index is not None:
+        near = [_similar(index, t, lim) for t, lim in zip(tokens, limits)]
+        if not all(near):
+            return []
+        locs = None
+        # rarest token first: the intersection starts (and stays) small
+        for close in sorted(near, key=lambda c: sum(len(index.postings[w]) for w in c)):
+            found = set().union(*(index.postings[w] for w in close))
+            locs = found if locs is None else locs & found
+            if not locs:
+                return []
+        for loc in locs:
+            if loc[0] not in order:
+                continue
+            total = _score(index.row(loc), tokens, limits, near)
+            if total is not None:
+                cat, pos = index.locate(loc)
+                scored.append((total, order[cat], pos, cat))
+    else:
+        exact = [{t: 0} for t in tokens]
+        for cat, items in notes.items():
+            for pos, note in enumerate(items):
+                words = set(normalize(note).split())
+                near = [exact[i] if t in words else
+                        {w: bounded_distance(t, w, lim) for w in words}
+                        for i, (t, lim) in enumerate(zip(tokens, limits))]
+                total = _score(words, tokens, limits, near)
+                if total is not None:
+                    scored.append((total, order[cat], pos, cat))
+    return [(d, cat, pos, notes[cat][pos]) for d, _, pos, cat in heapq.nsmallest(k, scored)]
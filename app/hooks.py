@@ -0,0 +1,138 @@
+from __future__ import annotations
+from typing import Iterable
+
+
+# Mutation hooks
+# The mutators in notes_app call these *after* they changed `notes`, so
+# anything derived from the notes (indexes, journals, ...) can follow along
+# without rescanning. Positions are 0-based list positions in the category.
+
+class NoteHooks:
+    """Base listener. Every method is a no-op unless a subclass overrides it."""
+
+    def added(self, cat: str, pos: int, text: str) -> None:
+        """`text` was inserted at notes[cat][pos] (mutators always append)."""
+
+    def removed(self, cat: str, pos: int, text: str) -> None:
+        """notes[cat][pos] was popped; later notes shifted down by one."""
+
+    def edited(self, cat: str, pos: int, old: str, new: str) -> None:
+        """notes[cat][pos] was replaced in place."""
+
+    def moved(self, src: str, pos: int, dest: str, dest_pos: int, text: str) -> None:
+        """A note left notes[src][pos] and was appended at notes[dest][dest_pos]."""
+        self.removed(src, pos, text)
+        self.added(dest, dest_pos, text)
+
+    def renamed(self, old: str, new: str, offset: int, texts: list[str]) -> None:
+        """Category `old` was dropped and its notes appended to `new` from `offset`."""
+        for i, text in enumerate(texts):
+            self.removed(old, 0, text)
+            self.added(new, offset + i, text)
+
+    def reloaded(self, notes) -> None:
+        """`notes` was replaced wholesale (another session's changes were loaded)."""
+#--------------------------------------------------------------------------------
+
+class HookList(NoteHooks):
+    """Fan one mutation out to several listeners, in order."""
+
+    def __init__(self, hooks: Iterable[NoteHooks] = ()):
+        self.hooks = [h for h in hooks if h is not None]
+
+    def append(self, hook: NoteHooks) -> None:
+        self.hooks.append(hook)
+
+    def added(self, cat, pos, text):
+        for h in self.hooks:
+            h.added(cat, pos, text)
+
+    def removed(self, cat, pos, text):
+        for h in self.hooks:
+            h.removed(cat, pos, text)
+
+    def edited(self, cat, pos, old, new):
+        for h in self.hooks:
+            h.edited(cat, pos, old, new)
+
+    def moved(self, src, pos, dest, dest_pos, text):
+        for h in self.hooks:
+            h.moved(src, pos, dest, dest_pos, text)
+
+    def renamed(self, old, new, offset, texts):
+        for h in self.hooks:
+            h.renamed(old, new, offset, texts)
+
+    def reloaded(self, notes):
+        for h in self.hooks:
+            h.reloaded(notes)
+#--------------------------------------------------------------------------------
+
+class LazyIndex(NoteHooks):
+    """
+    cls.build(notes) (an index, NoteStats...), made the first time it is
+    actually used, so a session that never searches never reads every note.
+    Until then the mutation hooks are no-ops -- the build sees the notes as
+    they are by then -- and reloaded() drops a built one again. Attributes
+    are forwarded, and __class__ reports `cls`, so isinstance() checks in the
+    helpers treat it as the index itself.
+    """
+
+    def __init__(self, cls: type, notes):
+        self._cls = cls
+        self._notes = notes
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self._cls.build(self._notes)
+        return self._index
+
+    @property
+    def built(self) -> bool:
+        return self._index is not None
+
+    @property
+    def __class__(self):
+        return self._cls
+
+    def __getattr__(self, name):   # only called for what LazyIndex itself lacks
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.index, name)
+
+    def __contains__(self, key) -> bool:
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def added(self, cat, pos, text):
+        if self._index is not None:
+            self._index.added(cat, pos, text)
+
+    def removed(self, cat, pos, text):
+        if self._index is not None:
+            self._index.removed(cat, pos, text)
+
+    def edited(self, cat, pos, old, new):
+        if self._index is not None:
+            self._index.edited(cat, pos, old, new)
+
+    def moved(self, src, pos, dest, dest_pos, text):
+        if self._index is not None:
+            self._index.moved(src, pos, dest, dest_pos, text)
+
+    def renamed(self, old, new, offset, texts):
+        if self._index is not None:
+            self._index.renamed(old, new, offset, texts)
+
+    def reloaded(self, notes):
+        self._notes, self._index = notes, None
+
+    def __repr__(self):
+        return f"LazyIndex({self._cls.__name__}, {'built' if self.built else 'pending'})"
@@ -0,0 +1,257 @@
+from __future__ import annotations
+from typing import Callable, Dict, List
+
+from .hooks import NoteHooks
+
+NotesDict = Dict[str, List[str]]
+
+# Stable note ids
+# Every note gets a small integer id that never changes while the note lives
+# (edits and moves keep it) and is never handed out again. Positions shift
+# whenever a note before them goes; ids don't, so a batch, another session or
+# an HTTP client can keep addressing a note by its id.
+#
+# NoteIds maps id <-> (category, position). Each category keeps its ids in
+# slots; a delete only marks the slot dead (a tombstone) and a Fenwick tree
+# over the live flags turns slot <-> position into O(log n) in both
+# directions. Once the dead outnumber the live, the category is compacted.
+# The journal (and the SQLite store) keep one up to date and persist the ids
+# with the notes. A category whose stored ids can be read at any time (a
+# shard or a binary snapshot that holds them) may be left for later: its
+# slots are filled the first time the category or an unknown id is asked
+# for, so opening the notes does not read every category.
+
+COMPACT_MIN = 32   # tombstones a category may hold before compaction is considered
+
+
+class _Slots:
+    """The ids of one category in slot order (None: deleted) + live-flag Fenwick tree."""
+    __slots__ = ("ids", "tree", "dead")
+
+    def __init__(self, ids=()):
+        self.ids: list[int | None] = list(ids)
+        self.dead = 0
+        self._build()
+
+    def _build(self) -> None:
+        n = len(self.ids)
+        tree = [0] * (n + 1)
+        for i in range(1, n + 1):
+            tree[i] += self.ids[i - 1] is not None
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def __len__(self) -> int:
+        return len(self.ids) - self.dead
+
+    def rank(self, slot: int) -> int:
+        """Live slots before `slot`, i.e. the position of the note in it."""
+        total, i = 0, slot
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def select(self, pos: int) -> int:
+        """The slot holding the note at position `pos`."""
+        if not 0 <= pos < len(self):
+            raise IndexError(pos)
+        slot, left = 0, pos + 1
+        step = 1 << (len(self.ids).bit_length() - 1)
+        while step:
+            nxt = slot + step
+            if nxt < len(self.tree) and self.tree[nxt] < left:
+                slot, left = nxt, left - self.tree[nxt]
+            step >>= 1
+        return slot
+
+    def append(self, nid: int) -> int:
+        self.ids.append(nid)
+        i = len(self.ids)
+        # tree[i] covers slots (i - lowbit(i), i]: this one plus the ranges below it
+        self.tree.append(1 + self.rank(i - 1) - self.rank(i - (i & -i)))
+        return i - 1
+
+    def kill(self, slot: int) -> int:
+        nid = self.ids[slot]
+        self.ids[slot] = None
+        self.dead += 1
+        i = slot + 1
+        while i < len(self.tree):
+            self.tree[i] -= 1
+            i += i & -i
+        return nid
+
+    def live(self) -> list[int]:
+        return [nid for nid in self.ids if nid is not None]
+#--------------------------------------------------------------------------------
+
+class NoteIds(NoteHooks):
+    """
+    id -> (category, position) and back, for every note.
+
+    As a NoteHooks listener it follows the mutators by itself, giving each
+    added note the next free id. The journal calls insert()/remove()/...
+    itself instead, so that it can log the ids it used (see journal.py).
+    """
+
+    def __init__(self, next_id: int = 1):
+        self.next_id = next_id
+        self.cats: dict[str, _Slots] = {}
+        self.where: dict[int, tuple[str, int]] = {}   # id -> (category, slot)
+        self.known: Callable[[str], list | None] | None = None
+        self._later: set[str] = set()   # categories whose ids known() gives when needed
+
+    @classmethod
+    def build(cls, notes: NotesDict, known: Callable[[str], list | None] | None = None,
+              next_id: int = 1) -> "NoteIds":
+        """Ids for every note in `notes`: the ones stored with the notes
+        (`known(cat)`) where they fit, new ones otherwise."""
+        ids = cls()
+        ids.reset(notes, known, next_id)
+        return ids
+
+    def reset(self, notes: NotesDict, known=None, next_id: int = 1, later=None) -> None:
+        """Rebuild in place (for holders of this object) from `notes`. The
+        categories `later(cat)` accepts get their ids from `known(cat)` when
+        first needed; `next_id` must lie past those."""
+        self.cats, self.where = {}, {}
+        self.next_id = max(1, next_id)
+        self.known = known
+        self._later = {cat for cat in notes if later(cat)} if later is not None and known is not None else set()
+        missing = []
+        for cat in notes:
+            if cat in self._later:
+                continue
+            items = notes[cat]
+            stored = known(cat) if known is not None else None
+            if stored is not None and len(stored) == len(items) \
+                    and all(isinstance(n, int) and n > 0 and n not in self.where for n in stored):
+                self._fill(cat, stored)
+            else:
+                missing.append(cat)
+        for cat in missing:   # legacy data: numbered in note order, the same in every session
+            self._fill(cat, range(self.next_id, self.next_id + len(notes[cat])))
+
+    def _fill(self, cat: str, ids) -> None:
+        slots = self.cats[cat] = _Slots(ids)
+        for slot, nid in enumerate(slots.ids):
+            self.where[nid] = (cat, slot)
+            self.next_id = max(self.next_id, nid + 1)
+
+    def _touch(self, cat: str) -> None:
+        """Fill `cat` from its stored ids if it was left for later."""
+        if cat not in self._later:
+            return
+        self._later.discard(cat)
+        stored = self.known(cat) or []
+        if not all(isinstance(n, int) and n > 0 and n not in self.where for n in stored):
+            stored = range(self.next_id, self.next_id + len(stored))   # damaged: new ids
+        self._fill(cat, stored)
+
+    def _touch_all(self) -> None:
+        for cat in list(self._later):
+            self._touch(cat)
+
+    def __len__(self) -> int:
+        self._touch_all()
+        return len(self.where)
+
+    def __contains__(self, nid) -> bool:
+        if nid not in self.where and self._later:
+            self._touch_all()
+        return nid in self.where
+
+    # --- lookups --------------------------------------------------------------
+    def locate(self, nid: int) -> tuple[str, int]:
+        """(category, 0-based position) of note `nid`; KeyError if there is none."""
+        if nid not in self.where:
+            self._touch_all()
+        cat, slot = self.where[nid]
+        return cat, self.cats[cat].rank(slot)
+
+    def id_at(self, cat: str, pos: int) -> int:
+        """The id of the note at `pos` in `cat` (KeyError/IndexError if none)."""
+        self._touch(cat)
+        slots = self.cats[cat]
+        return slots.ids[slots.select(pos)]
+
+    def ids_of(self, cat: str) -> list[int]:
+        """The ids of `cat`, in note order."""
+        self._touch(cat)
+        slots = self.cats.get(cat)
+        return slots.live() if slots is not None else []
+
+    def to_dict(self, cats=None) -> dict[str, list[int]]:
+        """{category: [ids]} -- what gets saved next to the notes; with
+        `cats`, of those categories only."""
+        if cats is None:
+            self._touch_all()
+            cats = list(self.cats)
+        else:
+            for cat in cats:
+                self._touch(cat)
+        return {cat: self.cats[cat].live() for cat in cats if cat in self.cats}
+
+    # --- changes ----------------------------------------------------------------
+    def insert(self, cat: str, pos: int | None = None, nid: int | None = None) -> int:
+        """Give the note now at `pos` (None: the last one) id `nid` (None: the next free one)."""
+        self._touch(cat)
+        if nid is None or nid in self.where:
+            nid = self.next_id
+        self.next_id = max(self.next_id, nid + 1)
+        slots = self.cats.get(cat)
+        if slots is None:
+            slots = self.cats[cat] = _Slots()
+        if pos is None or pos >= len(slots):
+            self.where[nid] = (cat, slots.append(nid))
+            return nid
+        live = slots.live()   # into the middle: rare, rebuild the category
+        live.insert(max(pos, 0), nid)
+        self._fill(cat, live)
+        return nid
+
+    def remove(self, cat: str, pos: int) -> int:
+        """Forget the note at `pos` in `cat`; returns its id."""
+        self._touch(cat)
+        slots = self.cats[cat]
+        nid = slots.kill(slots.select(pos))
+        del self.where[nid]
+        if not len(slots):
+            del self.cats[cat]
+        elif slots.dead > COMPACT_MIN and slots.dead > len(slots):
+            self._fill(cat, slots.live())   # compaction: renumber the slots
+        return nid
+
+    def move(self, src: str, pos: int, dest: str) -> int:
+        """The note at `pos` in `src` went to the end of `dest`; same id."""
+        nid = self.remove(src, pos)
+        return self.insert(dest, None, nid)
+
+    def rename(self, old: str, new: str) -> None:
+        """Category `old` was renamed/merged into `new` (appended, same ids)."""
+        self._touch(old)
+        self._touch(new)
+        slots = self.cats.pop(old, None)
+        for nid in slots.live() if slots is not None else ():
+            del self.where[nid]
+            self.insert(new, None, nid)
+
+    # --- NoteHooks ----------------------------------------------------------------
+    def added(self, cat, pos, text):
+        self.insert(cat, pos)
+
+    def removed(self, cat, pos, text):
+        self.remove(cat, pos)
+
+    def moved(self, src, pos, dest, dest_pos, text):
+        self.move(src, pos, dest)
+
+    def renamed(self, old, new, offset, texts):
+        self.rename(old, new)
+
+    def reloaded(self, notes):
+        # the ids stored on disk are not known here: renumber without reuse
+        self.reset(notes, next_id=self.next_id)
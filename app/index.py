@@ -0,0 +1,270 @@
+from __future__ import annotations
+import sys
+from typing import Dict, List
+
+from .hooks import NoteHooks
+from .ids import COMPACT_MIN, _Slots
+from .utils import normalize
+
+NotesDict = Dict[str, List[str]]
+Location = tuple  # (category, 0-based position)
+Slot = tuple      # (category, slot): where a note's terms sit in rows[category]
+
+
+class PostingsIndex(NoteHooks):
+    """
+    Generic term -> notes index kept in step with `notes`.
+
+    Subclasses only decide which terms a note produces (`terms()`); adding
+    and removing postings is shared. A posting names its note by slot, not
+    by position: rows[category] keeps the terms of every note in slot order
+    (a _Slots, as NoteIds keeps ids), a removal only tombstones the slot, and
+    locate() turns a slot into the note's position through the live-flag
+    Fenwick tree. So a delete touches the postings of the note that went and
+    no other; the answers (where(), candidates(), ...) come in positions.
+    """
+
+    def __init__(self):
+        self.postings: dict[str, set[Slot]] = {}
+        self.rows: dict[str, _Slots] = {}
+
+    def terms(self, text: str) -> tuple[str, ...]:
+        raise NotImplementedError
+
+    @classmethod
+    def build(cls, notes: NotesDict, *args, **kwargs):
+        """Index every note currently in `notes`."""
+        index = cls(*args, **kwargs)
+        index.reloaded(notes)
+        return index
+
+    def __len__(self) -> int:
+        return sum(len(row) for row in self.rows.values())
+
+    # --- slots -> positions ---------------------------------------------------
+    def locate(self, slot: Slot) -> Location:
+        """(category, 0-based position) of the note in `slot`."""
+        cat, i = slot
+        return cat, self.rows[cat].rank(i)
+
+    def located(self, slots) -> set[Location]:
+        return {self.locate(slot) for slot in slots}
+
+    def row(self, slot: Slot) -> tuple[str, ...]:
+        """The terms of the note in `slot`."""
+        return self.rows[slot[0]].ids[slot[1]]
+
+    def positions(self) -> dict[str, set[Location]]:
+        """term -> {(category, position)}: the postings a fresh build would hold."""
+        return {t: self.located(slots) for t, slots in self.postings.items()}
+
+    # --- posting maintenance -------------------------------------------------
+    def _place(self, cat: str, slot: int, terms) -> None:
+        for t in terms:
+            self.postings.setdefault(t, set()).add((cat, slot))
+
+    def _unplace(self, cat: str, slot: int, terms) -> None:
+        for t in terms:
+            locs = self.postings.get(t)
+            if locs is None:
+                continue
+            locs.discard((cat, slot))
+            if not locs:
+                del self.postings[t]
+
+    def _compact(self, cat: str, insert: tuple | None = None) -> None:
+        """Renumber the slots of `cat` from 0 without the tombstones, putting
+        `insert` = (position, terms) in place on the way."""
+        old = self.rows.pop(cat)
+        rows = []
+        for slot, terms in enumerate(old.ids):
+            if terms is not None:
+                self._unplace(cat, slot, terms)
+                rows.append(terms)
+        if insert is not None:
+            rows.insert(*insert)
+        self.rows[cat] = _Slots(rows)
+        for slot, terms in enumerate(rows):
+            self._place(cat, slot, terms)
+
+    # --- NoteHooks ------------------------------------------------------------
+    def added(self, cat, pos, text):
+        terms = tuple(sys.intern(t) for t in self.terms(text))
+        row = self.rows.get(cat)
+        if row is None:
+            row = self.rows[cat] = _Slots()
+        if pos < len(row):   # slots only grow at the end: an insert renumbers (rare)
+            self._compact(cat, (pos, terms))
+            return
+        self._place(cat, row.append(terms), terms)
+
+    def removed(self, cat, pos, text):
+        row = self.rows.get(cat)
+        if not row or not (0 <= pos < len(row)):
+            return
+        slot = row.select(pos)
+        self._unplace(cat, slot, row.kill(slot))
+        if not row:
+            del self.rows[cat]
+        elif row.dead > COMPACT_MIN and row.dead > len(row):
+            self._compact(cat)
+
+    def edited(self, cat, pos, old, new):
+        row = self.rows.get(cat)
+        if not row or not (0 <= pos < len(row)):
+            return
+        slot = row.select(pos)
+        self._unplace(cat, slot, row.ids[slot])
+        row.ids[slot] = tuple(sys.intern(t) for t in self.terms(new))
+        self._place(cat, slot, row.ids[slot])
+
+    def renamed(self, old, new, offset, texts):
+        moving = self.rows.pop(old, None)
+        if not moving:
+            return
+        dest = self.rows.setdefault(new, _Slots())
+        for slot, terms in enumerate(moving.ids):
+            if terms is not None:
+                self._unplace(old, slot, terms)
+                self._place(new, dest.append(terms), terms)
+
+    def reloaded(self, notes):
+        self.postings, self.rows = {}, {}
+        for cat, items in notes.items():
+            for pos, text in enumerate(items):
+                self.added(cat, pos, text)
+#--------------------------------------------------------------------------------
+
+class SearchIndex(PostingsIndex):
+    """
+    Inverted index over the `normalize()` tokens of every note.
+
+    Used by `search_notes` to narrow the notes the regex has to look at.
+    A query token matches every indexed token that *contains* it, so the
+    candidates are a superset of what the substring search finds and the
+    regex pass stays the final judge (and the highlighter).
+
+    A row keeps every token of its note, repeats included, and `tokens`
+    counts them over all notes: with the postings (document frequency) that
+    is the term statistics ranked search needs (see ranking.py).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.tokens = 0   # sum of the note lengths, in tokens
+
+    def terms(self, text: str) -> tuple[str, ...]:
+        return tuple(normalize(text).split())
+
+    def _place(self, cat, slot, terms):
+        self.tokens += len(terms)
+        super()._place(cat, slot, terms)
+
+    def _unplace(self, cat, slot, terms):
+        self.tokens -= len(terms)
+        super()._unplace(cat, slot, terms)
+
+    def reloaded(self, notes):
+        self.tokens = 0
+        super().reloaded(notes)
+
+    def _matching(self, token: str) -> set[Slot]:
+        """Union of postings for every indexed token containing `token`."""
+        hits: set[Slot] = set()
+        for term, locs in self.postings.items():
+            if token in term:
+                hits |= locs
+        return hits
+
+    def candidates(self, term: str) -> set[Location] | None:
+        """
+        Locations that may contain `term`, by posting-list intersection.
+        Returns None when the term has no indexable token (e.g. "!!"), in
+        which case the caller has to scan.
+        """
+        tokens = normalize(term).split()
+        if not tokens:
+            return None
+        # longest tokens first: they match the fewest notes, so the
+        # intersection shrinks (and can stop) early
+        result: set[Slot] | None = None
+        for token in sorted(set(tokens), key=len, reverse=True):
+            hits = self._matching(token)
+            result = hits if result is None else result & hits
+            if not result:
+                return set()
+        return self.located(result)
+#--------------------------------------------------------------------------------
+
+class KeyIndex(PostingsIndex):
+    """
+    Refcounted normalized-key -> {(category, position)} map.
+
+    A drop-in for the `seen` set (`key in seen`, `len`, iteration over keys)
+    that also answers *where* a key lives and *how many* notes share it, so
+    finding a duplicate or syncing after a delete is a dict lookup instead
+    of a scan. It must see every mutation: pass it as `seen` (the mutators
+    fold it into their hooks) or put it in the HookList yourself.
+    """
+
+    def terms(self, text: str) -> tuple[str, ...]:
+        return (normalize(text),)
+
+    def __contains__(self, key) -> bool:
+        return key in self.postings
+
+    def __iter__(self):
+        return iter(self.postings)
+
+    def __len__(self) -> int:
+        return len(self.postings)
+
+    def where(self, key: str) -> set[Location]:
+        """All locations of notes whose normalized text is `key`."""
+        return self.located(self.postings.get(key, ()))
+
+    def count(self, key: str) -> int:
+        return len(self.postings.get(key, ()))
+#--------------------------------------------------------------------------------
+
+def trigrams(token: str) -> list[str]:
+    """Padded 3-grams of one token: "dog" -> ["  d", " do", "dog", "og "]."""
+    padded = f"  {token} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class TrigramIndex(SearchIndex):
+    """
+    A SearchIndex that also maps trigram -> vocabulary tokens, for
+    typo-tolerant search (see fuzzy.py): the tokens close to a query token
+    are found among the distinct tokens, and their notes in the postings.
+    Tokens whose last note is gone are dropped from the trigram map lazily,
+    by the query that runs into them.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.grams: dict[str, set[str]] = {}
+        self.vocab: set[str] = set()
+
+    def _place(self, cat, slot, terms):
+        for t in terms:
+            if t not in self.vocab:
+                self.vocab.add(t)
+                for g in trigrams(t):
+                    self.grams.setdefault(g, set()).add(t)
+        super()._place(cat, slot, terms)
+
+    def forget(self, token: str) -> None:
+        """Drop a token that no note uses any more from the trigram map."""
+        self.vocab.discard(token)
+        for g in trigrams(token):
+            words = self.grams.get(g)
+            if words is not None:
+                words.discard(token)
+                if not words:
+                    del self.grams[g]
+
+    def reloaded(self, notes):
+        self.grams, self.vocab = {}, set()
+        super().reloaded(notes)
@@ -0,0 +1,608 @@
+from __future__ import annotations
+import json
+import os
+import re
+import threading
+from typing import Dict, List
+
+from .hooks import NoteHooks
+from .ids import NoteIds
+from .locking import FileLock
+from .profiling import span, traced
+from .shards import ShardedNotes, is_sharded, load_shards, read_manifest
+from .snapshot import is_snapshot, load_snapshot, read_meta
+from .utils import Note, load_notes_safe, normalize, trace
+
+NotesDict = Dict[str, List[str]]
+
+# Write-ahead journal
+# Instead of rewriting the whole notes file after every change, each mutation
+# is appended to <journal> as one JSON line:
+#   {"seq": 7, "op": "add",    "cat": "work", "text": "...", "id": 42}
+#   {"seq": 8, "op": "delete", "cat": "work", "pos": 0, "text": "...", "id": 42}
+#   {"seq": 9, "op": "edit",   "cat": "work", "pos": 0, "old": "...", "text": "...", "id": 42}
+#   {"seq": 10, "op": "move",  "cat": "work", "pos": 0, "dest": "home", "text": "...", "id": 42}
+#   {"seq": 11, "op": "rename", "cat": "home", "dest": "general"}
+# On load the snapshot is read and every op newer than the snapshot's
+# "journal_seq" is replayed. The note ids (ids.py) are saved with the
+# snapshot ("ids", "next_note_id") and each op records the id it touched, so
+# every session arrives at the same ids; older files without them get ids
+# numbered in note order. Once enough ops pile up, the journal is rotated to
+# <journal>.old and a fresh snapshot is written in a background thread.
+#
+# Several sessions may share one journal and snapshot. Writers hold the
+# advisory lock <journal>.lock (locking.py) around each append and around
+# the quick parts of a compaction (rotating the journal, then dropping
+# <journal>.old once the snapshot is in place); readers never take it. The
+# slow snapshot write runs without it, so appends go on meanwhile. Only one
+# session compacts at a time: <journal>.compact.lock is held from the
+# rotation to the end of the write, and a session that finds it taken
+# leaves the compaction to the one holding it. Before appending, a writer checks whether
+# the journal grew or was rotated since it last wrote. If so, another session
+# got there first: the writer reloads the latest state, re-applies its own op
+# on top (found by its text, re-checked for duplicates -- see rebase_op) and
+# appends that, or drops it with a warning when it no longer applies. Each
+# snapshot carries an "etag", bumped by every compaction, which a compaction
+# checks before it overwrites the snapshot.
+#
+# The journal also knows which categories no op touched since the snapshot
+# (`stored`, under their name in it -- a rename alone keeps a category
+# unchanged). A compaction into a shard directory hands that on, so
+# save_shards() keeps those shards as they are instead of encoding them again.
+
+OPEN_RETRIES = 10   # lock-free loads raced by a compaction are simply redone
+_ETAG_HEAD = re.compile(rb'\{\s*"etag"\s*:\s*(\d+)')
+
+
+def apply_op(notes: NotesDict, op: dict, ids: NoteIds | None = None) -> None:
+    """Replay one journal op onto `notes` (no prompts, no prints), and onto `ids`."""
+    kind = op["op"]
+    cat = op["cat"]
+    if kind == "add":
+        notes.setdefault(cat, []).append(Note(op["text"]))
+    elif kind == "delete":
+        cat_list = notes[cat]
+        cat_list.pop(op["pos"])
+        if not cat_list:
+            del notes[cat]
+    elif kind == "edit":
+        notes[cat][op["pos"]] = Note(op["text"])
+    elif kind == "move":
+        removed = notes[cat].pop(op["pos"])
+        notes.setdefault(op["dest"], []).append(removed)
+    elif kind == "rename":
+        src = notes.pop(cat)
+        notes.setdefault(op["dest"], []).extend(src)
+    else:
+        raise ValueError(f"unknown journal op {kind!r}")
+    if ids is not None:
+        track_op(ids, op)
+
+
+def track_op(ids: NoteIds, op: dict) -> None:
+    """Follow an op (already applied to the notes) in `ids`; op["id"] is set
+    to the id of the note it concerns -- for an add, the one it keeps or gets."""
+    kind, cat = op["op"], op["cat"]
+    if kind == "add":
+        op["id"] = ids.insert(cat, None, op.get("id"))
+    elif kind == "delete":
+        op["id"] = ids.remove(cat, op["pos"])
+    elif kind == "edit":
+        op["id"] = ids.id_at(cat, op["pos"])
+    elif kind == "move":
+        op["id"] = ids.move(cat, op["pos"], op["dest"])
+    elif kind == "rename":
+        ids.rename(cat, op["dest"])
+
+
+def follow_op(stored: dict, op: dict, merged: bool = False) -> None:
+    """
+    Keep `stored` (category -> its name in the snapshot, for the categories
+    unchanged since) in step with an op; `merged`: a rename into a category
+    that already had notes.
+    """
+    kind, cat = op["op"], op["cat"]
+    src = stored.pop(cat, None)
+    if kind == "move":
+        stored.pop(op["dest"], None)
+    elif kind == "rename":
+        stored.pop(op["dest"], None)
+        if src is not None and not merged:
+            stored[op["dest"]] = src
+
+
+def _merges(notes: NotesDict, op: dict) -> bool:
+    return op["op"] == "rename" and bool(notes.get(op["dest"]))
+
+
+def _key(text) -> str:
+    return text.key if isinstance(text, Note) else normalize(text)
+
+
+def locate_note(notes: NotesDict, cat: str, pos: int, text: str) -> int:
+    """Position of `text` in notes[cat]: `pos` if it is still there, else searched by key."""
+    if cat not in notes:
+        raise ValueError(f"category {cat!r} is gone")
+    items = notes[cat]
+    if 0 <= pos < len(items) and items[pos] == text:
+        return pos
+    key = normalize(text)
+    for i, n in enumerate(items):
+        if _key(n) == key:
+            return i
+    raise ValueError(f"{text!r} is no longer in {cat!r}")
+
+
+def rebase_op(notes: NotesDict, op: dict) -> dict:
+    """
+    `op`, made against an older state, as it applies to `notes` now: positions
+    are found again by the note's text and adds/edits are re-checked against
+    every note for normalized duplicates. Raises ValueError if it no longer
+    applies (the note is gone, or another session added the same text).
+    """
+    kind, cat = op["op"], op["cat"]
+    if kind in ("add", "edit"):
+        key = normalize(op["text"])
+        if (kind == "add" or key != normalize(op["old"])) and \
+                any(_key(n) == key for items in notes.values() for n in items):
+            raise ValueError(f"{op['text']!r} was added by another session")
+    if kind in ("delete", "edit", "move"):
+        return {**op, "pos": locate_note(notes, cat, op["pos"], op["old"] if kind == "edit" else op["text"])}
+    if kind == "rename" and cat not in notes:
+        raise ValueError(f"category {cat!r} is gone")
+    return op
+#--------------------------------------------------------------------------------
+
+def read_ops(path: str):
+    """Yield the ops in a journal file; a torn last line (crash mid-write) ends it."""
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                trace("journal %s: stopping at unreadable line %r", path, line[:40])
+                return
+#--------------------------------------------------------------------------------
+
+def _read_journal(path: str) -> tuple[list[dict], int | None, int]:
+    """(ops, inode, length of the complete lines) of a journal, read in one go."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return [], None, 0
+    with f:
+        ino = os.fstat(f.fileno()).st_ino
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    ops = []
+    for line in data[:end].splitlines():
+        try:
+            ops.append(json.loads(line))
+        except json.JSONDecodeError:
+            trace("journal %s: stopping at unreadable line %r", path, line[:40])
+            break
+    return ops, ino, end
+
+
+def _inode(path: str) -> int | None:
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+#--------------------------------------------------------------------------------
+
+def _trim_torn_tail(path: str) -> None:
+    """Cut a half-written last line so new ops don't get glued onto it."""
+    try:
+        with open(path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+    except FileNotFoundError:
+        pass
+#--------------------------------------------------------------------------------
+
+def read_snapshot(path: str, on_category=None, meta: dict | None = None) -> tuple[NotesDict, int]:
+    """
+    Return (notes, journal_seq) from a snapshot; seq is 0 for plain files.
+    `meta` receives "next_note_id" and "ids": a function giving the stored
+    ids of a category (None where there are none). Shards and binary
+    snapshots are read lazily: "lazy" is set, `on_category` is not called
+    (it would read them all) and "later" tells the categories whose ids
+    NoteIds may leave unread (see NoteIds.reset).
+    """
+    meta = {} if meta is None else meta
+    if not os.path.exists(path):
+        return {}, 0
+    if is_sharded(path):
+        notes = load_shards(path)
+        meta["next_note_id"] = int(notes.manifest.get("next_note_id", 1) or 1)
+        meta.update(ids=notes.id_reader(), later=notes.stores_ids, lazy=True)
+        return notes, int(notes.manifest.get("journal_seq", 0) or 0)
+    if is_snapshot(path):
+        # binary snapshot (snapshot.py): mapped, notes are decoded when read
+        notes = load_snapshot(path, meta)
+        meta["lazy"] = True
+        return notes, meta["journal_seq"]
+    notes = load_notes_safe(path, on_category, meta)
+    if meta.get("shape") != "wrapped":
+        return notes, 0
+    ids = meta.get("ids")
+    meta["ids"] = ids.get if isinstance(ids, dict) else None
+    meta["next_note_id"] = int(meta.get("next_note_id", 1) or 1)
+    return notes, int(meta.get("journal_seq", 0) or 0)
+
+
+def snapshot_etag(path: str) -> int:
+    """
+    The "etag" of a snapshot without loading it: from the shard manifest, the
+    header of a binary snapshot, or from the head of a JSON snapshot (the journal writes it first). 0 for
+    a missing snapshot or one that has none.
+    """
+    try:
+        if is_sharded(path):
+            return int(read_manifest(path).get("etag", 0) or 0)
+        if is_snapshot(path):
+            return read_meta(path)["etag"]
+        with open(path, "rb") as f:
+            m = _ETAG_HEAD.match(f.read(256))
+    except (OSError, ValueError):
+        return 0
+    return int(m.group(1)) if m else 0
+#--------------------------------------------------------------------------------
+
+class Journal(NoteHooks):
+    """
+    Append-only journal + snapshot storage engine.
+
+    Every mutation costs one small appended line; fsync is batched every
+    `sync_every` ops (and on close). After `compact_ops` ops or
+    `compact_bytes` bytes the journal is folded into a new snapshot.
+    `peers` (e.g. the indexes) are told via reloaded() when another
+    session's changes replace the notes; put the journal after them in a
+    HookList.
+    """
+
+    def __init__(self, path: str = "notes.journal", snapshot: str = "notes.json",
+                 sync_every: int = 32, compact_ops: int = 1000,
+                 compact_bytes: int = 1 << 20):
+        self.path = path
+        self.old_path = path + ".old"
+        self.snapshot = snapshot
+        self.sync_every = sync_every
+        self.compact_ops = compact_ops
+        self.compact_bytes = compact_bytes
+        self.notes: NotesDict = {}
+        self.ids = NoteIds()     # kept in step with every op we log or replay
+        self.stored: dict[str, str] = {}   # see follow_op()
+        self.peers: NoteHooks | None = None
+        self.seq = 0
+        self.etag = 0            # of the snapshot our notes are based on
+        self.lock = FileLock(path + ".lock")   # between sessions (processes)
+        self.compact_lock = FileLock(path + ".compact.lock")   # one compaction at a time
+        self._f = None
+        self._ino: int | None = None   # journal file and length as we last left them
+        self._size = 0
+        self._unsynced = 0
+        self._ops = 0
+        self._bytes = 0
+        self._lock = threading.Lock()  # between threads; taken after self.lock
+        self._compactor: threading.Thread | None = None
+        self._writing = False   # a snapshot of ours is being written
+
+    def open(self, on_category=None, into=None) -> NotesDict:
+        """
+        Load the snapshot, replay the journal on top and start appending.
+        `on_category(cat, notes)` sees each category of a JSON snapshot as it
+        streams in. With `into` (e.g. an empty NotesStore) the notes of a JSON
+        snapshot are moved there and that mapping is returned instead of a
+        dict; shards and binary snapshots are returned as loaded, so that only
+        the categories used get read (see read_snapshot).
+        Takes no lock: a load that raced a compaction is redone.
+        """
+        for attempt in range(OPEN_RETRIES):
+            etag, ino = snapshot_etag(self.snapshot), _inode(self.path)
+            notes, replayed, read_ino, size = self._load(on_category)
+            if (etag, ino) == (snapshot_etag(self.snapshot), read_ino):
+                break
+            trace("journal: snapshot replaced while loading, retry %d", attempt + 1)
+        if into is not None and not self.lazy:
+            for cat in list(notes):   # move category by category to keep the peak low
+                into[cat] = notes.pop(cat)
+            notes = into
+        self.notes = notes
+        self.etag = etag
+        self._ops = replayed
+        self._f = open(self.path, "ab")
+        # compared by the next write; a torn tail differs and is cut under the lock
+        self._ino = read_ino if read_ino is not None else os.fstat(self._f.fileno()).st_ino
+        self._size = size
+        self._bytes = self._f.tell()
+        return notes
+
+    def _load(self, on_category=None) -> tuple[NotesDict, int, int | None, int]:
+        """Snapshot + newer ops: (notes, ops replayed, journal inode, journal length).
+        self.ids is rebuilt to match the returned notes."""
+        meta: dict = {}
+        notes, base = read_snapshot(self.snapshot, on_category, meta)
+        self.lazy = meta.get("lazy", False)
+        self.ids.reset(notes, meta.get("ids"), meta.get("next_note_id", 1), meta.get("later"))
+        self.stored = {cat: cat for cat in notes}
+        self.seq = base
+        replayed = 0
+        ops, ino, size = _read_journal(self.path)
+        with span("journal.replay"):
+            for op in (*read_ops(self.old_path), *ops):
+                seq = int(op.get("seq", 0))
+                if seq <= base:
+                    continue  # already folded into the snapshot
+                follow_op(self.stored, op, _merges(notes, op))
+                try:
+                    apply_op(notes, op, self.ids)
+                except (KeyError, IndexError, ValueError) as e:
+                    print(f"[WARN] Skipping journal op {seq}: {type(e).__name__}: {e}")
+                self.seq = max(self.seq, seq)
+                replayed += 1
+        trace("journal: snapshot seq %d, replayed %d op(s)", base, replayed)
+        return notes, replayed, ino, size
+
+    # --- other sessions ---------------------------------------------------------
+    def _changed_elsewhere(self) -> bool:
+        """Did another session append or compact since we last wrote? (self.lock held)"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return st.st_ino != self._ino or st.st_size != self._size
+
+    def _reload(self, keep=()) -> None:
+        """
+        Replace our notes, in place, by the latest state on disk (both locks
+        held). Category lists are refilled rather than replaced, and the
+        categories in `keep` stay even if empty: a running mutator (bulk_add)
+        may hold on to them.
+        """
+        _trim_torn_tail(self.path)
+        self.etag = snapshot_etag(self.snapshot)
+        notes, self._ops, _, _ = self._load()
+        if isinstance(self.notes, ShardedNotes) and isinstance(notes, ShardedNotes):
+            self.notes.adopt(notes, keep)   # the same, and the unread categories stay unread
+        else:
+            for cat in list(self.notes):
+                if cat in keep:
+                    self.notes[cat].clear()
+                elif cat not in notes:
+                    del self.notes[cat]
+            for cat in list(notes):
+                fresh = notes.pop(cat)
+                items = self.notes.get(cat)
+                if items is None:
+                    self.notes[cat] = fresh
+                else:   # refill the same list: a running mutator may hold it
+                    items.clear()
+                    items.extend(fresh)
+        self._f.close()
+        self._f = open(self.path, "ab")
+        self._ino = os.fstat(self._f.fileno()).st_ino
+        self._size = self._bytes = self._f.tell()
+        self._unsynced = 0
+        trace("journal: reloaded changes of another session (seq %d)", self.seq)
+
+    def _rebase(self, op: dict) -> dict | None:
+        """After _reload(): re-apply our own `op` on top, or drop it."""
+        try:
+            op = rebase_op(self.notes, op)
+            follow_op(self.stored, op, _merges(self.notes, op))
+            apply_op(self.notes, op, self.ids)
+        except (KeyError, IndexError, ValueError) as e:
+            print(f"[WARN] Another session changed the notes first: {e}. Your {op['op']} was not saved.")
+            op = None
+        if self.peers is not None:
+            self.peers.reloaded(self.notes)
+        return op
+
+    # --- writing ----------------------------------------------------------------
+    def append(self, op: dict, merged: bool = False) -> None:
+        """Log `op`, already applied to our notes (`merged`: see follow_op)."""
+        with self.lock, self._lock:
+            if self._changed_elsewhere():
+                self._reload(keep=(op["cat"], op.get("dest")))
+                op = self._rebase(op)
+                if op is None:
+                    return
+            else:
+                track_op(self.ids, op)
+                follow_op(self.stored, op, merged)
+            self.seq += 1
+            line = (json.dumps({"seq": self.seq, **op}, ensure_ascii=False) + "\n").encode("utf-8")
+            self._f.write(line)
+            self._f.flush()          # survives a crash of this process...
+            self._size += len(line)
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every:
+                self._sync()         # ...and, in batches, of the machine
+            self._ops += 1
+            self._bytes += len(line)
+            due = self._ops >= self.compact_ops or self._bytes >= self.compact_bytes
+        if due:
+            self.compact()
+
+    def _sync(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._unsynced = 0
+
+    def sync(self) -> None:
+        with self._lock:
+            self._sync()
+
+    # --- compaction -------------------------------------------------------------
+    def compact(self, wait: bool = False) -> None:
+        """
+        Rotate the journal and write a snapshot of the current notes.
+        The snapshot is taken here; the (slow) file write runs in a thread
+        unless `wait` is set. Appends are not held up by the write.
+        """
+        with self._lock:
+            if self._busy():
+                return  # one at a time; the next trigger will catch up
+        args = self._begin()
+        if args is None:
+            return
+        self._compactor = threading.Thread(target=self._finish, args=args, daemon=True)
+        self._compactor.start()
+        if wait:
+            self._compactor.join()
+
+    def checkpoint(self) -> tuple[NotesDict, int, int, dict] | None:
+        """
+        First half of a compaction, for callers that run the write on their
+        own thread (see autosave.py): rotate the journal and copy the notes.
+        Pass the result to write_checkpoint(). None if a compaction is
+        already under way.
+        """
+        with self._lock:
+            if self._f is None or self._busy():
+                return None
+        return self._begin(checkpoint=True)
+
+    def write_checkpoint(self, checkpoint: tuple[NotesDict, int, int, dict]) -> bool:
+        """Second half: write the snapshot. On failure the journal is kept."""
+        try:
+            return self._write_snapshot(*checkpoint)
+        finally:
+            self._done_writing()
+
+    def _busy(self) -> bool:
+        return self._writing or (self._compactor is not None and self._compactor.is_alive())
+
+    def _begin(self, checkpoint: bool = False) -> tuple[NotesDict, int, int, dict] | None:
+        """Take the compaction lock, catch up with other sessions and rotate
+        (under the session lock, released again before returning). On success
+        the compaction lock stays held for _finish()/write_checkpoint()."""
+        if not self.compact_lock.try_acquire():
+            trace("journal: another session is compacting")
+            return None
+        try:
+            with self.lock, self._lock:
+                if self._f is None or self._busy():
+                    self.compact_lock.release()
+                    return None
+                if self._changed_elsewhere() or snapshot_etag(self.snapshot) != self.etag:
+                    self._reload()
+                    if self.peers is not None:
+                        self.peers.reloaded(self.notes)
+                args = self._rotate()
+                self._writing = True
+                return args
+        except BaseException:
+            self.compact_lock.release()
+            raise
+
+    def _finish(self, snapshot: NotesDict, seq: int, etag: int, ids: dict) -> None:
+        try:
+            self._write_snapshot(snapshot, seq, etag, ids)
+        finally:
+            self._done_writing()
+
+    def _done_writing(self) -> None:
+        with self._lock:
+            self._writing = False
+        self.compact_lock.release()
+
+    def _rotate(self) -> tuple[NotesDict, int, int, dict]:
+        """Copy the notes and their ids and move the journal aside (caller holds both locks)."""
+        if isinstance(self.notes, ShardedNotes):
+            # the unread categories are kept as they are, with their ids
+            snapshot = self.notes.copy()
+            cat_ids = self.ids.to_dict(snapshot.loaded())
+        else:
+            # lists and packed categories copy cheaply; anything else is listed
+            snapshot = {cat: items.copy() if hasattr(items, "copy") else list(items)
+                        for cat, items in self.notes.items()}
+            cat_ids = self.ids.to_dict()
+        ids = {"next_note_id": self.ids.next_id, "ids": cat_ids, "stored": self.stored}
+        self.stored = {cat: cat for cat in snapshot}   # from now on relative to this snapshot
+        seq = self.seq
+        self._sync()
+        self._f.close()
+        if os.path.exists(self.old_path):
+            # a previous compaction did not finish: keep its ops too
+            with open(self.old_path, "ab") as old, open(self.path, "rb") as cur:
+                old.write(cur.read())
+            os.remove(self.path)
+        elif os.path.exists(self.path):
+            os.replace(self.path, self.old_path)
+        self._f = open(self.path, "ab")
+        self._ino = os.fstat(self._f.fileno()).st_ino
+        self._ops = self._bytes = self._size = self._unsynced = 0
+        return snapshot, seq, self.etag + 1, ids
+
+    @traced(name="journal.compact")
+    def _write_snapshot(self, snapshot: NotesDict, seq: int, etag: int, ids: dict) -> bool:
+        from .notes_app import save_notes  # notes_app imports this module
+
+        # the compaction lock keeps other sessions from writing one meanwhile;
+        # should a snapshot we are not based on turn up anyway, keep the journal
+        if snapshot_etag(self.snapshot) != etag - 1:
+            print(f"[WARN] {self.snapshot} was replaced by another session; journal kept.")
+            self._forget_stored()
+            return False
+        # etag first: snapshot_etag() reads it from the head of the file
+        data = {"etag": etag, "journal_seq": seq, "next_note_id": ids["next_note_id"],
+                "notes": snapshot, "ids": ids["ids"]}
+        if is_sharded(self.snapshot):
+            data["stored"] = ids["stored"]   # shards that need not be encoded again
+        if not save_notes(data, self.snapshot):
+            print(f"[WARN] Could not write snapshot {self.snapshot}; journal kept.")
+            self._forget_stored()
+            return False
+        # under the session lock: a session reloading meanwhile reads the old
+        # snapshot with <journal>.old or the new one, never the old one without
+        with self.lock, self._lock:
+            self.etag = etag
+            try:
+                os.remove(self.old_path)
+            except FileNotFoundError:
+                pass
+        trace("journal: compacted up to seq %d (etag %d)", seq, etag)
+        return True
+
+    def _forget_stored(self) -> None:
+        """The snapshot `stored` was made relative to never got written."""
+        with self._lock:
+            self.stored = {}
+
+    def close(self, compact: bool = True) -> None:
+        if self._f is None:
+            return
+        if self._compactor is not None:
+            self._compactor.join()
+        if compact:
+            self.compact(wait=True)
+        with self._lock:
+            self._sync()
+            self._f.close()
+            self._f = None
+        self.lock.close()
+        self.compact_lock.close()
+
+    # --- NoteHooks ----------------------------------------------------------------
+    def added(self, cat, pos, text):
+        self.append({"op": "add", "cat": cat, "text": text})
+
+    def removed(self, cat, pos, text):
+        self.append({"op": "delete", "cat": cat, "pos": pos, "text": text})
+
+    def edited(self, cat, pos, old, new):
+        self.append({"op": "edit", "cat": cat, "pos": pos, "old": old, "text": new})
+
+    def moved(self, src, pos, dest, dest_pos, text):
+        self.append({"op": "move", "cat": src, "pos": pos, "dest": dest, "text": text})
+
+    def renamed(self, old, new, offset, texts):
+        self.append({"op": "rename", "cat": old, "dest": new}, merged=offset > 0)
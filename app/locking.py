@@ -0,0 +1,130 @@
+from __future__ import annotations
+import os
+import threading
+
+from .utils import trace
+
+try:
+    import fcntl
+except ImportError:   # Windows: no advisory locks, sessions are not guarded
+    fcntl = None
+
+# Advisory writer lock
+# Sessions that write the same notes take an exclusive flock() on a small
+# side file (e.g. notes.journal.lock) around each write. Only writers lock:
+# every file a reader looks at is replaced atomically, so a reader always sees
+# a whole old or a whole new version and never waits.
+#
+# Reader lock
+# A reader that opens files later, by name (a shard directory read one
+# category at a time), holds a shared flock() on a side file for as long as
+# it may do so. Whoever wants to delete files that are no longer current
+# checks with try_exclusive() that no other session holds it.
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on `path`, for one process and its threads.
+
+    The lock is not tied to the acquiring thread: one thread may acquire it
+    and hand it to another to release (see Journal.compact). Not reentrant.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mutex = threading.Lock()   # flock() does not exclude our own threads
+        self._fd: int | None = None
+
+    def acquire(self) -> None:
+        self._mutex.acquire()
+        if fcntl is None:
+            return
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                trace("lock %s: waiting for another session", self.path)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._mutex.release()
+            raise
+
+    def try_acquire(self) -> bool:
+        """acquire() without waiting: False if another thread or session holds it."""
+        if not self._mutex.acquire(blocking=False):
+            return False
+        if fcntl is None:
+            return True
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            self._mutex.release()
+            return False
+        except BaseException:
+            self._mutex.release()
+            raise
+
+    def release(self) -> None:
+        try:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._mutex.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+    def close(self) -> None:
+        """Drop the file descriptor (the lock file itself stays)."""
+        with self._mutex:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+#--------------------------------------------------------------------------------
+
+class SharedLock:
+    """
+    Shared advisory lock on `path`, taken on creation and held until close().
+    Any number of sessions hold it at once. Not thread-safe by itself.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: int | None = None
+        if fcntl is not None:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_SH)   # waits only for a try_exclusive() holder
+
+    def try_exclusive(self) -> bool:
+        """Make the lock exclusive if no other session holds it (True), else
+        stay shared (False). Callers must not race each other here: the
+        conversion drops the shared lock for a moment."""
+        if self._fd is None:
+            return True
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            self.shared()
+            return False
+
+    def shared(self) -> None:
+        """Back to shared after try_exclusive()."""
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_SH)
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,135 @@
+from __future__ import annotations
+import functools
+import hashlib
+from array import array
+from typing import Dict, List
+
+from .index import PostingsIndex
+from .profiling import traced
+from .utils import Note, normalize
+
+NotesDict = Dict[str, List[str]]
+
+# Near-duplicate detection (MinHash + LSH)
+# A note is reduced to the set of its normalize() tokens, so word order and
+# punctuation do not matter, and two notes are near-duplicates when the
+# Jaccard similarity of their sets reaches a threshold. MinHash gives each
+# note a short signature in which every position agrees between two notes
+# with probability equal to their Jaccard similarity. The signature is cut
+# into BANDS bands of ROWS values and each band is hashed into a bucket:
+# notes sharing any bucket are candidates (likely from Jaccard ~0.4 up,
+# 99% at 0.6), and the exact Jaccard of their token sets decides. No
+# pairwise comparison over the whole store is needed.
+
+BANDS, ROWS = 20, 3
+THRESHOLD = 0.6
+_WIDTH = BANDS * ROWS * array("I").itemsize   # hash bytes per token: one value per MinHash slot
+
+
+def token_set(text: str) -> frozenset[str]:
+    key = text.key if isinstance(text, Note) else normalize(text)
+    return frozenset(key.split())
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _token_hashes(token: str) -> array:
+    """BANDS * ROWS independent 32-bit hashes of one token (the same in every
+    run), from a single SHAKE-128 digest; cached since vocabularies repeat."""
+    return array("I", hashlib.shake_128(token.encode("utf-8")).digest(_WIDTH))
+
+
+def minhash(tokens) -> list[int]:
+    """BANDS * ROWS MinHash values of a token set (empty list for no tokens)."""
+    if not tokens:
+        return []
+    return list(map(min, *map(_token_hashes, tokens))) if len(tokens) > 1 \
+        else list(_token_hashes(next(iter(tokens))))
+
+
+def band_keys(signature: list[int]) -> tuple[str, ...]:
+    """One bucket key per band; equal keys mean an identical band."""
+    return tuple(f"{b}:{hash(tuple(signature[b * ROWS:(b + 1) * ROWS]))}"
+                 for b in range(BANDS)) if signature else ()
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+#--------------------------------------------------------------------------------
+
+class NearDupIndex(PostingsIndex):
+    """
+    LSH bucket -> notes, kept in step with the notes by the mutation hooks
+    like the other indexes. near() answers "which notes look like this
+    text" from a handful of buckets.
+    """
+
+    def __init__(self, threshold: float = THRESHOLD):
+        super().__init__()
+        self.threshold = threshold
+
+    def terms(self, text: str) -> tuple[str, ...]:
+        return band_keys(minhash(token_set(text)))
+
+    def near(self, notes: NotesDict, text: str, threshold: float | None = None) -> list[tuple[float, str, int]]:
+        """(similarity, category, 0-based position) of the notes whose token
+        set is at least `threshold` Jaccard-similar to `text`, most similar first."""
+        threshold = self.threshold if threshold is None else threshold
+        tokens = token_set(text)
+        found = []
+        for cat, pos in self.located({slot for key in self.terms(text) for slot in self.postings.get(key, ())}):
+            items = notes.get(cat)
+            if items is None or pos >= len(items):
+                continue
+            sim = jaccard(tokens, token_set(items[pos]))
+            if sim >= threshold:
+                found.append((sim, cat, pos))
+        order = {cat: i for i, cat in enumerate(notes)}
+        return sorted(found, key=lambda f: (-f[0], order[f[1]], f[2]))
+#--------------------------------------------------------------------------------
+
+@traced
+def find_clusters(notes: NotesDict, threshold: float = THRESHOLD,
+                  index: NearDupIndex | None = None) -> list[list[tuple[str, int]]]:
+    """
+    Groups of near-duplicate notes across the whole store, as lists of
+    (category, 0-based position), biggest group first. Linear in the number
+    of notes: each note is hashed once and only notes sharing an LSH bucket
+    are compared -- each with the first note of the bucket, which is enough
+    to join the groups since near-duplicates share several buckets.
+    """
+    index = index if index is not None else NearDupIndex.build(notes)
+    parent: dict = {}
+
+    def find(x):
+        while parent.get(x, x) != x:
+            parent[x] = parent.get(parent[x], parent[x])   # path halving
+            x = parent[x]
+        return x
+
+    sets: dict = {}
+
+    def tokens(slot):
+        s = sets.get(slot)
+        if s is None:
+            cat, pos = index.locate(slot)
+            s = sets[slot] = token_set(notes[cat][pos])
+        return s
+
+    for locs in index.postings.values():
+        if len(locs) < 2:
+            continue
+        first, *rest = sorted(locs)
+        for loc in rest:
+            if find(loc) != find(first) and jaccard(tokens(first), tokens(loc)) >= threshold:
+                root = find(first)
+                parent.setdefault(root, root)
+                parent[find(loc)] = root
+
+    groups: dict = {}
+    for slot in parent:   # slots sort like positions within a category, so the grouping is the same
+        groups.setdefault(find(slot), []).append(index.locate(slot))
+    order = {cat: i for i, cat in enumerate(notes)}
+    clusters = [sorted(g, key=lambda loc: (order[loc[0]], loc[1])) for g in groups.values() if len(g) > 1]
+    return sorted(clusters, key=lambda g: (-len(g), order[g[0][0]], g[0][1]))
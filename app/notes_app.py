@@ -1,11 +1,34 @@
 
 "from os import remove"
-import os, json
+import os, json, sys
+import contextlib
 from typing import Dict, List
 import re
-from .utils import normalize
+from collections.abc import Iterable, Mapping, MutableSet
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from .utils import normalize, normalize_many
 from .utils import load_notes_safe
 from .utils import trace
+from .profiling import traced
+from .utils import Note
+from .streaming import iter_notes
+from .snapshot import is_snapshot, load_snapshot, write_snapshot
+from .shards import ShardedNotes, ensure_sharded, is_sharded, load_shards, save_shards
+from .sqlite_store import SqliteStore, is_sqlite, load_sqlite, save_sqlite
+from .streaming import META_KEYS
+from .hooks import HookList, LazyIndex, NoteHooks
+from .aggregates import VERIFY as VERIFY_STATS, NoteStats   # NOTES_VERIFY_STATS env switch
+from .ids import NoteIds
+from .index import KeyIndex, SearchIndex, TrigramIndex
+from .fuzzy import fuzzy_matches
+from .neardup import NearDupIndex
+from .paging import more, write_paged
+from .parallel import ParallelSearch
+from .query import QueryError, compile_query
+from .journal import Journal, locate_note
+from .autosave import Autosaver
+from .store import NotesStore
 
 NotesDict = Dict[str, List[str]]
 
@@ -28,17 +51,46 @@ def show_menu():
 """)
 #----------------------------------------------------------
 
-def load_notes(path: str = "notes.json") -> tuple[NotesDict, set[str]]:
+@traced
+def load_notes(path: str = "notes.json", on_category=None) -> tuple[NotesDict, set[str]]:
     """
     Return notes as {category: [notes...]}.
     Handle:
       - Missing file
       - Corrupt JSON
       - Migration from old list -> {"General": [...]}
+    The file is streamed; `on_category(cat, notes)` is called as each
+    category is decoded, before the rest of the file has been read.
     """
+    if is_sharded(path):
+        # shard directory: categories are read when first used
+        notes = load_shards(path)
+        return notes, LazySeen(notes)
+
+    if is_sqlite(path):
+        # SQLite database (see sqlite_store.py); open a SqliteStore to write through
+        notes = load_sqlite(path)
+        return notes, LazySeen(notes)
+
+    if is_snapshot(path):
+        # binary snapshot: mmap it, notes are decoded only when read
+        notes = load_snapshot(path)
+        if on_category is not None:
+            for cat, items in notes.items():
+                on_category(cat, items)
+        return notes, LazySeen(notes)
+
+    meta: dict = {}
+    notes: NotesDict = {}
     try:
         with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+            # Legacy schemas (old flat list -> single "general" bucket) and the
+            # {"notes": {...}, "seen": [...]} form are unwrapped by iter_notes
+            for k, v in iter_notes(f, str, meta):
+                key = str(k).strip().lower()
+                notes[key] = v if isinstance(v, list) else [str(v)]
+                if on_category is not None:
+                    on_category(key, notes[key])
     except FileNotFoundError:
         notes: NotesDict = {}
         seen: set[str] = set()
@@ -47,42 +99,18 @@ def load_notes(path: str = "notes.json") -> tuple[NotesDict, set[str]]:
         print("Warning: notes file corrupted or empty. Starting fresh.")
         notes: NotesDict = {}
         return notes, build_seen(notes)
-# Optional: if someday you save {"notes": {...}, "seen": []}, support it here.
-    if isinstance(data, dict) and "notes" in data:
-        raw_notes = data.get("notes", {})
-        raw_seen = data.get("seen", [])
-        notes ={}
-        for k, v in raw_notes.items():
-            key = str(k).strip().lower()
-            if isinstance(v, list):
-              notes[key] = [str(x) for x in v]
-            else:
-              notes[key] = [str(v)]
 
+    if meta.get("shape") == "wrapped":
     # seen comes from file but we still constrain it to only notes that exist
-        file_seen = {str(x) for x in raw_seen}
+        file_seen = {str(x) for x in meta.get("seen") or []}
         computed_seen = build_seen(notes)
         seen = file_seen & computed_seen if file_seen else computed_seen
         return notes, seen
 
-    # Legacy schemas:
-    if isinstance(data, list):
-        # old flat list -> single "general" bucket
-        notes = {"general": [str(x) for x in data]}
-    elif isinstance(data, dict):
-        notes = {}
-        for k, v in data.items():
-            key = str(k).strip().lower()
-            if isinstance(v, list):
-                notes[key] = [str(x) for x in v]
-            else:
-                notes[key] = [str(v)]
-    else:
-        notes = {}
-
     return notes, build_seen(notes)
 #----------------------------------------------------------------------------------
  
+@traced
 def save_notes(notes: dict, filename: str = "data/notes.json") -> bool:
     """
     Safe save:
@@ -90,8 +118,25 @@ def save_notes(notes: dict, filename: str = "data/notes.json") -> bool:
       2) write JSON to <filename>.tmp,
       3) os.replace(tmp, filename).
     Returns True on success, False on failure.
+    A shard directory (see shards.py) is saved incrementally instead, an
+    SQLite database (sqlite_store.py) in one transaction, and a binary
+    snapshot (snapshot.py, *.snap) as a new snapshot.
     """
-    trace(f"enter save_notes ({filename})")
+    binary = filename.endswith(".snap") or is_snapshot(filename)
+    if is_sharded(filename) or is_sqlite(filename) or binary:
+        meta = None
+        if isinstance(notes.get("notes"), Mapping) and set(notes) <= {"notes", "stored", *META_KEYS}:
+            notes, meta = notes["notes"], notes   # the journal's wrapped snapshot
+        if is_sqlite(filename):
+            return save_sqlite(notes, filename, (meta or {}).get("ids"))
+        if binary:
+            try:
+                write_snapshot(notes, filename, meta)
+            except OSError as e:
+                print(f"[ERROR] Could not write snapshot {filename}: {e}")
+                return False
+            return True
+        return save_shards(notes, filename, meta)
 
     # 1) ensure target folder exists
     folder = os.path.dirname(filename) or "."
@@ -105,7 +150,7 @@ def save_notes(notes: dict, filename: str = "data/notes.json") -> bool:
     tmp = filename + ".tmp"
     try:
         with open(tmp, "w", encoding="utf-8") as f:
-            json.dump(notes, f, indent=2)
+            json.dump(notes, f, indent=2, default=_jsonable)
     except Exception as e:
         trace(f"write tmp failed: {type(e).__name__}: {e}")
         # do not attempt replace if tmp write failed
@@ -123,7 +168,6 @@ def save_notes(notes: dict, filename: str = "data/notes.json") -> bool:
     # 3) atomic replace
     try:
         os.replace(tmp, filename)
-        trace("exit save_notes (ok)")
         return True
     except Exception as e:
         trace(f"replace failed: {type(e).__name__}: {e}")
@@ -135,54 +179,212 @@ def save_notes(notes: dict, filename: str = "data/notes.json") -> bool:
             trace(f"tmp cleanup failed: {type(cleanup_err).__name__}: {cleanup_err}")
         return False
 
+def _jsonable(obj):
+    """json.dump fallback for NotesStore / packed or lazy categories."""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    return list(obj)
 #----------------------------------------------------------------------------------
-def find_note(notes: NotesDict, text: str):
+def _with_seen(seen, hooks: NoteHooks | None) -> NoteHooks | None:
+    """A KeyIndex used as `seen` must follow every mutation: fold it into the hooks."""
+    if not isinstance(seen, KeyIndex) or hooks is seen:
+        return hooks
+    if hooks is None:
+        return seen
+    if isinstance(hooks, HookList) and any(h is seen for h in hooks.hooks):
+        return hooks
+    return HookList([seen, hooks])
+#----------------------------------------------------------------------------------
+def find_note(notes: NotesDict, text: str, seen: KeyIndex | None = None):
     """
     If a normalized duplicate exists anywhere, return (category, one_based_index).
-    Otherwise return None.
+    Otherwise return None. With a KeyIndex this is a lookup, not a scan.
     """
     target = normalize(text)
+    if seen is not None:
+        locs = seen.where(target)
+        if not locs:
+            return None
+        if len(locs) > 1:  # same answer as the scan: first in dict order
+            order = {cat: i for i, cat in enumerate(notes)}
+            locs = [min(locs, key=lambda loc: (order.get(loc[0], len(order)), loc[1]))]
+        cat, pos = next(iter(locs))
+        return (cat, pos + 1)
     for cat, items in notes.items():
         for i, n in enumerate(items, 1):
             if normalize(n) == target:
                 return (cat, i)
     return None
 #--------------------------------------------------------------------------------
-def add_note(notes: NotesDict, text: str, category: str, seen: set[str]) -> None:
-    trace("enter add_note")
+@traced
+def add_note(notes: NotesDict, text: str, category: str, seen: set[str] | KeyIndex,
+             hooks: NoteHooks | None = None, near: NearDupIndex | None = None) -> bool:
+    """
+    Add `text` to `category` unless it is empty or a normalized duplicate.
+    With a `near` index, notes that are worded almost the same (same words
+    in another order, one word more or less...) are listed as a warning;
+    the note is still added.
+    """
+    hooks = _with_seen(seen, hooks)
 
     category = (category or "General").strip().lower()
     text = text.strip()
     if not text:
         print("Empty note, cancelled.")
-        return
+        return False
 
     key = normalize(text)
     if key in seen:
         print("Duplicate note. Not added!")
-        return
-
+        return False
+    text = Note(text, key)   # key travels with the note from now on
+    if near is not None:
+        warn_near(notes, text, near)
 
         # if no duplicate, add as usual
-    notes.setdefault(category, []).append(text)
-    seen.add(key)
+    cat_list = notes.setdefault(category, [])
+    cat_list.append(text)
+    if isinstance(seen, MutableSet):
+        seen.add(key)
+    if hooks is not None:
+        hooks.added(category, len(cat_list) - 1, text)
     print(f"Note added to {category}.")
-    trace("exit add_note")
+    return True
+
+
+NEAR_SHOWN = 3
+
+
+def warn_near(notes: NotesDict, text: str, near: NearDupIndex) -> list:
+    """Print the notes `near` finds similar to `text`; returns them."""
+    similar = near.near(notes, text)
+    if similar:
+        print("[WARN] Similar note(s) already exist:")
+        for sim, cat, pos in similar[:NEAR_SHOWN]:
+            print(f"  {sim:.0%} {cat}: {pos + 1}. {notes[cat][pos]}")
+        if len(similar) > NEAR_SHOWN:
+            print(f"  ... and {len(similar) - NEAR_SHOWN} more")
+    return similar
 #-----------------------------------------------------------------------
-def show_notes_grouped(notes: NotesDict) -> None:
-    """Show notes grouped by category."""
+BULK_CHUNK = 10_000   # texts normalized per step
+
+
+@traced
+def bulk_add(notes: NotesDict, texts: Iterable[str], category: str, seen: set[str] | KeyIndex,
+             hooks: NoteHooks | None = None, workers: int = 0,
+             chunk_size: int = BULK_CHUNK) -> dict[str, int]:
+    """
+    add_note for a whole stream of texts: same rules (strip, skip empty,
+    skip normalized duplicates -- against `seen` and within the batch),
+    but no per-note print. `texts` is consumed in chunks, each normalized in
+    one pass (spread over `workers` processes when the input is large).
+    Returns {"added": n, "duplicates": n, "empty": n}.
+    """
+    hooks = _with_seen(seen, hooks)
+    category = (category or "General").strip().lower()
+    summary = {"added": 0, "duplicates": 0, "empty": 0}
+    cat_list = None           # created on the first note actually added
+    plain_set = isinstance(seen, MutableSet)
+    pool = None
+    it = iter(texts)
+    try:
+        while True:
+            chunk = [t.strip() for t in islice(it, chunk_size)]
+            if not chunk:
+                break
+            if pool is None and workers > 1 and len(chunk) == chunk_size:
+                pool = ProcessPoolExecutor(workers)   # not worth starting for small inputs
+            if pool is not None:
+                step = len(chunk) // workers + 1
+                keys = [k for part in pool.map(normalize_many, [chunk[i:i + step]
+                        for i in range(0, len(chunk), step)]) for k in part]
+            else:
+                keys = normalize_many(chunk)
+            for text, key in zip(chunk, keys):
+                if not text:
+                    summary["empty"] += 1
+                    continue
+                if key in seen:   # also catches repeats inside this batch
+                    summary["duplicates"] += 1
+                    continue
+                if cat_list is None:
+                    cat_list = notes.setdefault(category, [])
+                note = Note(text, key)
+                cat_list.append(note)
+                if plain_set:
+                    seen.add(key)
+                if hooks is not None:
+                    hooks.added(category, len(cat_list) - 1, note)
+                summary["added"] += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return summary
+#-----------------------------------------------------------------------
+def iter_grouped(notes: NotesDict, start: int = 0):
+    """
+    Yield (category, 0-based position, note) in display order, from the
+    `start`-th note on; an empty category yields (category, -1, None).
+    Whole categories before `start` are skipped by their count, unread.
+    """
+    if start < 0:
+        raise ValueError(f"start must be 0 or more, not {start}")
+    counts = category_counts(notes) if start else {}
+    for cat in notes:
+        n = counts.get(cat)
+        if n is not None and start >= max(n, 1):
+            start -= max(n, 1)
+            continue
+        items = notes[cat]
+        if not items:
+            yield cat, -1, None
+        for pos in range(start, len(items)):
+            yield cat, pos, items[pos]
+        start = 0
+
+
+def _id_tag(ids: NoteIds | None, cat: str, pos: int) -> str:
+    """"[#id] " before a listed note when ids are shown."""
+    return "" if ids is None else f"[#{ids.id_at(cat, pos)}] "
+
+
+def _grouped_page(ids: NoteIds | None = None):
+    """render() for write_paged: a heading wherever the category changes."""
+    last = None
+
+    def render(page) -> str:
+        nonlocal last
+        lines = []
+        for cat, pos, note in page:
+            if cat != last:
+                lines.append(f"\n{cat.upper()}:")
+                last = cat
+            lines.append("  (no notes)" if note is None else f"{pos + 1}. {_id_tag(ids, cat, pos)}{note}")
+        return "\n".join(lines) + "\n"
+    return render
+
+
+def show_notes_grouped(notes: NotesDict, offset: int = 0, limit: int | None = None,
+                       pause=None, ids: NoteIds | None = None) -> int:
+    """Show notes grouped by category, a page at a time (see paging.py).
+    `offset`/`limit` pick a window of notes; with `ids` each note shows its
+    id. Returns the number shown."""
     if not notes:
         print("(no notes yet)")
-        return
-    for cat, items in notes.items():
-        print(f"\n{cat.upper()}:")
-        show_numbered(items)
+        return 0
+    return write_paged(iter_grouped(notes, offset), _grouped_page(ids), limit=limit, pause=pause)
 #---------------------------------------------------------------------------
-def delete_note(notes: NotesDict, category: str, idx_one_based: int, seen: set[str]) -> str | None:
-    trace("enter delete_note")
+@traced
+def delete_note(notes: NotesDict, category: str, idx_one_based: int, seen: set[str] | KeyIndex,
+                hooks: NoteHooks | None = None, ask: bool = True, lock=None) -> str | None:
+    """Delete notes[category][idx_one_based], after confirmation unless ask=False.
+    `lock` is held around the delete itself only, not while asking."""
+    hooks = _with_seen(seen, hooks)
     try:
         idx = idx_one_based - 1
         cat_list = notes[category]
+        if idx < 0:
+            raise IndexError(idx_one_based)  # 0 / negatives would wrap to the end
         note_to_remove = cat_list[idx]
     except KeyError:
         print("no such category")
@@ -191,61 +393,136 @@ def delete_note(notes: NotesDict, category: str, idx_one_based: int, seen: set[s
         print("That number doesn't exist")
         return None
     
-# Shows what will be deleted
-    print(f"About to delete: '{note_to_remove}' from '{category}':")
-    if not confirm("Are you sure you want to delete this note? (y/n):"):
-       print("Canceled!")
-       return None
-    
+# Shows what will be deleted (batch callers pass ask=False)
+    if ask:
+        print(f"About to delete: '{note_to_remove}' from '{category}':")
+        if not confirm("Are you sure you want to delete this note? (y/n):"):
+           print("Canceled!")
+           return None
+
+    with lock or contextlib.nullcontext():
+        idx = _relocate(notes, category, idx, note_to_remove)
+        if idx is None:
+            return None
+
 #Safe to delete now
-    removed = cat_list.pop(idx)
+        cat_list = notes[category]
+        removed = cat_list.pop(idx)
 
 # IF category is now empty, remove category
     
-    if not cat_list:
-        del notes[category]
+        if not cat_list:
+            del notes[category]
+        if hooks is not None:
+            hooks.removed(category, idx, removed)
 
 #Sync the seen set (only discard if that text no longer exists anywhere) 
+# (a KeyIndex is refcounted and already synced by the hooks above)
 
-    norm = removed.lower()      
-    still_exists = any(norm in[n.strip().lower()for n in items] for items in notes.values())
+        if isinstance(seen, MutableSet):
+            norm = normalize(removed)
+            still_exists = any(normalize(n) == norm for items in notes.values() for n in items)
 
-    if not still_exists:
-        seen.discard(norm)
-    trace("exit delete_note")
+            if not still_exists:
+                seen.discard(norm)
     return removed
 
+
+def _relocate(notes: NotesDict, category: str, idx: int, text: str) -> int | None:
+    """
+    Where the note the user picked is now (the lock held): while they were
+    answering, an autosave checkpoint may have loaded another session's
+    changes. `idx` if the note is still there, else found again by its key
+    (as the journal rebases its ops); None, with a message, when it is gone.
+    """
+    try:
+        return locate_note(notes, category, idx, text)
+    except ValueError as e:
+        print(f"The notes changed meanwhile: {e}. Nothing done.")
+        return None
+
     
 
 #------------------------------------------------------------------------------
-def search_notes(notes: NotesDict, term: str) -> None:
+def iter_matches(notes: NotesDict, term: str, index: SearchIndex | None = None,
+                 parallel: ParallelSearch | None = None):
+    """
+    Yield (category, 0-based position, note) for every note matching the
+    query `term` (see query.py; plain text: the notes containing it,
+    case-insensitive), in display order. With an index, only its candidates
+    are checked; without one, `parallel` spreads a large scan over
+    processes. QueryError for a malformed query.
+    """
+    query = compile_query(term)
+    if index is None and parallel is not None:
+        yield from parallel.matches(notes, term)
+        return
+    yield from query.matches(notes, index)
+
+
+@traced
+def search_notes(notes: NotesDict, term: str, index: SearchIndex | None = None,
+                 fuzzy: TrigramIndex | None = None, offset: int = 0,
+                 limit: int | None = None, pause=None, ids: NoteIds | None = None,
+                 parallel: ParallelSearch | None = None) -> None:
+    """Print the notes matching the query `term` (plain text: the notes
+    containing it; AND/OR/NOT, "phrases", cat: and /regex/, see query.py),
+    a page at a time (`offset`/`limit`
+    pick a window of the results, `ids` adds their ids, `parallel` scans
+    without an index on several cores); with a trigram index, the closest
+    notes (typos allowed, see fuzzy.py) when nothing contains it."""
     term = term.strip()
     if not term:
         print("Empty search.")
         return
 
-    # Compile regex for case-insensitive search
-    pattern = re.compile(re.escape(term), re.IGNORECASE)
-    found = False
+    try:
+        query = compile_query(term)
+    except QueryError as e:
+        print(f"Bad query: {e}")
+        return
+    mark = query.highlight.sub if query.highlight is not None else None
+
+    def render(page) -> str:
+        return "".join(f"found in {cat}: {pos + 1}. {_id_tag(ids, cat, pos)}"
+                       f"{mark(lambda m: f'[{m.group(0)}]', note) if mark else note}\n"
+                       for cat, pos, note in page)
 
-    for cat, items in notes.items():            # outer loop
-        for i, note in enumerate(items, 1):     # inner loop
-            if pattern.search(note):
-               highlighted = pattern.sub(lambda m:f"[{m.group(0)}]", note)
-               print(f"found in {cat}: {i}. {highlighted}")
-               found = True
+    found = write_paged(iter_matches(notes, term, index, parallel), render, offset, limit, pause=pause) > 0
+    if not found and offset:
+        print(f"No results after the first {offset}.")
+        return
 
+    if not found and fuzzy is not None and query.plain:
+        close = fuzzy_matches(notes, term, fuzzy)
+        if close:
+            print("No exact results. Closest notes:")
+            show_fuzzy(close)
+            return
     if not found:
         print("No results.")
+
+
+def show_fuzzy(matches) -> None:
+    """Print fuzzy_matches() results with their edit distance."""
+    for dist, cat, pos, note in matches:
+        print(f"  ~{dist} {cat}: {pos + 1}. {note}")
+
+
+def show_ranked(matches) -> None:
+    """Print ranked_matches() results with their score."""
+    for score, cat, pos, note in matches:
+        print(f"  {score:5.2f} {cat}: {pos + 1}. {note}")
 #---------------------------------------------------------------------------------
-def move_note(notes: NotesDict, seen: set[str]) -> str | None:
-    trace("enter move_note")
+def move_note(notes: NotesDict, seen: set[str] | KeyIndex, hooks: NoteHooks | None = None,
+              lock=None) -> str | None:
     """
    Move a single note from one category to another, with preview + confirmation.
 
     Args:
         notes: Mapping of category -> list of notes (both treated case-insensitively).
         seen:  Global set of lowercase note texts used to enforce case-insensitive uniqueness.
+        lock:  Held around the move itself only, not while prompting.
 
     Returns:
         The moved note's exact text on success; None on cancel or when no change is performed.
@@ -268,36 +545,85 @@ def move_note(notes: NotesDict, seen: set[str]) -> str | None:
     try:
         idx_raw = input("Which note # to move?").strip()
         idx = int(idx_raw) -1
+        if idx < 0:
+            raise IndexError(idx)
         note_text = notes[src][idx]
     except (ValueError, IndexError):
         print("Invalid selection.")
         return None
   
     dest = input("To which category?").strip().lower()
+    if _check_move(notes, src, idx, dest, seen) is None:
+        return None
+    if not _confirm_move(note_text, src, dest):
+        return None
+    with lock or contextlib.nullcontext():
+        idx = _relocate(notes, src, idx, note_text)
+        return None if idx is None else move_note_to(notes, src, idx + 1, dest, seen, hooks)
+#--------------------------------------------------------------------------------
+@traced
+def move_note_to(notes: NotesDict, src: str, idx_one_based: int, dest: str,
+                 seen: set[str] | KeyIndex, hooks: NoteHooks | None = None,
+                 ask: bool = False) -> str | None:
+    """
+    Move notes[src][idx_one_based] to the end of `dest` without prompting
+    for the details (move_note asks for them). With ask=True a preview is
+    shown and confirmation required. Returns the moved text or None.
+    """
+    hooks = _with_seen(seen, hooks)
+    src = src.strip().lower()
+    dest = dest.strip().lower()
+    src_list = notes.get(src)
+    if not src_list:
+        print(f"No notes in '{src}' (or category mising).")
+        return None
+    idx = idx_one_based - 1
+    if not 0 <= idx < len(src_list):
+        print("Invalid selection.")
+        return None
+    note_text = _check_move(notes, src, idx, dest, seen)
+    if note_text is None:
+        return None
+    if ask and not _confirm_move(note_text, src, dest):
+        return None
+
+# Perform mutation after confirmation only
+    removed = src_list.pop(idx)
+    dest_list = notes.setdefault(dest, [])
+    dest_list.append(removed)
+    if hooks is not None:
+        hooks.moved(src, idx, dest, len(dest_list) - 1, removed)
+
+#Optional: clean up empty source category
+    return removed
+
+
+def _check_move(notes: NotesDict, src: str, idx: int, dest: str, seen) -> str | None:
+    """The guards of move_note_to: the note to move, or None (with a message)."""
+    note_text = notes[src][idx]
     if dest == src:
         print("Note is alredy in that category!")
         return None
     
 # Prevents duplicates in destination
-    dest_list = notes.setdefault(dest,[])    
-    if any(n.lower() == note_text.lower() for n in dest_list): # Blocks any dupplicates
+    if isinstance(seen, KeyIndex):
+        dup = any(cat == dest for cat, _ in seen.where(normalize(note_text)))
+    else:
+        dup = any(n.lower() == note_text.lower() for n in notes.get(dest, []))
+    if dup: # Blocks any dupplicates
         print("A note with the same text already exists! Note blocked.")
         return None
+    return note_text
 
+
+def _confirm_move(note_text: str, src: str, dest: str) -> bool:
     print("\nPreview:")
     print(f"  Move: {note_text!r}")
     print(f"  From: '{src}' to: '{dest}'")
     if not confirm("Proceed with move? (y/n) "):
         print("Cancelled!")
-        return None
-
-# Perform mutation after confirmation only
-    removed = notes[src].pop(idx)
-    dest_list.append(removed)
-
-#Optional: clean up empty source category
-    trace("exit move_note")
-    return removed
+        return False
+    return True
 
 #--------------------------------------------------------------------------------
 def list_categories(notes: NotesDict) -> None:
@@ -307,7 +633,8 @@ def list_categories(notes: NotesDict) -> None:
     for cat in sorted(notes, key=str.lower):
         print("-", cat)
 #---------------------------------------------------------------------------
-def rename_category(notes: NotesDict, old: str, new: str) -> None:
+@traced
+def rename_category(notes: NotesDict, old: str, new: str, hooks: NoteHooks | None = None) -> None:
     old = (old or "").strip().lower()
     new = (new or "General").strip().lower()
 
@@ -318,24 +645,35 @@ def rename_category(notes: NotesDict, old: str, new: str) -> None:
         print("Nothing to rename.")
         return
 
-    try:
-        src = notes.pop(old)   # what if old category doesn’t exist?
-    except KeyError:
+    if old not in notes:   # what if old category doesn’t exist?
         print("No such category.")
         return
 
-    notes.setdefault(new, []).extend(src)
+    if isinstance(notes, ShardedNotes) and new not in notes:
+        # manifest-level: the shard keeps its file and is not even read
+        notes.rename(old, new)
+        if hooks is not None:
+            hooks.renamed(old, new, 0, notes[new])
+        print(f"Renamed/moved {notes.count(new)} note(s) from {old} → {new}.")
+        return
+
+    src = notes.pop(old)
+    dest = notes.setdefault(new, [])
+    offset = len(dest)
+    dest.extend(src)
+    if hooks is not None:
+        hooks.renamed(old, new, offset, src)
     print(f"Renamed/moved {len(src)} note(s) from {old} → {new}.")
 #--------------------------------------------------------------------------------
-def merge_category(notes: NotesDict, source: str, target: str) -> None:
+def merge_category(notes: NotesDict, source: str, target: str, hooks: NoteHooks | None = None) -> None:
   # merging is just renaming source → target (append if target exists)
-    rename_category(notes, source, target)
+    rename_category(notes, source, target, hooks)
 #------------------------------------------------------------------------------
-def show_stats(notes: NotesDict) -> None:
+def show_stats(notes: NotesDict, stats: NoteStats | None = None) -> None:
     if not notes:
         print("(no notes yet)")
         return
-    counts = {cat: len(items) for cat, items in notes.items()}
+    counts = category_counts(notes, stats)
     total = sum(counts.values())
     for cat in sorted(counts, key=str.lower):
         print(f"{cat}: {counts[cat]} note(s)")
@@ -349,8 +687,69 @@ def build_seen(notes: NotesDict) -> set[str]:
             s.add(normalize(n))
     return s
 #-------------------------------------------------------------------------------
-def edit_note(notes: NotesDict, seen: set[str]):
-    trace("enter edit_note")
+class LazySeen(MutableSet):
+    """
+    build_seen(notes), computed the first time the set is actually used.
+    A wrapper rather than a set subclass: set's C fast paths (set(x),
+    s.update(x), comparisons) would read the empty base set directly.
+    """
+
+    def __init__(self, notes: NotesDict):
+        self._pending = notes
+        self._keys: set[str] | None = None
+
+    @property
+    def keys(self) -> set[str]:
+        if self._keys is None:
+            self._keys = build_seen(self._pending)
+            self._pending = None
+        return self._keys
+
+    def __contains__(self, key) -> bool:
+        return key in self.keys
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key) -> None:
+        self.keys.add(key)
+
+    def discard(self, key) -> None:
+        self.keys.discard(key)
+
+    def update(self, keys) -> None:
+        self.keys.update(keys)
+
+    def __repr__(self):
+        return "LazySeen(pending)" if self._keys is None else f"LazySeen({self._keys!r})"
+#-------------------------------------------------------------------------------
+def check_seen(notes: NotesDict, seen: KeyIndex) -> list[str]:
+    """
+    Cross-check a KeyIndex against the notes it claims to describe.
+    Returns a list of problems (empty when consistent).
+    """
+    problems = []
+    expected = build_seen(notes)
+    for key in expected - set(seen):
+        problems.append(f"missing key {key!r}")
+    for key in set(seen) - expected:
+        problems.append(f"stale key {key!r}")
+    total = 0
+    for key in seen:
+        for cat, pos in seen.where(key):
+            total += 1
+            items = notes.get(cat, [])
+            if not (0 <= pos < len(items)) or normalize(items[pos]) != key:
+                problems.append(f"{key!r} points at {cat}[{pos}] which does not match")
+    if total != sum(len(items) for items in notes.values()):
+        problems.append(f"refcounts add up to {total}, notes hold {sum(len(i) for i in notes.values())}")
+    return problems
+#-------------------------------------------------------------------------------
+def edit_note(notes: NotesDict, seen: set[str] | KeyIndex, hooks: NoteHooks | None = None, lock=None):
+    """Ask for a note and its new text, then edit_note_text() it (only that under `lock`)."""
     category = input("In which category would you like to edit a note? ").strip().lower()
 
     if category not in notes:
@@ -381,9 +780,60 @@ def edit_note(notes: NotesDict, seen: set[str]):
 
     # Step 4: ask for new text
     new_text = input(f"New text for note '{old_note}': ").strip()
+    if _check_edit(old_note, new_text, seen) is None or not _confirm_edit(old_note, new_text):
+        return False
+    with lock or contextlib.nullcontext():
+        pos = _relocate(notes, category, idx - 1, old_note)
+        return pos is not None and edit_note_text(notes, category, pos + 1, new_text, seen, hooks)
+#---------------------------------------------------------------------------------
+@traced
+def edit_note_text(notes: NotesDict, category: str, idx_one_based: int, new_text: str,
+                   seen: set[str] | KeyIndex, hooks: NoteHooks | None = None,
+                   ask: bool = False) -> bool:
+    """
+    Replace notes[category][idx_one_based] with `new_text` (no prompts for
+    the details; edit_note asks for them). Same guards as edit_note; with
+    ask=True the change must be confirmed. Returns True if the note changed.
+    """
+    hooks = _with_seen(seen, hooks)
+    cat_notes = notes.get(category)
+    if cat_notes is None:
+        print("Category not found!")
+        return False
+    idx = idx_one_based
+    if not (1 <= idx <= len(cat_notes)):
+        print("Invalid input! Please enter a number.")
+        return False
+    old_note = cat_notes[idx - 1]
+
+    new_text = new_text.strip()
+    keys = _check_edit(old_note, new_text, seen)
+    if keys is None:
+        return False
+    old_key, new_key = keys
+
+    # Confirm before mutating
+    if ask and not _confirm_edit(old_note, new_text):
+        return False
+
+    # Mutate + sync seen
+    new_text = Note(new_text, new_key)
+    cat_notes[idx - 1] = new_text # keep the user's original text
+    if isinstance(seen, MutableSet):
+        seen.discard(old_key)
+        seen.add(new_key)
+    if hooks is not None:
+        hooks.edited(category, idx - 1, old_note, new_text)
+
+    print(f"Updated note {idx} in '{category}': '{old_note}' → '{new_text}'")
+    return True
+
+
+def _check_edit(old_note: str, new_text: str, seen) -> tuple[str, str] | None:
+    """The guards of edit_note_text: (old key, new key), or None (with a message)."""
     if not new_text:
         print("Empty text canceled.")
-        return False
+        return None
 
     old_key = normalize(old_note)
     new_key = normalize(new_text)
@@ -391,41 +841,30 @@ def edit_note(notes: NotesDict, seen: set[str]):
     # no-op guard
     if new_key == old_key:
         print("No change- text is the same (case-insensitive).")
-        return False
+        return None
     
-    all_keys = set()
-    for _, items in notes.items():
-        for n in items:
-            all_keys.add(normalize(n))
-    all_keys.discard(old_key) # allow replacing this note: we already checked
-
-    if new_key in all_keys:
+    # seen holds every key in the app; new_key != old_key was checked above
+    if new_key in seen:
         print("That text already exists (normalized). Edit canceled!")
-        return False     
+        return None
+    return old_key, new_key
 
-    # Confirm before mutating
+
+def _confirm_edit(old_note: str, new_text: str) -> bool:
     print(f"About to change: '{old_note}' → '{new_text}'")
     if not confirm("Apply edit? (y/n): "):
         print("Cancelled.")
-        return False       
-
-    # Mutate + sync seen
-    cat_notes[idx - 1] = new_text # keep the user's original text
-    seen.discard(old_key)
-    seen.add(new_key)
-
-    print(f"Updated note {idx} in '{category}': '{old_note}' → '{new_text}'")
-    trace("exit edit_note")
+        return False
     return True
     
 #---------------------------------------------------------------------------------
-def show_numbered(notes_list: list[str]):
-    """Show a list of notes numbered 1, 2, 3..."""
+def show_numbered(notes_list: list[str], pause=None):
+    """Show a list of notes numbered 1, 2, 3..., a page at a time."""
     if not notes_list:
         print("  (no notes)")
         return
-    for i, note in enumerate(notes_list, start=1):
-        print(f"{i}. {note}")
+    write_paged(enumerate(notes_list, start=1),
+                lambda page: "".join(f"{i}. {note}\n" for i, note in page), pause=pause)
 #--------------------------------------------------------------------------------
 def confirm(prompt: str) -> bool:
     ans= input(prompt).strip().lower()
@@ -435,29 +874,115 @@ def list_unique_categories(notes: NotesDict)-> set[str]:
     categories = {cat for cat in notes}
     return categories
 #--------------------------------------------------------------------------------
-def category_counts(notes: NotesDict) -> dict[str, int]:
+def category_counts(notes: NotesDict, stats: NoteStats | None = None) -> dict[str, int]:
+    if stats is not None:   # running totals, see aggregates.py
+        counts = stats.note_counts(notes)
+        return stats.checked(notes, counts, category_counts(notes), "counts") if VERIFY_STATS else counts
+    if isinstance(notes, ShardedNotes):   # from the manifest, shards stay unread
+        return {cat: notes.count(cat) for cat in notes}
     counts = {cat : len(items) for cat, items in notes.items()}
     return counts
 #--------------------------------------------------------------------------------
-def category_note_lengths(notes: NotesDict) -> dict[str, int]:
+def category_note_lengths(notes: NotesDict, stats: NoteStats | None = None) -> dict[str, int]:
+    if stats is not None:
+        lengths = stats.note_lengths(notes)
+        return stats.checked(notes, lengths, category_note_lengths(notes), "lengths") if VERIFY_STATS else lengths
     lengths = {cat: sum(len(n) for n in items) for cat, items in notes.items()}
     return lengths
 #---------------------------------------------------------------------------------
-def category_word_counts(notes: NotesDict, word: str) -> dict[str, int]:
+def category_word_counts(notes: NotesDict, word: str, stats: NoteStats | None = None) -> dict[str, int]:
+    if stats is not None:   # scanned once per word, then kept by the hooks
+        counts = stats.substring_counts(notes, word)
+        return stats.checked(notes, counts, category_word_counts(notes, word), f"substring {word!r}") if VERIFY_STATS else counts
     word = word.lower()
     counts = {}
     for cat, items in notes.items():
         counts[cat] = sum(1 for note in items if word in note.lower())
     return counts
+#---------------------------------------------------------------------------------
+def category_token_counts(notes: NotesDict, word: str, stats: NoteStats | None = None) -> dict[str, int]:
+    """Notes per category containing `word` as a whole normalized word (unlike
+    category_word_counts, "urgent" does not count "urgently")."""
+    key = normalize(word)
+    if stats is not None and len(key.split()) == 1:   # the word tables, see aggregates.py
+        counts = stats.token_counts(notes, key)
+        return stats.checked(notes, counts, category_token_counts(notes, key), f"words {key!r}") if VERIFY_STATS else counts
+    return {cat: sum(1 for note in items if key in normalize(note).split()) for cat, items in notes.items()}
 
 # ------------------------------
 # Main loop
 # ------------------------------
 
+DB_PATH = "notes.db"   # when this database exists the app runs on it instead
+SNAP_PATH = "notes.snap"   # likewise a binary snapshot: the journal compacts into it
+SHARDS_PATH = "notes.d"
+
+
+def storage_path() -> str:
+    """The storage main() runs on: DB_PATH when it is a database, else
+    SNAP_PATH when it is a binary snapshot, else the SHARDS_PATH directory.
+    The batch commands default to the same, so notes.journal is only ever
+    compacted into one snapshot."""
+    if os.path.exists(DB_PATH) and is_sqlite(DB_PATH):
+        return DB_PATH
+    return SNAP_PATH if is_snapshot(SNAP_PATH) else SHARDS_PATH
+
+
 def main():
-    notes = load_notes_safe("notes.json")
-    seen = build_seen(notes)
+    snapshot = storage_path()
+    if snapshot == DB_PATH:
+        return main_sqlite(DB_PATH)
+    # every change is appended to notes.journal; the changed categories in
+    # notes.d/ (or notes.snap, mapped rather than parsed: see snapshot.py) are
+    # rewritten when the journal is compacted: by the autosaver once edits go
+    # quiet, when the journal grows large, and on exit
+    if snapshot == SHARDS_PATH:
+        ensure_sharded(snapshot, legacy="notes.json")   # one file per category, see shards.py
+    journal = Journal("notes.journal", snapshot)
+
+    def first_loaded(cat, items):   # big files: say something before the rest is parsed
+        if not first_loaded.done:
+            first_loaded.done = True
+            print(f"Loading notes... '{cat}' ready ({len(items)} note(s)).")
+    first_loaded.done = False
+    # a JSON file is packed into the NotesStore (store.py); shards and notes.snap
+    # are read only as far as the categories used
+    notes = journal.open(on_category=first_loaded, into=NotesStore())
+    # built on first use, so a session that never asks does not read every shard
+    seen = LazyIndex(KeyIndex, notes)       # key -> locations, replaces build_seen()
+    index = LazyIndex(TrigramIndex, notes)  # both kept in sync by the mutators below; the
+                                            # search index also serves typo-tolerant search
+    stats = LazyIndex(NoteStats, notes)     # running totals behind show_stats
+    journal.peers = HookList([seen, index, stats])   # rebuilt when another session's changes are loaded
+    autosave = Autosaver(journal.checkpoint, journal.write_checkpoint, fallback=journal.sync)
+    hooks = HookList([seen, index, stats, journal, autosave])
+    mutating = autosave.lock           # held around each change so autosave copies a consistent state
 
+    try:
+        _menu_loop(notes, seen, index, hooks, mutating, fuzzy=index, stats=stats)
+    finally:
+        # flush synchronously, also on Ctrl-C / EOF
+        saved = autosave.close()
+        journal.close(compact=not saved)
+    print("Saved. Bye!")
+
+
+def main_sqlite(path: str):
+    """The menu on an SQLite database: every change is its own transaction,
+    duplicates are refused by the unique key index, search goes through FTS5."""
+    store = SqliteStore(path)
+    notes = store.load(into=NotesStore())
+    fuzzy = TrigramIndex.build(notes)
+    stats = NoteStats.build(notes)
+    try:
+        _menu_loop(notes, store, store, HookList([store, fuzzy, stats]), store.lock, fuzzy, stats)
+    finally:
+        store.close()
+    print("Saved. Bye!")
+
+
+def _menu_loop(notes, seen, index, hooks, mutating, fuzzy=None, stats=None):
+    pause = more if sys.stdin.isatty() and sys.stdout.isatty() else None   # page long lists
     while True:
       show_menu()
       choice = input(">").strip()
@@ -466,16 +991,17 @@ def main():
       if choice == "1":
             text = input("Add a note: ").strip()
             cat  = input("Category (default: General): ").strip() or "General"
-            add_note(notes, text, cat, seen)
+            with mutating:
+                add_note(notes, text, cat, seen, hooks=hooks)
 
       elif choice == "2":
-            show_notes_grouped(notes)
+            show_notes_grouped(notes, pause=pause)
 
       elif choice == "3":
             if not notes:
                 print("No notes yet.")
                 continue
-            show_notes_grouped(notes)
+            show_notes_grouped(notes, pause=pause)
             cat = input("Category to delete from: ").strip().lower()
             if cat not in notes:
                 print("No such category.")
@@ -486,16 +1012,16 @@ def main():
                 print("Please type a number like 1 or 2.")
                 continue
 
-            removed = delete_note(notes, cat, idx, seen)
+            removed = delete_note(notes, cat, idx, seen, hooks=hooks, lock=mutating)   # asks outside the lock
             if removed is not None:
                 print(f" Deleted!: {removed!r}")
 
       elif choice == "4":
             term = input("search for note:").strip()
-            search_notes(notes, term)
+            search_notes(notes, term, index, fuzzy, pause=pause)
 
       elif choice == "5":
-            moved = move_note(notes, seen)
+            moved = move_note(notes, seen, hooks=hooks, lock=mutating)   # prompts outside the lock
             if moved is not None: 
                print(f"Moved {moved!r}")
                  
@@ -505,29 +1031,26 @@ def main():
       elif choice == "7":
             old = input("Old category:").strip()
             new = input("New category:").strip()
-            rename_category(notes, old, new)
+            with mutating:
+                rename_category(notes, old, new, hooks=hooks)
 
       elif choice == "8":
             src = input("Merge from category:").strip()
             dst = input("Merge into category (Default: General):").strip() or "General"
-            merge_category(notes, src, dst )
-            show_notes_grouped(notes)
+            with mutating:
+                merge_category(notes, src, dst, hooks=hooks)
+            show_notes_grouped(notes, pause=pause)
 
       elif choice == "9":
-            show_stats(notes)
+            show_stats(notes, stats)
 
       elif choice == "10":
-           changed = edit_note(notes, seen)
-           if changed:
-            save_notes(notes) # remove seen from save_notes call
+            edit_note(notes, seen, hooks=hooks, lock=mutating)   # journaled; prompts outside the lock
 
       elif choice == "11":
-            save_notes(notes)
-            print("Saved. Bye!")
             break
       else:
             print("Choose 1-10.")
 
 if __name__ == "__main__":
  main()
-
@@ -0,0 +1,58 @@
+from __future__ import annotations
+import os
+import shutil
+import sys
+from itertools import islice
+from typing import Callable, Iterable
+
+# Paged output
+# The listing views (show_notes_grouped, search results, show_numbered) yield
+# their entries lazily and hand them to write_paged(), which formats one page
+# at a time and writes it with a single sys.stdout.write instead of a print()
+# per note. The menu pauses between pages (more()); the batch CLI windows the
+# stream with --offset/--limit instead and is never asked anything.
+
+BUFFER_ENTRIES = 1000   # entries per write when nobody reads page by page
+
+
+def page_size() -> int:
+    """Entries per interactive page: $NOTES_PAGE_SIZE, else the terminal height."""
+    configured = os.environ.get("NOTES_PAGE_SIZE", "").strip()
+    if configured.isdigit() and int(configured) > 0:
+        return int(configured)
+    return max(5, shutil.get_terminal_size().lines - 3)
+
+
+def more() -> bool:
+    """Ask whether to show the next page (Enter: yes, q: stop)."""
+    try:
+        answer = input("-- more (Enter: next page, q: stop) --").strip().lower()
+    except EOFError:
+        return False
+    return answer not in ("q", "quit")
+
+
+def write_paged(entries: Iterable, render: Callable[[list], str], offset: int = 0,
+                limit: int | None = None, size: int | None = None,
+                pause: Callable[[], bool] | None = None, out=None) -> int:
+    """
+    Write entries[offset:offset + limit] (to the end when limit is None).
+    render(page) formats one page of entries as text; only pages that are
+    shown get formatted. With `pause`, pages hold `size` entries (default:
+    page_size()) and pause() is asked before each further page -- False
+    stops. Returns the number of entries written.
+    """
+    out = out if out is not None else sys.stdout
+    size = size or (page_size() if pause is not None else BUFFER_ENTRIES)
+    stream = islice(entries, offset, None if limit is None else offset + limit)
+    shown = 0
+    page = list(islice(stream, size))
+    while page:
+        out.write(render(page))
+        shown += len(page)
+        page = list(islice(stream, size))
+        if page and pause is not None:
+            out.flush()
+            if not pause():
+                break
+    return shown
@@ -0,0 +1,136 @@
+from __future__ import annotations
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List
+
+from .hooks import NoteHooks
+from .profiling import traced
+from .query import compile_query
+from .snapshot import load_snapshot, write_snapshot
+from .utils import trace
+
+NotesDict = Dict[str, List[str]]
+
+# Parallel scan
+# Without an index (or for a query no index can narrow) a search reads
+# every note on one core. ParallelSearch spreads that scan over a process
+# pool: the categories are cut into chunks of about CHUNK notes, each worker
+# checks its chunks and sends back only the matching positions, and the
+# results are merged in chunk order -- the order of the serial scan.
+#
+# The notes are not pickled for every query: they are written once to a
+# binary snapshot (snapshot.py) that every worker maps and decodes from.
+# Mutations only mark it stale (ParallelSearch is a NoteHooks listener);
+# the next parallel search rewrites it under a new version, which makes the
+# workers map the new file. Below PARALLEL_MIN notes the scan stays serial.
+
+PARALLEL_MIN = 200_000   # notes; below this starting the pool costs more than it saves
+CHUNK = 20_000           # notes per task (large categories are split)
+
+_mapped: dict[str, tuple[int, dict]] = {}   # per worker: snapshot path -> (version, notes)
+
+
+def _scan(path: str, version: int, query: str, jobs) -> list[list[int]]:
+    """Worker: the positions matching `query` in each (category, start, stop) job."""
+    cached = _mapped.get(path)
+    if cached is None or cached[0] != version:
+        cached = _mapped[path] = (version, load_snapshot(path))
+    notes, compiled, found = cached[1], compile_query(query), []
+    for cat, start, stop in jobs:
+        node = compiled.for_category(cat)
+        if node is True:
+            found.append(list(range(start, stop)))
+        else:
+            match = node.match
+            found.append([pos for pos, note in enumerate(notes[cat].texts(start, stop), start) if match(note)])
+    return found
+
+
+class ParallelSearch(NoteHooks):
+    """A process pool scanning a mapped snapshot of the notes; close() when done."""
+
+    def __init__(self, workers: int | None = None, min_notes: int = PARALLEL_MIN, chunk: int = CHUNK):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_notes = min_notes
+        self.chunk = chunk
+        self.version = 0          # 0: no snapshot written yet
+        self.stale = True
+        self._dir: str | None = None
+        self._pool: ProcessPoolExecutor | None = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def worth_it(self, notes: NotesDict) -> bool:
+        """True when `notes` is large enough to be scanned in parallel."""
+        return self.workers > 1 and sum(len(items) for items in notes.values()) >= self.min_notes
+
+    def _snapshot(self, notes: NotesDict) -> str:
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="notes-scan-")
+        path = os.path.join(self._dir, "notes.snap")
+        if self.stale:
+            write_snapshot(notes, path)   # os.replace: workers still mapping the old one are unaffected
+            self.version += 1
+            self.stale = False
+            trace("[parallel] snapshot v%d written", self.version)
+        return path
+
+    @traced
+    def matches(self, notes: NotesDict, query: str) -> Iterator[tuple[str, int, str]]:
+        """
+        (category, 0-based position, note) for every note matching `query`
+        (see query.py), in display order -- serially when `notes` is small.
+        """
+        compiled = compile_query(query)
+        if not self.worth_it(notes):
+            yield from compiled.matches(notes)
+            return
+        path = self._snapshot(notes)
+        # categories the cat: filters rule out are not even sent
+        jobs = [(cat, start, min(start + self.chunk, len(items)))
+                for cat, items in notes.items() if compiled.for_category(cat) is not False
+                for start in range(0, len(items), self.chunk)]
+        per_task = max(1, len(jobs) // (4 * self.workers))   # a few tasks per worker for balance
+        tasks = [jobs[i:i + per_task] for i in range(0, len(jobs), per_task)]
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+        results = self._pool.map(_scan, [path] * len(tasks), [self.version] * len(tasks),
+                                 [query] * len(tasks), tasks)
+        for task, found in zip(tasks, results):   # map() keeps task order
+            for (cat, _, _), positions in zip(task, found):
+                items = notes[cat]
+                for pos in positions:
+                    yield cat, pos, items[pos]
+
+    # --- NoteHooks: any change makes the snapshot stale ---------------------------
+    def added(self, cat, pos, text):
+        self.stale = True
+
+    def removed(self, cat, pos, text):
+        self.stale = True
+
+    def edited(self, cat, pos, old, new):
+        self.stale = True
+
+    def moved(self, src, pos, dest, dest_pos, text):
+        self.stale = True
+
+    def renamed(self, old, new, offset, texts):
+        self.stale = True
+
+    def reloaded(self, notes):
+        self.stale = True
@@ -0,0 +1,145 @@
+"""
+Timing spans for the notes operations.
+
+    @traced                         # whole function
+    def add_note(...): ...
+
+    with span("journal.replay"):    # any block
+        ...
+
+Off by default: `traced` then returns the function itself and `span` a shared
+do-nothing context manager, so instrumented code runs as if it were not.
+Switched on by the environment, read once at import:
+
+    NOTES_DEBUG=1                   print every span with its duration
+    NOTES_PROFILE=profile.json      on exit write per-span count, total/min/max
+                                    time and a latency histogram there, and a
+                                    Chrome trace (chrome://tracing, Perfetto)
+                                    to profile.trace.json
+"""
+from __future__ import annotations
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+DEBUG = os.getenv("NOTES_DEBUG", 0) in ("1", "true", "True")
+PROFILE = os.getenv("NOTES_PROFILE", "")
+ENABLED = bool(DEBUG or PROFILE)
+MAX_EVENTS = 1_000_000   # Chrome trace events kept (about 200 bytes each)
+
+_lock = threading.Lock()
+_stats: dict[str, dict] = {}
+_events: list[dict] = []
+_epoch = time.perf_counter()
+
+
+def _record(name: str, start: float, end: float) -> None:
+    dur = end - start
+    with _lock:
+        s = _stats.get(name)
+        if s is None:
+            s = _stats[name] = {"count": 0, "total_s": 0.0, "min_s": dur, "max_s": 0.0, "hist_us": {}}
+        s["count"] += 1
+        s["total_s"] += dur
+        s["min_s"] = min(s["min_s"], dur)
+        s["max_s"] = max(s["max_s"], dur)
+        bucket = 1 << int(dur * 1e6).bit_length()   # upper bound in µs: 1, 2, 4, 8 ...
+        s["hist_us"][bucket] = s["hist_us"].get(bucket, 0) + 1
+        if PROFILE and len(_events) < MAX_EVENTS:
+            _events.append({"name": name, "ph": "X", "pid": os.getpid(),
+                            "tid": threading.get_ident(),
+                            "ts": (start - _epoch) * 1e6, "dur": dur * 1e6})
+    if DEBUG:
+        print(f"[{datetime.now():%H:%M:%S}]{name} {dur * 1000:.3f} ms")
+#--------------------------------------------------------------------------------
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str):
+    """Context manager timing the block under `name` (no-op when disabled)."""
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+
+def traced(fn=None, *, name: str | None = None):
+    """
+    Time every call of the decorated function (as `name`, default its
+    qualified name). Disabled, the function is returned unwrapped.
+    Usable bare (@traced) or with arguments (@traced(name="load")).
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(label, start, time.perf_counter())
+        return wrapper
+    return decorate if fn is None else decorate(fn)
+#--------------------------------------------------------------------------------
+
+def stats() -> dict[str, dict]:
+    """{span: {count, total_s, mean_s, min_s, max_s, hist_us}} so far."""
+    with _lock:
+        return {name: {**s, "mean_s": s["total_s"] / s["count"], "hist_us": dict(sorted(s["hist_us"].items()))}
+                for name, s in sorted(_stats.items())}
+
+
+def chrome_trace() -> dict:
+    """The recorded spans in Chrome's trace-event format (NOTES_PROFILE only)."""
+    with _lock:
+        return {"traceEvents": list(_events), "displayTimeUnit": "ms"}
+
+
+def dump(path: str) -> None:
+    """Write stats() to `path` and, if any events were kept, the Chrome trace
+    next to it as <path without .json>.trace.json."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stats(), f, indent=2)
+    if _events:
+        with open(os.path.splitext(path)[0] + ".trace.json", "w", encoding="utf-8") as f:
+            json.dump(chrome_trace(), f)
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+        _events.clear()
+
+
+if PROFILE:
+    atexit.register(dump, PROFILE)
@@ -0,0 +1,258 @@
+from __future__ import annotations
+import re
+from functools import lru_cache
+from typing import Dict, Iterator, List
+
+NotesDict = Dict[str, List[str]]
+
+# Search queries
+#     invoice AND NOT paid         AND / OR / NOT (upper case), parentheses
+#     "call mom" OR dentist        quoted phrase
+#     cat:work milk                category filter (cat:"two words" too)
+#     /inv(oice)?\s+\d+/           regular expression
+# Words next to each other form one phrase, so a plain search ("buy milk")
+# still finds that exact text, as it always did; operators, quotes, filters
+# and parentheses separate terms, juxtaposed terms are ANDed. Every text
+# match is case-insensitive.
+#
+# A query compiles once into a tree of predicates. For each category the
+# cat: filters are decided first, which drops the whole category or the
+# filters themselves; an index narrows the rest to the candidates of its
+# literal terms (intersected for AND, united for OR), and each remaining
+# note is checked with the cheapest predicates first, stopping as soon as
+# the outcome is known.
+
+OPERATORS = ("AND", "OR", "NOT")
+_TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<open>\() | (?P<close>\)) |
+        "(?P<phrase>[^"]*)"? |
+        cat:(?:"(?P<qcat>[^"]*)"?|(?P<cat>[^\s()"]+)) |
+        /(?P<regex>(?:\\.|[^/\\])+)/(?=[\s()]|$) |
+        (?P<word>[^\s()"]+)
+    )''', re.VERBOSE)
+
+
+class QueryError(ValueError):
+    """A query that cannot be parsed (the message says why)."""
+
+
+class _Text:
+    """A note contains `text` (literal) or matches a regex (text None)."""
+    cost = 1
+
+    def __init__(self, pattern: re.Pattern, text: str | None):
+        self.pattern, self.text = pattern, text
+        self.search = pattern.search
+        if text is None:
+            self.cost = 3
+
+    def bind(self, cat):
+        return self
+
+    def candidates(self, lookup):
+        return lookup(self)
+
+    def match(self, note) -> bool:
+        return self.search(note) is not None
+
+
+class _Cat:
+    cost = 0
+
+    def __init__(self, name: str):
+        self.name = name.strip().lower()
+
+    def bind(self, cat):
+        return cat == self.name
+
+
+class _Not:
+    def __init__(self, child):
+        self.child = child
+        self.cost = child.cost
+
+    def bind(self, cat):
+        child = self.child.bind(cat)
+        return (not child) if isinstance(child, bool) else _Not(child)
+
+    def candidates(self, lookup):
+        return None   # everything that lacks the term: no smaller set to start from
+
+    def match(self, note) -> bool:
+        return not self.child.match(note)
+
+
+class _All:
+    """AND (any_=False) or OR (any_=True) of its children."""
+
+    def __init__(self, children, any_: bool):
+        self.children = sorted(children, key=lambda c: c.cost)   # cheap checks first
+        self.any = any_
+        self.cost = sum(c.cost for c in children)
+
+    def bind(self, cat):
+        kept = []
+        for child in self.children:
+            child = child.bind(cat)
+            if child is self.any:            # True in an OR, False in an AND: decided
+                return self.any
+            if not isinstance(child, bool):
+                kept.append(child)
+        if not kept:
+            return not self.any
+        return kept[0] if len(kept) == 1 else _All(kept, self.any)
+
+    def candidates(self, lookup):
+        sets = [c.candidates(lookup) for c in self.children]
+        if self.any:
+            return None if any(s is None for s in sets) else set().union(*sets)
+        known = sorted((s for s in sets if s is not None), key=len)
+        return known[0].intersection(*known[1:]) if known else None
+
+    def match(self, note) -> bool:
+        if self.any:
+            return any(c.match(note) for c in self.children)
+        return all(c.match(note) for c in self.children)
+#--------------------------------------------------------------------------------
+
+class Query:
+    """A parsed search query; see compile_query()."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self._terms: list[_Text] = []    # terms the index can narrow the scan to
+        self._positive: list[str] = []   # highlighted patterns (terms not under NOT)
+        self._tokens = self._tokenize(source)
+        self._pos = 0
+        self.root = self._or(negated=False)
+        if self._pos < len(self._tokens):
+            raise QueryError(f"unexpected {self._tokens[self._pos][1]!r}")
+        try:
+            self.highlight = re.compile("|".join(self._positive)) if self._positive else None
+        except re.error:   # e.g. a regex with global flags: match it, just don't mark it
+            self.highlight = None
+        # one literal text and nothing else: what the plain search always was
+        self.plain = isinstance(self.root, _Text) and self.root.text is not None
+
+    # --- parsing ------------------------------------------------------------------
+    @staticmethod
+    def _tokenize(source: str) -> list[tuple]:
+        tokens, pos, source = [], 0, source.strip()
+        while pos < len(source):
+            m = _TOKEN.match(source, pos)
+            kind, start = m.lastgroup, m.start(m.lastgroup)
+            value = m.group(kind)
+            if kind == "word" and value in OPERATORS:
+                kind = value
+            elif kind == "qcat":
+                kind = "cat"
+            elif kind == "word" and tokens and tokens[-1][0] == "word":
+                # words next to each other: one phrase, exactly as typed
+                _, _, start = tokens.pop()
+                value = source[start:m.end()]
+            tokens.append((kind, value, start))
+            pos = m.end()
+        return tokens
+
+    def _peek(self):
+        return self._tokens[self._pos][0] if self._pos < len(self._tokens) else None
+
+    def _or(self, negated: bool):
+        children = [self._and(negated)]
+        while self._peek() == "OR":
+            self._pos += 1
+            children.append(self._and(negated))
+        return children[0] if len(children) == 1 else _All(children, any_=True)
+
+    def _and(self, negated: bool):
+        children = [self._not(negated)]
+        while self._peek() not in (None, "OR", "close"):
+            if self._peek() == "AND":
+                self._pos += 1
+            children.append(self._not(negated))
+        return children[0] if len(children) == 1 else _All(children, any_=False)
+
+    def _not(self, negated: bool):
+        if self._peek() == "NOT":
+            self._pos += 1
+            return _Not(self._not(not negated))
+        return self._atom(negated)
+
+    def _atom(self, negated: bool):
+        if self._pos >= len(self._tokens):
+            raise QueryError("query ends where a term was expected")
+        kind, value, _ = self._tokens[self._pos]
+        self._pos += 1
+        if kind == "open":
+            node = self._or(negated)
+            if self._peek() != "close":
+                raise QueryError("missing ')'")
+            self._pos += 1
+            return node
+        if kind == "cat":
+            return _Cat(value)
+        if kind in ("word", "phrase"):
+            if not value.strip():
+                raise QueryError("empty phrase")
+            source, text = re.escape(value), value
+        elif kind == "regex":
+            try:
+                re.compile(value)
+            except re.error as e:
+                raise QueryError(f"bad regex /{value}/: {e}") from None
+            source, text = value, None
+        else:
+            raise QueryError(f"unexpected {value!r}")
+        node = _Text(re.compile(source, re.IGNORECASE), text)
+        if not negated:   # NOT terms neither narrow the candidates nor get marked
+            self._terms.append(node)
+            self._positive.append(f"(?i:{source})")
+        return node
+
+    # --- evaluation ---------------------------------------------------------------
+    def for_category(self, cat: str):
+        """The query for the notes of `cat`: True/False when decided by the cat: filters alone."""
+        return self.root.bind(cat)
+
+    def matches(self, notes: NotesDict, index=None) -> Iterator[tuple[str, int, str]]:
+        """(category, 0-based position, note) of every matching note, in display order.
+        `index` (anything with candidates(term) -> set of locations | None) narrows the scan."""
+        by_term: dict[_Text, dict | None] = {}
+        if index is not None:
+            for term in self._terms:
+                hits = index.candidates(term.text) if term.text is not None else None
+                if hits is not None:
+                    grouped: dict[str, set] = {}
+                    for cat, pos in hits:
+                        grouped.setdefault(cat, set()).add(pos)
+                    hits = grouped
+                by_term[term] = hits
+
+        for cat, items in notes.items():
+            node = self.for_category(cat)
+            if node is False:
+                continue
+            positions = None
+            if node is not True and index is not None:
+                positions = node.candidates(lambda t: None if by_term.get(t) is None
+                                            else by_term[t].get(cat, set()))
+            if positions is None:
+                positions = range(len(items))
+            else:
+                positions = sorted(p for p in positions if p < len(items))
+            if node is True:
+                for pos in positions:
+                    yield cat, pos, items[pos]
+                continue
+            test = node.search if isinstance(node, _Text) else node.match   # one term: no wrapper
+            for pos in positions:
+                note = items[pos]
+                if test(note):
+                    yield cat, pos, note
+
+
+@lru_cache(maxsize=256)
+def compile_query(source: str) -> Query:
+    """Parse `source` (see the top of this module); QueryError when it is malformed."""
+    return Query(source)
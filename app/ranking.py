@@ -0,0 +1,74 @@
+from __future__ import annotations
+import heapq
+import math
+from typing import Dict, Iterable, List
+
+from .index import SearchIndex
+from .profiling import traced
+from .utils import normalize
+
+NotesDict = Dict[str, List[str]]
+
+# Ranked search (BM25)
+# A note scores, for each query token, the best BM25 weight of the indexed
+# tokens that contain it:
+#     idf(t) * tf * (K1 + 1) / (tf + K1 * (1 - B + B * len / avg_len))
+# with idf(t) = ln(1 + (N - df + 0.5) / (df + 0.5)). Rare tokens count more
+# than common ones, a token repeated in a note counts more (with diminishing
+# returns), and long notes are discounted. A partial match ("milk" in
+# "milkshake") is weighted by the share of the token it covers. Everything
+# comes from the SearchIndex -- df from the postings, tf and the note length
+# from its rows, the average from its token count -- so no note is read
+# until the k best are known. Scores accumulate per matching note and a
+# heap keeps the top k; the matches are never sorted as a whole.
+
+K = 10
+K1, B = 1.2, 0.75
+
+
+def _idf(df: int, n: int) -> float:
+    return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+
+@traced
+def ranked_matches(notes: NotesDict, query: str, index: SearchIndex | None = None, k: int = K,
+                   categories: Iterable[str] | None = None) -> list[tuple[float, str, int, str]]:
+    """
+    The k notes most relevant to `query`, best first, as
+    (score, category, 0-based position, note). `categories` limits the
+    search to those. Without an index one is built for the call.
+    """
+    tokens = list(dict.fromkeys(normalize(query).split()))
+    if not tokens or k <= 0:
+        return []
+    if index is None:
+        index = SearchIndex.build(notes)
+    wanted = None if categories is None else {c.strip().lower() for c in categories}
+    n = len(index)
+    avg_len = index.tokens / n if n else 1.0
+
+    scores: dict[tuple[str, int], float] = {}   # by (category, slot); positions for the k best only
+    for token in tokens:
+        best: dict[tuple[str, int], float] = {}   # per note: its best token for this query token
+        for term, locs in index.postings.items():
+            if token not in term:
+                continue
+            weight = _idf(len(locs), n) * len(token) / len(term)
+            for loc in locs:
+                if wanted is not None and loc[0] not in wanted:
+                    continue
+                row = index.row(loc)
+                tf = row.count(term)
+                w = weight * tf * (K1 + 1) / (tf + K1 * (1 - B + B * len(row) / avg_len))
+                if w > best.get(loc, 0.0):
+                    best[loc] = w
+        for loc, w in best.items():
+            scores[loc] = scores.get(loc, 0.0) + w
+
+    order = {cat: i for i, cat in enumerate(notes)}
+    # slots sort like positions within a category: ties break in display order
+    top = heapq.nlargest(k, ((s, -order[cat], -slot, (cat, slot)) for (cat, slot), s in scores.items()
+                             if cat in order))
+    found = [(s, *index.locate(loc)) for s, _, _, loc in top]
+    return [(s, cat, pos, notes[cat][pos]) for s, cat, pos in found if pos < len(notes[cat])]
+
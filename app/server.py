@@ -0,0 +1,431 @@
+"""
+Local HTTP/JSON API over the notes (stdlib asyncio, no dependencies).
+
+    python -m app serve                      # http://127.0.0.1:8080, notes.d
+    python -m app --file notes.db serve --port 9000
+
+    GET    /notes[?category=c]                {category: [notes...]}
+    GET    /search?q=query                    [{"category", "position", "id", "text"}]
+                                              (a word, or AND/OR/NOT, "phrase", cat:, /regex/)
+    GET    /search?q=term&fuzzy=1[&k=10]      closest first, typos allowed, + "distance"
+    GET    /search?q=terms&rank=1[&k=10][&category=c]   most relevant first (BM25), + "score"
+    GET    /stats                             {category: count}
+    POST   /notes                             {"text", "category"} -> {"category", "id"}
+    PUT    /notes/<category>/<position>       {"text"}        edit
+    DELETE /notes/<category>/<position>
+    POST   /notes/<category>/<position>/move  {"to"}
+    PUT    /ids/<id>, DELETE /ids/<id>, POST /ids/<id>/move    the same, by note id
+    POST   /categories/<category>/rename      {"to"}
+
+Positions are 1-based, as in the app; they shift when a note before them
+goes, note ids (ids.py) don't. A refused write (duplicate, no such note...)
+answers 409 with the app's message in "error", an unknown id 404.
+
+One in-memory store serves every connection. Reads are answered on the
+event loop as they arrive. Writes go through a queue to a single writer
+task, which applies everything queued in one go, makes the batch durable
+once (journal fsync / one SQLite transaction) and only then answers the
+requests of the batch -- a group commit. Compaction stays with the
+Autosaver, as in the menu app. The writer never blocks the loop on a lock:
+while the autosaver copies the notes, or another process writes the
+database, it retries, and reads go on being answered meanwhile.
+"""
+from __future__ import annotations
+import asyncio
+import contextlib
+import io
+import json
+import os
+import signal
+import sqlite3
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .aggregates import NoteStats
+from .autosave import Autosaver
+from .fuzzy import K, fuzzy_matches
+from .hooks import HookList
+from .index import KeyIndex, TrigramIndex
+from .journal import Journal
+from .notes_app import (_jsonable, add_note, category_counts, delete_note, edit_note_text,
+                        iter_matches, move_note_to, rename_category)
+from .query import QueryError
+from .ranking import ranked_matches
+from .shards import ensure_sharded, is_sharded
+from .sqlite_store import SqliteStore, is_sqlite
+from .store import NotesStore
+from .utils import trace
+
+MAX_BODY = 1 << 20     # bytes
+MAX_BATCH = 512        # writes applied per commit
+LOCK_POLL = 0.005      # seconds between tries for a batch lock held elsewhere
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+#--------------------------------------------------------------------------------
+
+class NotesServer:
+    """The notes of `path` (journal + shards/JSON, or an SQLite database) behind HTTP."""
+
+    def __init__(self, path: str = "notes.d"):
+        self.path = path
+        self.notes = NotesStore()
+        if is_sqlite(path):
+            self.store = SqliteStore(path)
+            self.store.load(into=self.notes)
+            self.seen = self.index = self.store
+            self.ids = self.store.ids
+            self.fuzzy = TrigramIndex.build(self.notes)
+            self.stats = NoteStats.build(self.notes)
+            self.hooks = HookList([self.store, self.fuzzy, self.stats])
+            self.journal = self.autosave = None
+        else:
+            # same files as the batch commands: <file> + <file>.journal
+            base = os.path.splitext(path)[0]
+            if is_sharded(path):
+                ensure_sharded(path, legacy=base + ".json")
+            self.store = None
+            self.journal = Journal(base + ".journal", path, sync_every=1 << 62)   # synced per batch
+            self.notes = self.journal.open(into=self.notes)
+            self.ids = self.journal.ids
+            self.seen = KeyIndex.build(self.notes)
+            self.index = self.fuzzy = TrigramIndex.build(self.notes)   # exact and fuzzy search
+            self.stats = NoteStats.build(self.notes)
+            self.journal.peers = HookList([self.seen, self.index, self.stats])
+            self.autosave = Autosaver(self.journal.checkpoint, self.journal.write_checkpoint,
+                                      fallback=self.journal.sync)
+            self.hooks = HookList([self.seen, self.index, self.stats, self.journal, self.autosave])
+        self.writes: asyncio.Queue | None = None
+        self.requests = 0
+        self.batches = 0
+        self._server: asyncio.AbstractServer | None = None
+        self._writer: asyncio.Task | None = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> int:
+        """Start listening; returns the port (useful with port=0)."""
+        self.writes = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_loop())
+        self._server = await asyncio.start_server(self._connection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        """Stop accepting, finish the queued writes, save and release the files."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._writer is not None:
+            await self.writes.join()
+            self._writer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._writer
+        if self.journal is not None:
+            saved = self.autosave.close()
+            self.journal.close(compact=not saved)
+        else:
+            self.store.close()
+    #--------------------------------------------------------------------------------
+    # writes: one task, one commit per batch
+
+    def _try_mutating(self) -> contextlib.ExitStack | None:
+        """The lock held while a batch is applied, if it is free right now:
+        the autosaver copies the notes under the same lock (and may wait
+        for another session there), another process may be writing the
+        database. None if taken."""
+        held = contextlib.ExitStack()
+        if self.store is not None:
+            try:
+                held.enter_context(self.store.batch(wait=False))
+            except sqlite3.OperationalError:
+                return None
+        elif self.autosave.lock.acquire(blocking=False):
+            held.callback(self.autosave.lock.release)
+        else:
+            return None
+        return held
+
+    async def _mutating(self) -> contextlib.ExitStack:
+        """Take the batch lock without blocking the event loop: reads and new
+        connections go on being served while the writer waits for it."""
+        while (held := self._try_mutating()) is None:
+            await asyncio.sleep(LOCK_POLL)
+        return held
+
+    async def _write_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.writes.get()]
+            while len(batch) < MAX_BATCH and not self.writes.empty():
+                batch.append(self.writes.get_nowait())
+            results = []
+            with await self._mutating():
+                for apply, _ in batch:
+                    results.append(_run(apply))
+            if self.journal is not None:
+                try:
+                    await loop.run_in_executor(None, self.journal.sync)
+                except OSError as e:
+                    print(f"[ERROR] Could not sync the journal: {e}")
+                    results = [(503, {"error": f"not durable: {e}"})] * len(batch)
+            self.batches += 1
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+                self.writes.task_done()
+
+    async def _write(self, apply) -> tuple[int, object]:
+        fut = asyncio.get_running_loop().create_future()
+        await self.writes.put((apply, fut))
+        return await fut
+    #--------------------------------------------------------------------------------
+    # HTTP
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HttpError as e:   # unparsable: answer and hang up
+                    writer.write(_response(e.status, {"error": str(e)}, keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                try:
+                    status, payload = await self._dispatch(method, target, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                self.requests += 1
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> tuple[int, object]:
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        data = _json_body(body) if method in ("POST", "PUT") else {}
+
+        if method == "GET":
+            read = self._reads().get(tuple(parts))
+            if read is None:
+                raise HttpError(404, f"no such resource: {url.path}")
+            return read(query)
+        write = self._route_write(method, parts, data)
+        if write is None:
+            raise HttpError(404 if method in ("POST", "PUT", "DELETE") else 405,
+                            f"no such operation: {method} {url.path}")
+        return await self._write(write)
+
+    # --- reads ------------------------------------------------------------------
+    def _reads(self) -> dict:
+        return {("notes",): self._get_notes, ("search",): self._search, ("stats",): self._stats}
+
+    def _get_notes(self, query) -> tuple[int, object]:
+        cat = query.get("category")
+        if cat is None:
+            return 200, {c: list(items) for c, items in self.notes.items()}
+        cat = cat.strip().lower()
+        if cat not in self.notes:
+            raise HttpError(404, f"no such category: {cat}")
+        return 200, {cat: list(self.notes[cat])}
+
+    def _search(self, query) -> tuple[int, object]:
+        term = query.get("q", "").strip()
+        if not term:
+            raise HttpError(400, "missing ?q=")
+        ranked, fuzzy = (query.get(mode, "0") not in ("", "0", "false") for mode in ("rank", "fuzzy"))
+        k = query.get("k", str(K))
+        if (ranked or fuzzy) and not k.isdigit():
+            raise HttpError(400, f"bad k {k!r}")
+        if ranked:
+            cat = query.get("category")
+            # the trigram index is a SearchIndex too, kept up to date in both modes
+            return 200, [{"category": c, "position": pos + 1, "id": self.ids.id_at(c, pos),
+                          "text": note, "score": round(score, 4)}
+                         for score, c, pos, note in ranked_matches(self.notes, term, self.fuzzy, int(k),
+                                                                   None if cat is None else [cat])]
+        if fuzzy:
+            return 200, [{"category": cat, "position": pos + 1, "id": self.ids.id_at(cat, pos),
+                          "text": note, "distance": dist}
+                         for dist, cat, pos, note in fuzzy_matches(self.notes, term, self.fuzzy, int(k))]
+        try:
+            return 200, [{"category": cat, "position": pos + 1, "id": self.ids.id_at(cat, pos), "text": note}
+                         for cat, pos, note in iter_matches(self.notes, term, self.index)]
+        except QueryError as e:
+            raise HttpError(400, f"bad query: {e}") from None
+
+    def _stats(self, query) -> tuple[int, object]:
+        return 200, category_counts(self.notes, self.stats)
+
+    # --- writes -----------------------------------------------------------------
+    def _route_write(self, method: str, parts: list[str], data: dict):
+        """A no-argument callable applying the write, or None for an unknown route."""
+        notes, seen, hooks = self.notes, self.seen, self.hooks
+        if method == "POST" and parts == ["notes"]:
+            text, cat = _field(data, "text"), (data.get("category") or "General").strip().lower()
+
+            def add():
+                if not add_note(notes, text, cat, seen, hooks):
+                    return 409, {}
+                return 201, {"category": cat, "id": self.ids.id_at(cat, len(notes[cat]) - 1)}
+            return add
+        if len(parts) == 3 and parts[0] == "categories" and parts[2] == "rename" and method == "POST":
+            old, new = parts[1].strip().lower(), _field(data, "to").strip().lower()
+
+            def rename():
+                had = old in notes
+                rename_category(notes, old, new, hooks)
+                return (200, {"category": new}) if had and old not in notes else (409, {})
+            return rename
+        if len(parts) >= 2 and parts[0] == "ids":
+            nid, rest = _note_id(parts[1]), parts[2:]
+
+            def where():   # looked up when the write runs: earlier ones may have moved it
+                if nid not in self.ids:
+                    print(f"No note #{nid}.")
+                    return None
+                cat, pos = self.ids.locate(nid)
+                return cat, pos + 1
+        elif len(parts) >= 3 and parts[0] == "notes":
+            at, rest = (parts[1], _position(parts[2])), parts[3:]
+            where = lambda: at
+        else:
+            return None
+        if not rest and method == "DELETE":
+            def delete():
+                if (at := where()) is None:
+                    return 404, {}
+                removed = delete_note(notes, *at, seen, hooks, ask=False)
+                return (200, {"deleted": removed}) if removed is not None else (409, {})
+            return delete
+        if not rest and method == "PUT":
+            text = _field(data, "text")
+
+            def edit():
+                if (at := where()) is None:
+                    return 404, {}
+                return (200, {"text": text.strip()}) \
+                    if edit_note_text(notes, *at, text, seen, hooks) else (409, {})
+            return edit
+        if rest == ["move"] and method == "POST":
+            dest = _field(data, "to")
+
+            def move():
+                if (at := where()) is None:
+                    return 404, {}
+                moved = move_note_to(notes, *at, dest, seen, hooks)
+                return (200, {"moved": moved, "category": dest.strip().lower()}) \
+                    if moved is not None else (409, {})
+            return move
+        return None
+#--------------------------------------------------------------------------------
+
+def _run(apply) -> tuple[int, object]:
+    """Apply one write; what the mutator prints becomes the error message."""
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            status, payload = apply()
+    except Exception as e:   # one bad write must not stop the writer task
+        trace("server: write failed: %s: %s", type(e).__name__, e)
+        return 500, {"error": f"{type(e).__name__}: {e}"}
+    if status >= 400:
+        payload = {**payload, "error": out.getvalue().strip() or HTTPStatus(status).phrase}
+    return status, payload
+
+
+def _field(data: dict, name: str) -> str:
+    value = data.get(name)
+    if not isinstance(value, str):
+        raise HttpError(400, f"missing string field {name!r}")
+    return value
+
+
+def _position(text: str) -> int:
+    if not text.isdigit() or int(text) < 1:
+        raise HttpError(400, f"bad position {text!r} (1-based)")
+    return int(text)
+
+
+def _note_id(text: str) -> int:
+    text = text.lstrip("#")
+    if not text.isdigit() or int(text) < 1:
+        raise HttpError(400, f"bad note id {text!r}")
+    return int(text)
+
+
+def _json_body(body: bytes) -> dict:
+    try:
+        data = json.loads(body.decode("utf-8")) if body else {}
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise HttpError(400, f"bad JSON body: {e}")
+    if not isinstance(data, dict):
+        raise HttpError(400, "JSON body must be an object")
+    return data
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    """(method, target, version, headers, body), or None at end of stream."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "bad request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "bad Content-Length")
+    if length > MAX_BODY:
+        raise HttpError(413, f"body over {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, version.upper(), headers, body
+
+
+def _response(status: int, payload, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False, default=_jsonable).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            + ("" if keep_alive else "Connection: close\r\n") + "\r\n")
+    return head.encode("latin-1") + body
+#--------------------------------------------------------------------------------
+
+def serve(path: str = "notes.d", host: str = "127.0.0.1", port: int = 8080) -> int:
+    """Run the server until Ctrl-C or SIGTERM; the notes are saved on the way out."""
+    async def run():
+        server = NotesServer(path)
+        stop = asyncio.Event()
+        with contextlib.suppress(NotImplementedError):   # no signal handlers on Windows
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        try:
+            actual = await server.start(host, port)
+            print(f"Serving {path} on http://{host}:{actual}/ (Ctrl-C to stop)", flush=True)
+            await stop.wait()
+        finally:
+            await server.close()
+            print(f"Saved. {server.requests} request(s), {server.batches} write batch(es).")
+
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(run())
+    return 0
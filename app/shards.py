@@ -0,0 +1,433 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import threading
+import weakref
+from collections.abc import MutableMapping
+from typing import Dict, List
+
+from .locking import FileLock, SharedLock
+from .profiling import traced
+from .snapshot import is_snapshot, load_snapshot
+from .store import PackedNotes
+from .streaming import iter_notes
+from .utils import backup_corrupt, trace
+
+NotesDict = Dict[str, List[str]]
+
+# Sharded storage (a directory, e.g. notes.d/)
+#   manifest.json   {"version", "next_id", "journal_seq", "etag", "next_note_id",
+#                    "shards": {category: {"file", "sha256", "count", "size", "mtime_ns"}}}
+#   000001.json     one category per file: {"ids": [...], "notes": [...]} -- the
+#                   note ids (see ids.py) are optional: older shards are a bare
+#                   JSON list of the notes; the entry of a shard written with
+#                   them says "ids": true, so they can be read when needed
+# Shard files are never modified: a changed category is written to a new
+# file and the manifest -- replaced atomically -- switches over to it, so a
+# crash leaves the previous manifest and all of its files intact. A save only
+# writes the categories whose content hash changed; a renamed category keeps
+# its file (only its manifest key changes). Loading reads the manifest and
+# decodes a category's file the first time that category is indexed, packed
+# like NotesStore (store.py).
+#
+# So a ShardedNotes may open a file long after it read the manifest naming
+# it. Each one pins the directory first: its process holds a shared lock on
+# <dir>.readers.lock (locking.py) while any of them is alive. A save deletes
+# the files its manifest no longer names only when no other session holds
+# that lock, and keeps those a ShardedNotes of its own has yet to read;
+# otherwise they stay until a later save finds the directory unused.
+
+MANIFEST = "manifest.json"
+VERSION = 1
+_SHARD_FILE = re.compile(r"\d{6}\.json")   # not *_corrupt.json backups
+READERS_LOCK = ".readers.lock"    # side files next to the directory
+CLEANUP_LOCK = ".cleanup.lock"
+
+
+def is_sharded(path: str) -> bool:
+    """True for a shard directory: an existing one, or a new path ending in .d"""
+    if os.path.isdir(path):
+        return os.path.exists(os.path.join(path, MANIFEST)) or path.rstrip("/\\").endswith(".d")
+    return path.rstrip("/\\").endswith(".d")
+
+
+def read_manifest(path: str) -> dict:
+    try:
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {"version": VERSION, "next_id": 1, "journal_seq": 0, "shards": {}}
+    if manifest.get("version") != VERSION:
+        raise ValueError(f"{path}: unsupported manifest version {manifest.get('version')!r}")
+    return manifest
+
+
+def _encode(items, ids=None) -> bytes:
+    items = list(items)
+    data = items if ids is None or len(ids) != len(items) else {"ids": list(ids), "notes": items}
+    return json.dumps(data, ensure_ascii=False, indent=0).encode("utf-8")
+
+
+def _write_file(path: str, data: bytes) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _side(path: str, suffix: str) -> str:
+    return path.rstrip("/\\") + suffix
+#--------------------------------------------------------------------------------
+# reader pins: one shared lock per directory and process
+
+class _Pin:
+    __slots__ = ("lock", "readers")
+
+    def __init__(self, path: str):
+        self.lock = SharedLock(_side(path, READERS_LOCK))
+        self.readers: dict[int, weakref.ref] = {}   # the live ShardedNotes on the directory
+
+
+_pins: dict[str, _Pin] = {}
+_pins_lock = threading.RLock()   # reentrant: a finalizer may run while it is held
+
+
+def _pin(notes: "ShardedNotes") -> None:
+    key = os.path.abspath(notes.path)
+    with _pins_lock:
+        pin = _pins.get(key)
+        if pin is None:
+            pin = _pins[key] = _Pin(notes.path)
+        pin.readers[id(notes)] = weakref.ref(notes)
+    weakref.finalize(notes, _unpin, key, id(notes))
+
+
+def _unpin(key: str, ident: int) -> None:
+    with _pins_lock:
+        pin = _pins[key]
+        del pin.readers[ident]
+        if not pin.readers:
+            pin.lock.close()
+            del _pins[key]
+
+
+def _remove_unreferenced(path: str, live: set[str]) -> int:
+    """Delete the shard files in `path` other than `live` that no reader may
+    still open; returns how many went. Nothing goes while another session
+    has the directory open, or another save is cleaning up."""
+    guard = FileLock(_side(path, CLEANUP_LOCK))
+    if not guard.try_acquire():
+        return 0
+    removed = 0
+    try:
+        with _pins_lock:
+            pin = _pins.get(os.path.abspath(path))
+            lock = pin.lock if pin is not None else SharedLock(_side(path, READERS_LOCK))
+            try:
+                if not lock.try_exclusive():
+                    trace("shards: %s is open in another session; old files kept", path)
+                    return 0
+                try:
+                    live = set(live)
+                    for ref in list(pin.readers.values()) if pin is not None else ():
+                        notes = ref()
+                        if notes is not None:
+                            live |= notes.unread_files()
+                    for name in os.listdir(path):
+                        if name not in live and _SHARD_FILE.fullmatch(name):
+                            try:
+                                os.remove(os.path.join(path, name))
+                                removed += 1
+                            except OSError:
+                                pass
+                finally:
+                    lock.shared()
+            finally:
+                if pin is None:
+                    lock.close()
+    finally:
+        guard.release()
+        guard.close()
+    return removed
+#--------------------------------------------------------------------------------
+
+class ShardedNotes(MutableMapping):
+    """
+    {category: PackedNotes} backed by a shard directory.
+    Categories are read from their shard on first access; the ones never
+    touched are carried over by save_shards() without being read or written.
+    """
+
+    def __init__(self, path: str, manifest: dict | None = None):
+        self.path = path
+        if os.path.isdir(path):
+            _pin(self)   # before the manifest: its files must outlive us
+        self.manifest = read_manifest(path) if manifest is None else manifest
+        # category -> manifest entry (None: not on disk yet); order = category order
+        self._entries: dict[str, dict | None] = dict(self.manifest["shards"])
+        self._loaded: dict[str, PackedNotes] = {}
+        self._ids: dict[str, list | None] = {}   # stored note ids of the categories read
+
+    def _read(self, cat: str) -> list:
+        items, self._ids[cat] = self._read_entry(cat, self._entries[cat])
+        return items
+
+    def _read_entry(self, cat: str, entry: dict) -> tuple[list, list | None]:
+        """(notes, stored ids or None) of the shard `entry` names."""
+        file = os.path.join(self.path, entry["file"])
+        try:
+            with open(file, "rb") as f:
+                data = f.read()
+                st = os.fstat(f.fileno())
+        except FileNotFoundError:
+            print(f"[ERROR] Shard {entry['file']} of {cat!r} is missing; category starts empty.")
+            return [], None
+        # unchanged mtime and size: trust the file; otherwise check its hash
+        if (st.st_mtime_ns, st.st_size) != (entry.get("mtime_ns"), entry.get("size")) \
+                and hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            print(f"[WARN] Shard {entry['file']} of {cat!r} does not match its checksum.")
+        try:
+            items = json.loads(data.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            print(f"[ERROR] Shard {entry['file']} of {cat!r} is corrupt. Backing it up and starting it empty.")
+            backup_corrupt(file)
+            return [], None
+        ids = None
+        if isinstance(items, dict):
+            ids, items = items.get("ids"), items.get("notes")
+        if not isinstance(items, list):
+            print(f"[WARN] Dropping malformed shard for category {cat!r}.")
+            return [], None
+        return items, ids
+
+    def __getitem__(self, cat: str) -> PackedNotes:
+        items = self._loaded.get(cat)
+        if items is None:
+            if cat not in self._entries:
+                raise KeyError(cat)
+            items = self._loaded[cat] = PackedNotes(self._read(cat))
+        return items
+
+    def __setitem__(self, cat: str, items) -> None:
+        if cat not in self._entries:
+            self._entries[cat] = None
+        self._loaded[cat] = items if isinstance(items, PackedNotes) else PackedNotes(items)
+
+    def __delitem__(self, cat: str) -> None:
+        del self._entries[cat]
+        self._loaded.pop(cat, None)
+        self._ids.pop(cat, None)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, cat) -> bool:
+        return cat in self._entries
+
+    def setdefault(self, cat: str, default=()):
+        # the stored PackedNotes, not `default` (see NotesStore.setdefault)
+        if cat not in self._entries:
+            self[cat] = default if default is not None else ()
+        return self[cat]
+
+    def copy(self) -> "ShardedNotes":
+        """A detached copy: the categories read so far are copied, the
+        others stay unread (and are kept as they are by save_shards)."""
+        clone = ShardedNotes(self.path, self.manifest)
+        clone._entries = dict(self._entries)
+        clone._loaded = {cat: items.copy() for cat, items in self._loaded.items()}
+        clone._ids = dict(self._ids)
+        return clone
+
+    def adopt(self, fresh: "ShardedNotes", keep=()) -> None:
+        """
+        Become `fresh`, a newer load of the same directory, in place: the
+        categories read so far are refilled (the same PackedNotes, a running
+        mutator may hold them), the others stay unread. Categories in `keep`
+        stay even if `fresh` lacks them.
+        """
+        entries, loaded = {}, {}
+        for cat in fresh:
+            entries[cat] = fresh._entries[cat]
+            items = self._loaded.get(cat)
+            if items is not None:
+                items.clear()
+                items.extend(fresh[cat])
+                loaded[cat] = items
+            elif cat in fresh._loaded:
+                loaded[cat] = fresh._loaded[cat]
+        for cat in keep:
+            if cat in self._loaded and cat not in entries:
+                self._loaded[cat].clear()
+                entries[cat], loaded[cat] = None, self._loaded[cat]
+        self.manifest, self._entries, self._loaded = fresh.manifest, entries, loaded
+        self._ids = {cat: fresh._ids[cat] for cat in loaded if cat in fresh._ids}
+
+    def rename(self, old: str, new: str) -> None:
+        """Rename a category without reading it (its shard file is kept)."""
+        if new in self._entries:
+            raise KeyError(f"category {new!r} exists")
+        self._entries[new] = self._entries.pop(old)
+        if old in self._loaded:
+            self._loaded[new] = self._loaded.pop(old)
+        if old in self._ids:
+            self._ids[new] = self._ids.pop(old)
+
+    def id_reader(self):
+        """
+        cat -> the note ids stored with it (None if none), for NoteIds. A
+        category left unread is looked up by the shard it has now, so its ids
+        are still found after it is renamed or deleted here (NoteIds follows
+        such a change right after the notes).
+        """
+        entries = dict(self._entries)
+
+        def known(cat: str) -> list | None:
+            if cat in self._ids:
+                return self._ids[cat]
+            entry = entries.get(cat)
+            return self._read_entry(cat, entry)[1] if entry is not None else None
+
+        return known
+
+    def stores_ids(self, cat: str) -> bool:
+        """True if the shard of `cat`, unread yet, is known to hold note ids."""
+        entry = self._entries.get(cat)
+        return cat not in self._loaded and entry is not None and bool(entry.get("ids"))
+
+    def count(self, cat: str) -> int:
+        """Number of notes in `cat`, from the manifest if it was not read yet."""
+        if cat in self._loaded or self._entries[cat] is None:
+            return len(self[cat])
+        return self._entries[cat]["count"]
+
+    def loaded(self) -> list[str]:
+        return list(self._loaded)
+
+    def unread_files(self) -> set[str]:
+        """The shard files this mapping may still open."""
+        return {e["file"] for cat, e in self._entries.items() if e is not None and cat not in self._loaded}
+
+    def __repr__(self):
+        return f"ShardedNotes({self.path!r}, {len(self)} categories, {len(self._loaded)} loaded)"
+#--------------------------------------------------------------------------------
+
+@traced
+def save_shards(notes, path: str, meta: dict | None = None) -> bool:
+    """
+    Save `notes` into the shard directory `path`, writing only the categories
+    whose content changed, then the manifest. `meta` keys (journal_seq, etag,
+    next_note_id) go into the manifest; its "ids" ({category: [ids]}) are
+    stored with each category. Its "stored" ({category: name in the current
+    manifest}, see journal.follow_op) names the categories known unchanged:
+    their shards are kept without encoding the notes. Returns True on
+    success, False on failure.
+    """
+    try:
+        os.makedirs(path, exist_ok=True)
+        old = read_manifest(path)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Cannot save to {path}: {e}")
+        return False
+    by_hash = {e["sha256"]: e for e in old["shards"].values()}
+    own = isinstance(notes, ShardedNotes) and os.path.abspath(notes.path) == os.path.abspath(path)
+    next_id = old.get("next_id", 1)
+    meta = meta or {}
+    ids = meta.get("ids") or {}
+    stored = meta.get("stored") or {}
+    shards: dict[str, dict] = {}
+    written = 0
+    try:
+        for cat in notes:
+            if own and cat not in notes._loaded and notes._entries[cat] is not None:
+                shards[cat] = notes._entries[cat]   # never read, so unchanged
+                continue
+            if stored.get(cat) in old["shards"]:
+                shards[cat] = old["shards"][stored[cat]]   # untouched (or only renamed)
+                continue
+            items, cat_ids = notes[cat], ids.get(cat)
+            with_ids = cat_ids is not None and len(cat_ids) == len(items)
+            data = _encode(items, cat_ids)
+            digest = hashlib.sha256(data).hexdigest()
+            entry = by_hash.get(digest)
+            if entry is None or not os.path.exists(os.path.join(path, entry["file"])):
+                file = f"{next_id:06d}.json"
+                next_id += 1
+                _write_file(os.path.join(path, file), data)
+                st = os.stat(os.path.join(path, file))
+                entry = {"file": file, "sha256": digest, "count": len(items),
+                         "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                by_hash[digest] = entry
+                written += 1
+            if with_ids:   # same bytes, so also true of a reused file
+                entry["ids"] = True
+            shards[cat] = entry
+        manifest = {"version": VERSION, "next_id": next_id,
+                    "journal_seq": meta.get("journal_seq", old.get("journal_seq", 0)),
+                    "etag": meta.get("etag", old.get("etag", 0)),
+                    "next_note_id": meta.get("next_note_id", old.get("next_note_id", 1)),
+                    "shards": shards}
+        _write_file(os.path.join(path, MANIFEST), json.dumps(manifest, indent=1).encode("utf-8"))
+    except OSError as e:
+        print(f"[ERROR] Could not save shards to {path}: {e}")
+        return False
+
+    if own:
+        notes.manifest = manifest
+        notes._entries = dict(shards)
+        notes._ids.update((cat, ids[cat]) for cat in notes._loaded if cat in ids)
+    # files no longer referenced (old versions, deleted categories), unless
+    # a reader may still open them
+    removed = _remove_unreferenced(path, {e["file"] for e in shards.values()})
+    trace("shards: wrote %d of %d categories to %s, removed %d old file(s)", written, len(shards), path, removed)
+    return True
+
+
+@traced
+def load_shards(path: str) -> ShardedNotes:
+    """Open a shard directory; categories are read when first used."""
+    return ShardedNotes(path)
+
+
+def migrate_to_shards(src: str, dest: str) -> bool:
+    """
+    Convert a notes.json (plain, wrapped or legacy list form) or a binary
+    snapshot into the shard directory `dest`, keeping its journal_seq, etag
+    and note ids.
+    """
+    meta: dict = {}
+    if is_snapshot(src):
+        notes = load_snapshot(src)
+    else:
+        notes = {}
+        try:
+            with open(src, "r", encoding="utf-8") as f:
+                for cat, items in iter_notes(f, str, meta):
+                    if isinstance(items, list):
+                        notes[cat] = items
+                    else:
+                        print(f"[WARN] Dropping malformed entry for category {cat!r}.")
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[ERROR] Cannot migrate {src}: {e}")
+            return False
+    if meta.get("shape") != "wrapped":
+        meta = {}
+    ids = meta.get("ids")
+    return save_shards(notes, dest, {"journal_seq": int(meta.get("journal_seq", 0) or 0),
+                                     "etag": int(meta.get("etag", 0) or 0),
+                                     "next_note_id": int(meta.get("next_note_id", 1) or 1),
+                                     "ids": ids if isinstance(ids, dict) else {}})
+
+
+def ensure_sharded(path: str, legacy: str = "notes.json") -> None:
+    """Before first use of shard directory `path`: migrate `legacy` into it."""
+    if not os.path.exists(os.path.join(path, MANIFEST)) and os.path.exists(legacy):
+        if migrate_to_shards(legacy, path):
+            print(f"Migrated {legacy} to {path}/ (the old file is kept as a backup).")
@@ -0,0 +1,270 @@
+from __future__ import annotations
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import MutableSequence
+from typing import Dict, List
+
+from .profiling import traced
+from .utils import Note, load_notes_safe, trace
+
+NotesDict = Dict[str, List[str]]
+
+# Binary snapshot format (little-endian)
+#   header    MAGIC, u32 version, u32 n_categories, u64 heap_offset,
+#             u64 etag, u64 journal_seq, u64 next_note_id (the journal's meta)
+#   table     per category: u32 name_len, u32 count, u64 offsets_pos,
+#             u64 ids_pos (0: no note ids stored), name (UTF-8)
+#   offsets   per category, 8-byte aligned: count + 1 u64 offsets into the heap,
+#             then count u64 note ids (see ids.py) when ids_pos is set
+#   heap      UTF-8 text of every note, back to back
+# Opening a snapshot only parses the header and the table; a category's
+# offsets are read when it is indexed and note text is decoded on access.
+# So counting notes per category never touches the string heap. Version 1
+# files (no meta, no ids) are still read.
+
+MAGIC = b"NOTESNP1"
+VERSION = 2
+_HEADER = struct.Struct("<8sIIQ")
+_META = struct.Struct("<QQQ")       # version 2: follows the header
+_ENTRY_V1 = struct.Struct("<IIQ")
+_ENTRY = struct.Struct("<IIQQ")
+_OFFSET = struct.Struct("<Q")
+_NATIVE_LE = sys.byteorder == "little"
+
+
+def is_snapshot(path: str) -> bool:
+    """True if `path` starts with the binary snapshot magic."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+#--------------------------------------------------------------------------------
+
+class LazyNotes(MutableSequence):
+    """
+    One category of a snapshot: reads decode straight from the mmap;
+    the first mutation copies the category into a normal list of Notes.
+    """
+    __slots__ = ("_mm", "_offs", "_heap", "_count", "_items")
+
+    def __init__(self, mm, offsets_pos: int, count: int, heap: int):
+        self._mm = mm
+        self._offs = offsets_pos
+        self._heap = heap
+        self._count = count
+        self._items: list | None = None
+
+    def _offset(self, i: int) -> int:
+        return _OFFSET.unpack_from(self._mm, self._offs + 8 * i)[0]
+
+    def _decode(self, i: int) -> str:
+        start = self._heap + self._offset(i)
+        end = self._heap + self._offset(i + 1)
+        return self._mm[start:end].decode("utf-8")
+
+    def materialize(self) -> list:
+        if self._items is None:
+            self._items = [Note(s) for s in self]
+        return self._items
+
+    def __len__(self) -> int:
+        return self._count if self._items is None else len(self._items)
+
+    def texts(self, start: int, stop: int) -> list[str]:
+        """Notes [start:stop] as str, decoded in one go (bulk readers: parallel.py)."""
+        if self._items is not None:
+            return [str(n) for n in self._items[start:stop]]
+        start, stop, _ = slice(start, stop).indices(self._count)
+        if start >= stop:
+            return []
+        if _NATIVE_LE:
+            view = memoryview(self._mm)[self._offs + 8 * start:self._offs + 8 * (stop + 1)]
+            offs = view.cast("Q").tolist()
+            view.release()
+        else:
+            offs = [self._offset(i) for i in range(start, stop + 1)]
+        first = offs[0]
+        blob = self._mm[self._heap + first:self._heap + offs[-1]]
+        text = blob.decode("utf-8")
+        if len(text) == len(blob):   # ASCII: byte offsets are character offsets
+            return [text[a - first:b - first] for a, b in zip(offs, offs[1:])]
+        return [blob[a - first:b - first].decode("utf-8") for a, b in zip(offs, offs[1:])]
+
+    def __getitem__(self, i):
+        if self._items is not None:
+            return self._items[i]
+        if isinstance(i, slice):
+            return [self._decode(j) for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("note index out of range")
+        return self._decode(i)
+
+    def __iter__(self):
+        if self._items is not None:
+            yield from self._items
+            return
+        if _NATIVE_LE:
+            offs = memoryview(self._mm)[self._offs:self._offs + 8 * (self._count + 1)].cast("Q")
+            try:
+                heap = self._heap
+                for i in range(self._count):
+                    yield self._mm[heap + offs[i]:heap + offs[i + 1]].decode("utf-8")
+            finally:
+                offs.release()
+        else:
+            for i in range(self._count):
+                yield self._decode(i)
+
+    def __setitem__(self, i, value):
+        self.materialize()[i] = value
+
+    def __delitem__(self, i):
+        del self.materialize()[i]
+
+    def insert(self, i, value):
+        self.materialize().insert(i, value)
+
+    def __eq__(self, other):
+        return list(self) == list(other) if isinstance(other, (list, LazyNotes)) else NotImplemented
+
+    def __repr__(self):
+        return f"LazyNotes({len(self)} notes)"
+#--------------------------------------------------------------------------------
+
+def _u64(values) -> array:
+    arr = array("Q", values)
+    if not _NATIVE_LE:
+        arr.byteswap()
+    return arr
+
+
+@traced
+def write_snapshot(notes: NotesDict, path: str, meta: dict | None = None) -> None:
+    """
+    Write `notes` as a binary snapshot (via <path>.tmp + os.replace).
+    `meta` keys (etag, journal_seq, next_note_id) go into the header; its
+    "ids" ({category: [ids]}) are stored with each category.
+    """
+    meta = meta or {}
+    ids = meta.get("ids") or {}
+    names = [str(cat).encode("utf-8") for cat in notes]
+    table_size = sum(_ENTRY.size + len(n) for n in names)
+    pos = _HEADER.size + _META.size + table_size
+    pos += -pos % 8
+    heap = bytearray()
+    entries, arrays = [], []
+    for name, (cat, items) in zip(names, notes.items()):
+        offs = array("Q", [0] * (len(items) + 1))
+        offs[0] = len(heap)
+        for i, text in enumerate(items, 1):
+            heap += str(text).encode("utf-8")
+            offs[i] = len(heap)
+        if not _NATIVE_LE:
+            offs.byteswap()
+        arrays.append(offs)
+        offs_pos, pos = pos, pos + 8 * len(offs)
+        cat_ids = ids.get(cat)
+        ids_pos = 0
+        if cat_ids is not None and len(cat_ids) == len(items):
+            arrays.append(_u64(cat_ids))
+            ids_pos, pos = pos, pos + 8 * len(items)
+        entries.append((name, len(items), offs_pos, ids_pos))
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(entries), pos))
+        f.write(_META.pack(int(meta.get("etag", 0) or 0), int(meta.get("journal_seq", 0) or 0),
+                           int(meta.get("next_note_id", 1) or 1)))
+        for name, count, offs_pos, ids_pos in entries:
+            f.write(_ENTRY.pack(len(name), count, offs_pos, ids_pos))
+            f.write(name)
+        f.write(b"\0" * (-f.tell() % 8))
+        for arr in arrays:
+            arr.tofile(f)
+        f.write(heap)
+    os.replace(tmp, path)
+    trace("snapshot: wrote %d categories, %d heap bytes to %s", len(entries), len(heap), path)
+#--------------------------------------------------------------------------------
+
+def _check(mm, path: str) -> tuple[int, int, int]:
+    magic, version, n_cats, heap = _HEADER.unpack_from(mm, 0)
+    if magic != MAGIC or version not in (1, VERSION):
+        raise ValueError(f"{path} is not a version 1 or {VERSION} notes snapshot")
+    return version, n_cats, heap
+
+
+def read_meta(path: str) -> dict:
+    """etag, journal_seq and next_note_id from the header alone (zeros, 1 for version 1)."""
+    with open(path, "rb") as f:
+        head = f.read(_HEADER.size + _META.size)
+    if len(head) < _HEADER.size:
+        raise ValueError(f"{path} is too short to be a notes snapshot")
+    version, _, _ = _check(head, path)
+    etag, seq, next_id = _META.unpack_from(head, _HEADER.size) if version > 1 else (0, 0, 1)
+    return {"etag": etag, "journal_seq": seq, "next_note_id": next_id}
+
+
+@traced
+def load_snapshot(path: str, meta: dict | None = None) -> dict[str, LazyNotes]:
+    """
+    Map a snapshot; return {category: LazyNotes} without decoding any note.
+    `meta` receives the header's etag, journal_seq and next_note_id, and
+    "ids": a function giving the stored ids of a category (None if none).
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < _HEADER.size:
+            raise ValueError(f"{path} is too short to be a notes snapshot")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    version, n_cats, heap = _check(mm, path)
+    notes: dict[str, LazyNotes] = {}
+    id_arrays: dict[str, tuple[int, int]] = {}
+    pos = _HEADER.size
+    entry = _ENTRY_V1
+    if version > 1:
+        etag, seq, next_id = _META.unpack_from(mm, pos)
+        pos += _META.size
+        entry = _ENTRY
+    else:
+        etag, seq, next_id = 0, 0, 1
+    for _ in range(n_cats):
+        name_len, count, offs_pos, *rest = entry.unpack_from(mm, pos)
+        pos += entry.size
+        name = bytes(mm[pos:pos + name_len]).decode("utf-8")
+        pos += name_len
+        notes[name] = LazyNotes(mm, offs_pos, count, heap)
+        if rest and rest[0]:
+            id_arrays[name] = (rest[0], count)
+
+    def ids(cat: str) -> list | None:
+        if cat not in id_arrays:
+            return None
+        start, count = id_arrays[cat]
+        arr = array("Q", mm[start:start + 8 * count])
+        if not _NATIVE_LE:
+            arr.byteswap()
+        return arr.tolist()
+
+    if meta is not None:
+        meta.update(etag=etag, journal_seq=seq, next_note_id=next_id, ids=ids)
+    return notes
+#--------------------------------------------------------------------------------
+
+def json_to_snapshot(json_path: str, snapshot_path: str) -> NotesDict:
+    """Convert a JSON notes file (any format load_notes_safe reads) to a snapshot."""
+    notes = load_notes_safe(json_path)
+    write_snapshot(notes, snapshot_path)
+    return notes
+
+
+def snapshot_to_json(snapshot_path: str, json_path: str) -> bool:
+    """Convert a snapshot back to the plain {category: [notes...]} JSON file."""
+    from .notes_app import save_notes  # notes_app imports this module
+
+    notes = load_snapshot(snapshot_path)
+    return save_notes({cat: list(items) for cat, items in notes.items()}, json_path)
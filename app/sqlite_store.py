@@ -0,0 +1,332 @@
+from __future__ import annotations
+import contextlib
+import os
+import sqlite3
+from typing import Dict, List
+
+from .hooks import NoteHooks
+from .ids import NoteIds
+from .profiling import traced
+from .utils import Note, normalize, trace
+
+NotesDict = Dict[str, List[str]]
+
+# SQLite storage engine (stdlib sqlite3)
+#   categories(name)                 category order = rowid order; keeps empty ones
+#   notes(id, cat, ord, text, key)   UNIQUE(key): the database refuses normalized
+#                                    duplicates, so it can stand in for `seen`;
+#                                    id is the note's stable id (see ids.py):
+#                                    AUTOINCREMENT, so not even the newest
+#                                    note's id comes back after a delete
+#                                    (older databases are migrated on open)
+#   notes_fts                        FTS5 trigram index over notes.text, kept in
+#                                    sync by triggers; serves search_notes
+# SqliteStore is a NoteHooks listener: every mutation the app makes is applied
+# to the database as its own transaction (batch() groups several into one).
+# batch() takes the write lock up front (BEGIN IMMEDIATE), so a `key in store`
+# check made inside it still holds when the insert runs: no other process
+# can add the same key in between.
+# Rows are found by their unique key, not by position, so a write from one
+# process never lands on the wrong note of another.
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+_NOTES_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id   INTEGER PRIMARY KEY AUTOINCREMENT,
+    cat  TEXT NOT NULL REFERENCES categories(name),
+    ord  INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    key  TEXT NOT NULL
+);
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (name TEXT PRIMARY KEY);
+""" + _NOTES_TABLE.format(name="notes") + """
+CREATE UNIQUE INDEX IF NOT EXISTS notes_key ON notes(key);
+CREATE INDEX IF NOT EXISTS notes_cat_ord ON notes(cat, ord);
+CREATE INDEX IF NOT EXISTS notes_ord ON notes(ord);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts
+    USING fts5(text, content='notes', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts(notes_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE OF text ON notes BEGIN
+    INSERT INTO notes_fts(notes_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO notes_fts(rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+FTS_MIN_TERM = 3   # trigram index: shorter terms cannot be looked up
+
+
+def _migrate_ids(conn) -> None:
+    """Rebuild a notes table made without AUTOINCREMENT (ids are kept)."""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'notes'").fetchone()
+    if row is None or "AUTOINCREMENT" in row[0].upper():
+        return
+    with conn:
+        for trigger in ("notes_ai", "notes_ad", "notes_au"):   # recreated by _FTS_SCHEMA
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.execute(_NOTES_TABLE.format(name="notes_v2"))
+        conn.execute("INSERT INTO notes_v2(id, cat, ord, text, key) SELECT id, cat, ord, text, key FROM notes")
+        conn.execute("DROP TABLE notes")
+        conn.execute("ALTER TABLE notes_v2 RENAME TO notes")
+    trace("sqlite: notes table migrated to AUTOINCREMENT ids")
+
+
+def is_sqlite(path: str) -> bool:
+    """True for an SQLite database file, or a new path ending in .db/.sqlite"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+    except FileNotFoundError:
+        return path.endswith(SQLITE_SUFFIXES)
+    except OSError:
+        return False
+#--------------------------------------------------------------------------------
+
+class SqliteStore(NoteHooks):
+    """
+    An open notes database. load() returns the notes as a mapping; pass the
+    store as `hooks` to the mutators to write each change through, as `seen`
+    to dedupe against the unique key index, and as the search index.
+    """
+
+    def __init__(self, path: str = "notes.db", timeout: float = 10.0):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")      # readers don't block the writer
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        _migrate_ids(self.conn)
+        self.conn.executescript(_SCHEMA)
+        try:
+            new_fts = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'").fetchone() is None
+            self.conn.executescript(_FTS_SCHEMA)
+            if new_fts:   # e.g. made by a build without FTS5: index the notes already there
+                with self.conn:
+                    self.conn.execute("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')")
+            self.fts = True
+        except sqlite3.OperationalError as e:   # built without FTS5 / trigram
+            trace("sqlite: no full-text index (%s); search scans", e)
+            self.fts = False
+        self.notes: NotesDict = {}
+        self.ids = NoteIds()   # the rowids, by position
+        self._batch = 0
+        self.lock = _WriteLock(self)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    @contextlib.contextmanager
+    def _tx(self):
+        """One transaction per operation, unless inside batch()."""
+        if self._batch:
+            yield self.conn
+            return
+        with self.conn:
+            yield self.conn
+
+    @contextlib.contextmanager
+    def batch(self, wait: bool = True):
+        """Group every change made inside into one transaction, holding the
+        database's write lock from the start. wait=False: raise
+        sqlite3.OperationalError at once if another process holds it."""
+        with self.conn:
+            if not self.conn.in_transaction:
+                if wait:
+                    self.conn.execute("BEGIN IMMEDIATE")
+                else:
+                    busy = self.conn.execute("PRAGMA busy_timeout").fetchone()[0]
+                    self.conn.execute("PRAGMA busy_timeout = 0")
+                    try:
+                        self.conn.execute("BEGIN IMMEDIATE")
+                    finally:
+                        self.conn.execute(f"PRAGMA busy_timeout = {int(busy)}")
+            self._batch += 1
+            try:
+                yield self
+            finally:
+                self._batch -= 1
+    #--------------------------------------------------------------------------------
+
+    @traced(name="sqlite.load")
+    def load(self, into=None) -> NotesDict:
+        """All notes, in category and note order. Keys come from the table."""
+        notes = {} if into is None else into
+        rows = self.conn.execute(
+            "SELECT c.name, n.id, n.text, n.key FROM categories c "
+            "LEFT JOIN notes n ON n.cat = c.name ORDER BY c.rowid, n.ord")
+        ids: dict[str, list[int]] = {}
+        for cat, nid, text, key in rows:
+            items = notes.setdefault(cat, [])
+            if text is not None:
+                items.append(Note(text, key))
+                ids.setdefault(cat, []).append(nid)
+        self.notes = notes
+        self.ids.reset(notes, lambda cat: ids.get(cat, []))
+        return notes
+
+    @traced(name="sqlite.replace_all")
+    def replace_all(self, notes: NotesDict, ids: dict | None = None) -> int:
+        """Make the database hold exactly `notes`, in one transaction, under
+        their ids ({category: [ids]}) where given. Returns the number of
+        notes refused as normalized duplicates."""
+        ids = ids or {}
+        dropped = 0
+        with self.conn:
+            self.conn.execute("DELETE FROM notes")
+            self.conn.execute("DELETE FROM categories")
+            ord_ = 0
+            for cat, items in notes.items():
+                self.conn.execute("INSERT INTO categories(name) VALUES (?)", (cat,))
+                cat_ids = ids.get(cat)
+                if cat_ids is None or len(cat_ids) != len(items):
+                    cat_ids = [None] * len(items)   # numbered by the database
+                for text, nid in zip(items, cat_ids):
+                    ord_ += 1
+                    cur = self.conn.execute(
+                        "INSERT OR IGNORE INTO notes(id, cat, ord, text, key) VALUES (?, ?, ?, ?, ?)",
+                        (nid, cat, ord_, str(text), normalize(text)))
+                    dropped += cur.rowcount == 0
+        self.notes = notes
+        return dropped
+    #--------------------------------------------------------------------------------
+    # seen: membership is a lookup in the unique key index
+
+    def __contains__(self, key) -> bool:
+        return self.conn.execute("SELECT 1 FROM notes WHERE key = ?", (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    # search index: see search_notes
+    def candidates(self, term: str) -> set[tuple[str, int]] | None:
+        """(category, 0-based position) of every note of load() containing
+        `term` (case-insensitive), or None when the index cannot answer."""
+        term = term.strip()
+        if not self.fts or len(term) < FTS_MIN_TERM:
+            return None
+        rows = self.conn.execute("SELECT rowid FROM notes_fts WHERE notes_fts MATCH ?",
+                                 ('"' + term.replace('"', '""') + '"',))
+        # positions from the ids of the loaded notes: O(log n) per hit, no
+        # numbering of the whole table; rows added by another process since
+        # load() are not in our notes anyway
+        ids = self.ids
+        return {ids.locate(nid) for (nid,) in rows if nid in ids}
+    #--------------------------------------------------------------------------------
+    # NoteHooks: each change is one transaction
+
+    def _next_ord(self, conn) -> int:
+        return conn.execute("SELECT COALESCE(MAX(ord), 0) + 1 FROM notes").fetchone()[0]
+
+    def _drop_category_if_gone(self, conn, cat: str) -> None:
+        if cat not in self.notes:   # the app deleted it (e.g. emptied by delete_note)
+            conn.execute("DELETE FROM categories WHERE name = ?", (cat,))
+
+    def added(self, cat, pos, text):
+        try:
+            with self._tx() as conn:
+                conn.execute("INSERT OR IGNORE INTO categories(name) VALUES (?)", (cat,))
+                nid = conn.execute("INSERT INTO notes(cat, ord, text, key) VALUES (?, ?, ?, ?)",
+                                   (cat, self._next_ord(conn), str(text), normalize(text))).lastrowid
+        except sqlite3.IntegrityError:
+            # added elsewhere since the caller's `key in store` (made outside
+            # batch()/lock): take the note back out so memory matches the
+            # database, and stop the later hooks from indexing it
+            items = self.notes.get(cat)
+            if items is not None and pos < len(items):
+                del items[pos]
+                if not items:
+                    del self.notes[cat]
+                    with self._tx() as conn:
+                        self._drop_category_if_gone(conn, cat)
+            print(f"[WARN] {str(text)!r} is already in {self.path} (added elsewhere); not added.")
+            raise
+        self.ids.insert(cat, pos, nid)
+
+    def removed(self, cat, pos, text):
+        with self._tx() as conn:
+            conn.execute("DELETE FROM notes WHERE key = ?", (normalize(text),))
+            self._drop_category_if_gone(conn, cat)
+        self.ids.remove(cat, pos)
+
+    def edited(self, cat, pos, old, new):
+        try:
+            with self._tx() as conn:
+                conn.execute("UPDATE notes SET text = ?, key = ? WHERE key = ?",
+                             (str(new), normalize(new), normalize(old)))
+        except sqlite3.IntegrityError:
+            print(f"[WARN] {str(new)!r} is already in {self.path} (added elsewhere); edit not stored.")
+
+    def moved(self, src, pos, dest, dest_pos, text):
+        with self._tx() as conn:
+            conn.execute("INSERT OR IGNORE INTO categories(name) VALUES (?)", (dest,))
+            conn.execute("UPDATE notes SET cat = ?, ord = ? WHERE key = ?",
+                         (dest, self._next_ord(conn), normalize(text)))
+            self._drop_category_if_gone(conn, src)
+        self.ids.move(src, pos, dest)
+
+    def renamed(self, old, new, offset, texts):
+        with self._tx() as conn:
+            conn.execute("INSERT OR IGNORE INTO categories(name) VALUES (?)", (new,))
+            # after everything else, in their old order
+            conn.execute("UPDATE notes SET cat = ?, ord = ord + ? WHERE cat = ?",
+                         (new, self._next_ord(conn), old))
+            conn.execute("DELETE FROM categories WHERE name = ?", (old,))
+        self.ids.rename(old, new)
+#--------------------------------------------------------------------------------
+
+class _WriteLock:
+    """SqliteStore.batch() as a reusable `with` target (like Autosaver.lock),
+    for the menu's `mutating`."""
+
+    def __init__(self, store: SqliteStore):
+        self.store = store
+        self._held: list = []
+
+    def __enter__(self):
+        batch = self.store.batch()
+        batch.__enter__()
+        self._held.append(batch)
+        return self.store
+
+    def __exit__(self, *exc):
+        return self._held.pop().__exit__(*exc)
+#--------------------------------------------------------------------------------
+
+def load_sqlite(path: str) -> NotesDict:
+    store = SqliteStore(path)
+    try:
+        return store.load()
+    finally:
+        store.close()
+
+
+def save_sqlite(notes: NotesDict, path: str, ids: dict | None = None) -> bool:
+    """Replace the database contents with `notes` (one transaction), keeping
+    the note ids of `ids` ({category: [ids]}) where given."""
+    try:
+        store = SqliteStore(path)
+    except sqlite3.Error as e:
+        print(f"[ERROR] Cannot open {path}: {e}")
+        return False
+    try:
+        dropped = store.replace_all(notes, ids)
+    except sqlite3.Error as e:
+        print(f"[ERROR] Could not save to {path}: {e}")
+        return False
+    finally:
+        store.close()
+    if dropped:
+        print(f"[WARN] {dropped} normalized duplicate note(s) not stored in {path}.")
+    return True
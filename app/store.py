@@ -0,0 +1,210 @@
+from __future__ import annotations
+from array import array
+from collections.abc import MutableMapping, MutableSequence
+from typing import Dict, Iterable, List
+
+NotesDict = Dict[str, List[str]]
+
+# Compact notes storage
+# A plain {category: [str, ...]} keeps one Python str object per note (~50
+# bytes of header each) plus a pointer in the list. NotesStore keeps each
+# category's notes as UTF-8 bytes back to back in one bytearray with an
+# offsets array -- u32 until the buffer passes 4 GiB, u64 from then on -- so
+# a note costs its text + 4 bytes. Notes read back as plain str: their
+# normalized keys are not stored, the indexes (KeyIndex rows) already hold
+# them and normalize() derives the rest on demand. Categories are interned
+# to integer ids. Both classes behave like the dict/list they replace, so
+# the helpers in notes_app work on either.
+
+_U32_MAX = 0xFFFFFFFF
+
+
+class PackedNotes(MutableSequence):
+    """The notes of one category: one contiguous buffer + an offsets array."""
+    __slots__ = ("cid", "_buf", "_offs")
+
+    def __init__(self, texts: Iterable[str] = (), cid: int = -1):
+        self.cid = cid
+        self._buf = bytearray()
+        self._offs = array("I", [0])
+        self.extend(texts)
+
+    def __len__(self) -> int:
+        return len(self._offs) - 1
+
+    def _index(self, i: int) -> int:
+        n = len(self._offs) - 1
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("note index out of range")
+        return i
+
+    def _fit(self, size: int) -> None:
+        """Widen the offsets to u64 before the buffer grows past 4 GiB."""
+        if size > _U32_MAX and self._offs.typecode == "I":
+            self._offs = array("Q", self._offs)
+
+    def _shift(self, start: int, delta: int) -> None:
+        """Move offsets[start:] by `delta` bytes after a resize in the buffer."""
+        if delta:
+            offs = self._offs
+            offs[start:] = array(offs.typecode, map(delta.__add__, offs[start:]))   # the loop runs in C
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = self._index(i)
+        return self._buf[self._offs[i]:self._offs[i + 1]].decode("utf-8")
+
+    def __iter__(self):
+        buf, offs = self._buf, self._offs
+        for i in range(len(offs) - 1):
+            yield buf[offs[i]:offs[i + 1]].decode("utf-8")
+
+    def __setitem__(self, i, text):
+        if isinstance(i, slice):
+            items = list(self)
+            items[i] = text
+            self.clear()
+            self.extend(items)
+            return
+        i = self._index(i)
+        data = str(text).encode("utf-8")
+        start, end = self._offs[i], self._offs[i + 1]
+        self._fit(len(self._buf) + len(data) - (end - start))
+        self._buf[start:end] = data
+        self._shift(i + 1, len(data) - (end - start))
+
+    def __delitem__(self, i):
+        if isinstance(i, slice):
+            items = list(self)
+            del items[i]
+            self.clear()
+            self.extend(items)
+            return
+        i = self._index(i)
+        start, end = self._offs[i], self._offs[i + 1]
+        del self._buf[start:end]
+        del self._offs[i + 1]
+        self._shift(i + 1, start - end)
+
+    def insert(self, i, text):
+        n = len(self)
+        if i >= n:                      # append: the common case, O(1)
+            self.append(text)
+            return
+        i = max(0, i + n if i < 0 else i)
+        data = str(text).encode("utf-8")
+        self._fit(len(self._buf) + len(data))
+        at = self._offs[i]
+        self._buf[at:at] = data
+        self._offs.insert(i + 1, at + len(data))
+        self._shift(i + 2, len(data))
+
+    def append(self, text):
+        data = str(text).encode("utf-8")
+        self._fit(len(self._buf) + len(data))
+        self._buf += data
+        self._offs.append(len(self._buf))
+
+    def extend(self, texts):
+        for text in texts:
+            self.append(text)
+
+    def copy(self) -> "PackedNotes":
+        """A detached copy (two buffer copies, no decoding)."""
+        clone = PackedNotes()
+        clone._buf = bytearray(self._buf)
+        clone._offs = array(self._offs.typecode, self._offs)
+        return clone
+
+    def clear(self):
+        self._buf = bytearray()
+        self._offs = array("I", [0])
+
+    def nbytes(self) -> int:
+        return len(self._buf) + self._offs.itemsize * len(self._offs)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, PackedNotes)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"PackedNotes({list(self)!r})"
+#--------------------------------------------------------------------------------
+
+class NotesStore(MutableMapping):
+    """
+    {category: PackedNotes} with categories interned to integer ids.
+    Drop-in for NotesDict: indexing, setdefault, pop, items(), len() ...
+    """
+    __slots__ = ("_ids", "_names", "_cats")
+
+    def __init__(self, notes: NotesDict | None = None):
+        self._ids: dict[str, int] = {}
+        self._names: list[str | None] = []
+        self._cats: list[PackedNotes | None] = []
+        for cat, items in (notes or {}).items():
+            self[cat] = items
+
+    def category_id(self, cat: str) -> int:
+        """The interned id of `cat` (KeyError if it does not exist)."""
+        return self._ids[cat]
+
+    def category_name(self, cid: int) -> str:
+        name = self._names[cid]
+        if name is None:
+            raise KeyError(cid)
+        return name
+
+    def __getitem__(self, cat: str) -> PackedNotes:
+        return self._cats[self._ids[cat]]
+
+    def __setitem__(self, cat: str, texts) -> None:
+        cid = self._ids.get(cat)
+        if cid is None:
+            cid = self._ids[cat] = len(self._cats)
+            self._names.append(cat)
+            self._cats.append(None)
+        if not isinstance(texts, PackedNotes) or texts.cid not in (-1, cid):
+            texts = PackedNotes(texts)
+        texts.cid = cid
+        self._cats[cid] = texts
+
+    def __delitem__(self, cat: str) -> None:
+        cid = self._ids.pop(cat)
+        self._names[cid] = None
+        self._cats[cid] = None
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, cat) -> bool:
+        return cat in self._ids
+
+    def setdefault(self, cat: str, default=()):
+        # MutableMapping.setdefault would hand back `default` itself (a plain
+        # list the mutators then append to); return the stored view instead
+        if cat not in self._ids:
+            self[cat] = default if default is not None else ()
+        return self[cat]
+
+    def to_dict(self) -> NotesDict:
+        return {cat: list(items) for cat, items in self.items()}
+
+    def nbytes(self) -> int:
+        """Bytes held in note buffers and offset arrays."""
+        return sum(c.nbytes() for c in self._cats if c is not None)
+
+    def __eq__(self, other):
+        if isinstance(other, (dict, NotesStore)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return f"NotesStore({len(self)} categories, {self.nbytes()} bytes)"
@@ -0,0 +1,194 @@
+from __future__ import annotations
+import json
+from typing import Callable, Iterator, TextIO
+
+# Streaming notes reader
+# json.load() needs the whole document in memory before anything is usable,
+# and the loaders then copy every note once more. This reader walks the top
+# level of a notes file by hand and hands the C decoder one category array at
+# a time (widening its window up to MAX_WINDOW characters for it), so memory
+# stays around the text of one category + its notes, and each category is
+# yielded as soon as its closing "]" is read. A category larger than that
+# window is decoded note by note instead.
+
+CHUNK_SIZE = 1 << 16
+MAX_WINDOW = 1 << 24   # characters a whole category array may take in the window
+# top-level keys that are metadata in the wrapped {"notes": {...}, ...} form
+META_KEYS = ("seen", "journal_seq", "version", "etag", "next_note_id", "ids")
+
+_decoder = json.JSONDecoder()
+_WS = " \t\n\r"
+_TAIL = 6   # an error this close to the end of the window may be a cut-off literal/escape
+
+
+class _Reader:
+    """A sliding window over a text file, consumed left to right."""
+
+    def __init__(self, f: TextIO, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.i = 0
+        self.eof = False
+        self.span = 0   # characters of the last array decoded whole (see array())
+
+    def fill(self, size: int | None = None) -> bool:
+        """Read one more chunk of `size` (default chunk_size), dropping what
+        was consumed. False at EOF."""
+        if self.eof:
+            return False
+        data = self.f.read(size or self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.i:] + data
+        self.i = 0
+        return True
+
+    def error(self, msg: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(msg, self.buf, self.i)
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at EOF), not consumed."""
+        while True:
+            while self.i < len(self.buf) and self.buf[self.i] in _WS:
+                self.i += 1
+            if self.i < len(self.buf):
+                return self.buf[self.i]
+            if not self.fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise self.error(f"Expecting {ch!r}")
+        self.i += 1
+
+    def value(self):
+        """Decode one complete JSON value at the cursor."""
+        self.peek()
+        grow = self.chunk_size   # doubled per retry: a long value is decoded O(log) times
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.i)
+            except json.JSONDecodeError as e:
+                # widen the window and retry only if the value may run past it;
+                # anything else is malformed wherever the rest of the file goes
+                cut = e.pos >= len(self.buf) - _TAIL or e.msg.startswith("Unterminated string")
+                if cut and self.fill(grow):
+                    grow *= 2
+                    continue
+                raise json.JSONDecodeError(e.msg, self.buf, e.pos) from None
+            if end == len(self.buf) and self.fill(grow):
+                grow *= 2
+                continue      # a number may continue in the next chunk
+            self.i = end
+            return value
+
+    def array(self) -> list | None:
+        """Decode the array at the cursor in one call when it fits in
+        MAX_WINDOW characters; None (nothing consumed) when it does not."""
+        # categories tend to be alike in size: start from a window that holds
+        # the last one, so a failed (cut-off) attempt is the exception
+        want = min(self.span + self.span // 4, MAX_WINDOW) - (len(self.buf) - self.i)
+        if want > 0:
+            self.fill(want)
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.i)
+            except json.JSONDecodeError as e:
+                cut = e.pos >= len(self.buf) - _TAIL or e.msg.startswith("Unterminated string")
+                window = len(self.buf) - self.i
+                # 4x the window per retry: the cut-off attempts add up to a third of the last
+                if cut and window < MAX_WINDOW and self.fill(3 * max(window, self.chunk_size)):
+                    continue
+                return None   # too large, or malformed: elements() reads (or reports) it
+            self.span, self.i = end - self.i, end
+            return value
+
+    def members(self) -> Iterator[str]:
+        """Keys of the object whose '{' was just consumed; the caller reads each value."""
+        if self.peek() == "}":
+            self.i += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise self.error("Expecting property name enclosed in double quotes")
+            self.expect(":")
+            yield key
+            c = self.peek()
+            self.i += 1
+            if c == "}":
+                return
+            if c != ",":
+                self.i -= 1
+                raise self.error("Expecting ',' delimiter")
+
+    def elements(self) -> Iterator:
+        """Values of the array whose '[' was just consumed."""
+        if self.peek() == "]":
+            self.i += 1
+            return
+        while True:
+            yield self.value()
+            c = self.peek()
+            self.i += 1
+            if c == "]":
+                return
+            if c != ",":
+                self.i -= 1
+                raise self.error("Expecting ',' delimiter")
+#--------------------------------------------------------------------------------
+
+def _category(r: _Reader, convert: Callable):
+    if r.peek() == "[":
+        items = r.array()
+        if items is not None:
+            return list(map(convert, items))
+        r.i += 1
+        return [convert(x) for x in r.elements()]
+    return r.value()  # malformed (non-list) entry: the loader decides
+
+
+def iter_notes(f: TextIO, convert: Callable = str, meta: dict | None = None,
+               chunk_size: int = CHUNK_SIZE):
+    """
+    Yield (category, notes) pairs from a notes file as they are decoded.
+
+    `notes` is a list of convert(item) for well-formed categories, or the raw
+    value for malformed ones. `meta` (if given) receives "shape" -- "dict",
+    "wrapped", "list" or "scalar" -- plus the META_KEYS of the wrapped form.
+    A legacy top-level list comes out as one "general" category.
+    Raises json.JSONDecodeError on corrupt input, like json.load.
+    """
+    meta = {} if meta is None else meta
+    r = _Reader(f, chunk_size)
+    c = r.peek()
+    if c == "[":
+        meta["shape"] = "list"
+        r.i += 1
+        yield "general", [convert(x) for x in r.elements()]
+    elif c == "{":
+        meta["shape"] = "dict"
+        r.i += 1
+        deferred = []
+        for key in r.members():
+            if key == "notes" and meta["shape"] == "dict" and r.peek() == "{":
+                meta["shape"] = "wrapped"
+                r.i += 1
+                for cat in r.members():
+                    yield cat, _category(r, convert)
+            elif key in META_KEYS:
+                deferred.append((key, r.value()))  # category or metadata? decide at the end
+            else:
+                yield key, _category(r, convert)
+        for key, value in deferred:
+            if meta["shape"] == "wrapped":
+                meta[key] = value
+            else:
+                yield key, [convert(x) for x in value] if isinstance(value, list) else value
+    else:
+        meta["shape"] = "scalar"
+        r.value()
+    if r.peek() != "":
+        raise r.error("Extra data")
@@ -2,87 +2,151 @@ from __future__ import annotations
 import re
 import os
 from datetime import datetime
+from functools import lru_cache
 import json, shutil, os
 from typing import Dict, List
 
+from .profiling import DEBUG, traced   # DEBUG: NOTES_DEBUG env switch
+from .streaming import iter_notes
 
-# Debug toggle (one switch)
-# prefer env var if present; else default False.
-DEBUG = os.getenv("NOTES_DEBUG", 0) in ("1", "true", "True")
 
-def trace(msg: str):
-    """Tiny debug helper that shows timestamp + message, only when it's ON"""  
+def trace(msg: str, *args):
+    """Tiny debug helper that shows timestamp + message, only when it's ON.
+    Pass values as args (%-style) so nothing is formatted while it's off."""
     if not DEBUG:
         return
+    if args:
+        msg = msg % args
     now = datetime.now().strftime("%H:%M:%S")
     print(f"[{now}]{msg}")
 
 
 
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+NORMALIZE_CACHE_SIZE = 16384   # memo for ad-hoc strings (search terms, user input)
+
+
+def _normalize_text(s: str) -> str:
+    # lowercase, replace non-alphanum runs (incl. whitespace) with ONE space,
+    # then trim/collapse -- same result as strip/split/join/lower/sub/split/join
+    return " ".join(_NON_ALNUM.sub(" ", s.lower()).split())
+
+_normalize = lru_cache(maxsize=NORMALIZE_CACHE_SIZE)(_normalize_text)
+
+# normalize_many: after lower(), every non-ASCII char is outside [a-z0-9],
+# so non-ASCII runs become spaces and the rest is one str.translate
+_NON_ASCII = re.compile(r"[^\x00-\x7f]+")
+_ASCII_TO_SPACE = str.maketrans({i: " " for i in range(1, 128)
+                                 if chr(i) not in "abcdefghijklmnopqrstuvwxyz0123456789"})
+
+
+def normalize_many(texts: list[str]) -> list[str]:
+    """normalize() for a whole chunk: one lower() and one translate over the
+    texts joined by NUL, instead of a regex pass per text. No memo."""
+    if any("\x00" in t for t in texts):   # NUL is the separator: fall back
+        return [_normalize_text(t) for t in texts]
+    joined = "\x00".join(texts).lower()
+    if not joined.isascii():
+        joined = _NON_ASCII.sub(" ", joined)
+    joined = joined.translate(_ASCII_TO_SPACE)
+    return [" ".join(part.split()) for part in joined.split("\x00")]
+
+
 def normalize(s: str) -> str:
     """Normalize a note for dedup checks:
     - trim outer whitespace
     - collapse inner spaces
     - lowercase
     - replace punctuation with spaces
+    A `Note` keeps its key once asked; other strings go through a bounded LRU memo.
+    Hot path: deliberately not traced (time it through its callers' spans).
     """
-    trace(f"[enter normalize] {s!r}")
-    s = s.strip()
-    s = " ".join(s.split())
-    s = s.lower()
-    s = re.sub(r"[^a-z0-9]+", " ", s)   # <-- replace non-alphanum with ONE space
-    s = " ".join(s.split())              # <-- collapse multiple spaces to one
-    trace(f"[exit  normalize],{s!r}")
-    return s
+    if type(s) is Note:
+        return s.key
+    return _normalize(s)
+#--------------------------------------------------------------------------------
+
+class Note(str):
+    """
+    A note's text that carries its normalized key.
+    It *is* a str (compares, hashes and serializes like the text), so it can
+    live in the usual {category: [notes...]} lists; the key is computed on
+    first use (or passed in when already known) and kept, instead of on
+    every dedup check.
+    """
+    __slots__ = ("_key",)
+
+    def __new__(cls, text, key: str | None = None):
+        self = super().__new__(cls, text)
+        self._key = key
+        return self
+
+    @property
+    def key(self) -> str:
+        key = self._key
+        if key is None:
+            key = self._key = _normalize_text(self)
+        return key
 #--------------------------------------------------------------------------------
 
 NotesDict = Dict[str, List[str]]
 
-def load_notes_safe(path: str = "notes.json") -> NotesDict:
+@traced
+def load_notes_safe(path: str = "notes.json", on_category=None, meta: dict | None = None) -> NotesDict:
     """
     Safely load notes JSON, guarding against missing/corrupt/wrong-type files.
     Returns {} on any recoverable problem. Never raises for common I/O/JSON issues.
+    The file is streamed category by category; `on_category(cat, notes)` is
+    called for each one as soon as it is decoded. `meta` receives the
+    metadata of the wrapped {"notes": {...}, ...} form (see streaming.py).
     """
+    meta = {} if meta is None else meta
+    clean: NotesDict = {}
     try:
         with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+            for cat, items in iter_notes(f, str, meta):
+                if meta["shape"] == "list":
+                    break
+                # Optional: enforce values are lists of strings to be extra safe
+                if isinstance(items, list):
+                    clean[cat] = items
+                    if on_category is not None:
+                        on_category(cat, items)
+                else:
+                    print(f"[WARN] Dropping malformed entry for category {cat!r}.")
     except FileNotFoundError:
         print(f"[WARN] {path} not found. Starting fresh.")
         trace("Returning empty notes due to missing file.")
         return {}
     except json.JSONDecodeError:
         print(f"[ERROR] {path} is corrupt. Backing it up and starting fresh.")
-        try:
-            backup = path.replace(".json", "_corrupt.json")
-            # If a previous corrupt backup exists, keep the newest by appending a counter
-            if os.path.exists(backup):
-                i = 2
-                while os.path.exists(path.replace(".json", f"_corrupt_{i}.json")):
-                    i += 1
-                backup = path.replace(".json", f"_corrupt_{i}.json")
-            shutil.move(path, backup)
-            trace(f"Moved corrupt file to {backup}")
-        except Exception as e:
-            print(f"[WARN] Could not back up corrupt file: {e}")
+        backup_corrupt(path)
         return {}
     except Exception as e:
         print(f"[ERROR] Unexpected load issue: {e}")
         return {}
 
-    if not isinstance(data, dict):
+    if meta.get("shape") not in ("dict", "wrapped"):
         print(f"[WARN] {path} contained JSON but not a dict. Resetting to empty.")
-        trace(f"Type was {type(data).__name__}; expected dict[str, list[str]].")
+        trace("Shape was %s; expected dict[str, list[str]].", meta.get("shape"))
         return {}
-
-    # Optional: enforce values are lists of strings to be extra safe
-    clean: NotesDict = {}
-    for cat, items in data.items():
-        if isinstance(cat, str) and isinstance(items, list):
-            clean_items = [str(x) for x in items]
-            clean[cat] = clean_items
-        else:
-            print(f"[WARN] Dropping malformed entry for category {cat!r}.")
-    trace(f"Loaded {len(clean)} categories from {path}.")
+    trace("Loaded %d categories from %s.", len(clean), path)
     return clean
+#--------------------------------------------------------------------------------
 
-
+def backup_corrupt(path: str) -> str | None:
+    """Move a corrupt notes file aside (<name>_corrupt[_N].json); return the backup path."""
+    try:
+        backup = path.replace(".json", "_corrupt.json")
+        # If a previous corrupt backup exists, keep the newest by appending a counter
+        if os.path.exists(backup):
+            i = 2
+            while os.path.exists(path.replace(".json", f"_corrupt_{i}.json")):
+                i += 1
+            backup = path.replace(".json", f"_corrupt_{i}.json")
+        shutil.move(path, backup)
+        trace("Moved corrupt file to %s", backup)
+        return backup
+    except Exception as e:
+        print(f"[WARN] Could not back up corrupt file: {e}")
+        return None
@@ -0,0 +1,47 @@
+"""
+Import benchmark: add_note per line vs bulk_add over the same text dump.
+
+    python benchmarks/bench_bulk_add.py             # 200k lines
+    python benchmarks/bench_bulk_add.py -n 50000 --workers 4
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.notes_app import add_note, bulk_add
+from corpus import make_corpus
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--notes", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    lines = [t for items in make_corpus(args.notes).values() for t in items]
+
+    notes, seen = {}, set()
+    t0 = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for line in lines:
+            add_note(notes, line, "import", seen)
+    one_by_one = time.perf_counter() - t0
+
+    bulk_notes, bulk_seen = {}, set()
+    t0 = time.perf_counter()
+    summary = bulk_add(bulk_notes, iter(lines), "import", bulk_seen, workers=args.workers)
+    bulk = time.perf_counter() - t0
+    assert bulk_notes == notes and bulk_seen == seen
+
+    print(f"{len(lines):,} lines -> {summary}")
+    print(f"add_note loop   {one_by_one:8.2f} s")
+    print(f"bulk_add        {bulk:8.2f} s   ({one_by_one / bulk:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Microbenchmark: normalizing on every check vs. `Note` records with a cached key.
+
+    python benchmarks/bench_normalize.py            # 1M notes
+    python benchmarks/bench_normalize.py -n 100000
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.notes_app import build_seen, find_note
+from app.utils import Note, normalize, trace
+
+WORDS = ("buy milk call mom send invoice fix bug walk dog pay rent book flight "
+         "review PR renew passport water plants TODO Budget-2025 meeting notes!!").split()
+
+
+def legacy_normalize(s: str) -> str:
+    """normalize() as it was: eager trace f-strings, uncompiled regex."""
+    trace(f"[enter normalize] {s!r}")
+    s = s.strip()
+    s = " ".join(s.split())
+    s = s.lower()
+    s = re.sub(r"[^a-z0-9]+", " ", s)
+    s = " ".join(s.split())
+    trace(f"[exit  normalize],{s!r}")
+    return s
+
+
+def make_texts(n: int, seed: int = 7) -> list[str]:
+    rnd = random.Random(seed)
+    return [f"{' '.join(rnd.choices(WORDS, k=rnd.randint(2, 8)))} #{i}" for i in range(n)]
+
+
+def timed(label: str, fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<44} {elapsed:8.3f}s")
+    return elapsed
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--notes", type=int, default=1_000_000)
+    parser.add_argument("--passes", type=int, default=3, help="dedup passes over the store")
+    args = parser.parse_args(argv)
+
+    texts = make_texts(args.notes)
+    raw = {"bench": texts}
+    print(f"{args.notes:,} notes, {args.passes} dedup passes\n")
+
+    def legacy_passes():
+        for _ in range(args.passes):
+            {legacy_normalize(n) for n in texts}
+
+    def raw_passes():
+        for _ in range(args.passes):
+            build_seen(raw)
+
+    base = timed("legacy normalize() on every pass", legacy_passes)
+    timed("normalize() on every pass (str notes)", raw_passes)
+
+    records = {}
+    timed("create Note records (normalize once)", lambda: records.update(bench=[Note(t) for t in texts]))
+
+    def note_passes():
+        for _ in range(args.passes):
+            build_seen(records)
+
+    cached = timed("build_seen() on Note records", note_passes)
+    print(f"\nspeedup per dedup pass vs legacy: {base / max(cached, 1e-9):.1f}x")
+
+    probe = texts[-1]
+    timed("find_note() worst case, str notes", find_note, raw, probe)
+    timed("find_note() worst case, Note records", find_note, records, probe)
+    timed("normalize() of one ad-hoc term x100k (memo)", lambda: [normalize("Budget-2025!!") for _ in range(100_000)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Memory benchmark: {category: [str, ...]} vs NotesStore on a synthetic corpus.
+
+    python benchmarks/bench_store.py            # 1M notes
+    python -m benchmarks.bench_store -n 100000
+"""
+from __future__ import annotations
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.store import NotesStore
+if __package__:   # python -m benchmarks.bench_store
+    from .bench_normalize import make_texts
+else:
+    from bench_normalize import make_texts
+
+
+def measure(build) -> tuple[object, int]:
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--notes", type=int, default=1_000_000)
+    parser.add_argument("--categories", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    texts = make_texts(args.notes)
+    cats = [f"cat{i}" for i in range(args.categories)]
+
+    def build_dict():
+        notes = {}
+        for i, text in enumerate(texts):
+            # a plain str per note, as load_notes_safe gives them
+            notes.setdefault(cats[i % len(cats)], []).append("".join(text))
+        return notes
+
+    notes, dict_bytes = measure(build_dict)
+    store, store_bytes = measure(lambda: NotesStore(notes))
+    assert store == notes
+
+    print(f"{args.notes:,} notes in {args.categories} categories")
+    print(f"dict of lists of str {dict_bytes / 1e6:10.1f} MB")
+    print(f"NotesStore           {store_bytes / 1e6:10.1f} MB")
+    print(f"saving               {100 * (1 - store_bytes / dict_bytes):10.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Synthetic notes corpus for the benchmarks.
+
+    python benchmarks/corpus.py -n 100000 -o /tmp/notes.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+from typing import Dict, List
+
+NotesDict = Dict[str, List[str]]
+
+WORDS = ("buy milk call mom send invoice fix bug walk dog pay rent book flight "
+         "review PR renew passport water plants TODO Budget-2025 meeting notes "
+         "dentist groceries deploy backup taxes gym laundry birthday gift email "
+         "report quarterly plan draft slides urgent later maybe café résumé").split()
+
+
+def make_corpus(n: int, categories: int = 20, min_words: int = 2, max_words: int = 12,
+                dup_ratio: float = 0.02, seed: int = 42) -> NotesDict:
+    """
+    Return {category: [notes...]} with `n` notes in total.
+
+    Note lengths are uniform in [min_words, max_words] words. `dup_ratio` of
+    the notes are near-copies (case/spacing/punctuation changes) of an earlier
+    note, so they collide under normalize() like real duplicates do.
+    """
+    rnd = random.Random(seed)
+    cats = [f"cat{i:03d}" for i in range(max(1, categories))]
+    notes: NotesDict = {cat: [] for cat in cats}
+    made: list[str] = []
+    for i in range(n):
+        if made and rnd.random() < dup_ratio:
+            base = rnd.choice(made)
+            text = rnd.choice((base.upper(), f"  {base}  ", base.replace(" ", "  ") + "!"))
+        else:
+            words = rnd.choices(WORDS, k=rnd.randint(min_words, max_words))
+            text = f"{' '.join(words)} {i}"
+            made.append(text)
+        notes[cats[rnd.randrange(len(cats))]].append(text)
+    return notes
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Write a synthetic notes.json")
+    parser.add_argument("-n", "--notes", type=int, default=100_000)
+    parser.add_argument("-c", "--categories", type=int, default=20)
+    parser.add_argument("--min-words", type=int, default=2)
+    parser.add_argument("--max-words", type=int, default=12)
+    parser.add_argument("--dup-ratio", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", default="notes.json")
+    args = parser.parse_args(argv)
+    notes = make_corpus(args.notes, args.categories, args.min_words, args.max_words,
+                        args.dup_ratio, args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(notes, f, ensure_ascii=False)
+    print(f"wrote {args.notes:,} notes in {len(notes)} categories to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Load test for the HTTP API (app/server.py): keep-alive clients hammering
+one server with a mix of reads and writes, reporting requests/s and latency.
+
+    python benchmarks/load_test.py                      # own server on a temp dir
+    python benchmarks/load_test.py -c 64 -d 10 --writes 0.5
+    python benchmarks/load_test.py --url http://127.0.0.1:8080   # a running server
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote, urlsplit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from corpus import make_corpus
+
+
+async def request(reader, writer, method: str, path: str, body: dict | None = None) -> int:
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.partition(b":")
+        if name.lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, deadline, write_ratio, words, counter, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random()
+    try:
+        while time.perf_counter() < deadline:
+            roll = rng.random()
+            if roll < write_ratio:
+                n = next(counter)
+                args = ("POST", "/notes", {"text": f"load test note {n} {rng.choice(words)}",
+                                           "category": f"load{n % 8}"})
+            elif roll < write_ratio + (1 - write_ratio) * 0.8:
+                args = ("GET", "/search?q=" + quote(rng.choice(words)))
+            else:
+                args = ("GET", "/stats")
+            t0 = time.perf_counter()
+            status = await request(reader, writer, *args)
+            latencies.append(time.perf_counter() - t0)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def start_server(notes: int) -> tuple[subprocess.Popen, int, str]:
+    """A server on a temp dir seeded with `notes` synthetic notes; (process, port, dir)."""
+    tmp = tempfile.mkdtemp(prefix="notes-load-")
+    with open(os.path.join(tmp, "notes.json"), "w", encoding="utf-8") as f:
+        json.dump(make_corpus(notes), f)
+    proc = subprocess.Popen([sys.executable, "-m", "app", "--file", os.path.join(tmp, "notes.d"),
+                             "serve", "--port", "0"],
+                            cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    line = ""
+    while "http://" not in line:          # "Serving ... on http://127.0.0.1:PORT/ ..."
+        line = proc.stdout.readline()
+        if not line:
+            raise SystemExit("server did not start")
+    port = int(line.split("http://", 1)[1].split("/", 1)[0].rsplit(":", 1)[1])
+    return proc, port, tmp
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-c", "--connections", type=int, default=32)
+    parser.add_argument("-d", "--duration", type=float, default=5.0, help="seconds")
+    parser.add_argument("--writes", type=float, default=0.2, help="fraction of requests that add a note")
+    parser.add_argument("-n", "--notes", type=int, default=20_000, help="notes to seed our own server with")
+    parser.add_argument("--url", help="test this server instead of starting one")
+    args = parser.parse_args(argv)
+
+    proc = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        proc, port, tmp = start_server(args.notes)
+        host = "127.0.0.1"
+        print(f"server: {args.notes} notes in {tmp}, port {port}")
+    words = ["milk", "invoice", "meeting", "report", "call", "dog", "project", "note"]
+    counter = iter(range(10**12))
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+
+    async def run():
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(client(host, port, deadline, args.writes, words, counter, latencies, statuses)
+                               for _ in range(args.connections)))
+
+    t0 = time.perf_counter()
+    try:
+        asyncio.run(run())
+    finally:
+        if proc is not None:
+            proc.terminate()              # SIGTERM: the server saves and exits
+            print(proc.communicate(timeout=60)[0].strip())
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(f"{len(latencies)} requests in {elapsed:.1f}s over {args.connections} connections "
+          f"({args.writes:.0%} writes): {len(latencies) / elapsed:,.0f} req/s")
+    print(f"latency ms: p50 {pct(0.50):.2f}  p90 {pct(0.90):.2f}  p99 {pct(0.99):.2f}  max {latencies[-1] * 1000:.2f}")
+    print("status:", dict(sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Benchmark every notes_app operation on synthetic corpora.
+
+    python benchmarks/run.py                              # 10k, 100k, 1M notes
+    python benchmarks/run.py --sizes 10k --ops add_note,search_notes
+    python benchmarks/run.py -o new.json --baseline old.json --fail
+
+Reports ops/s, p50/p99 latency and peak traced memory per (operation, size)
+and writes them as JSON so two runs can be compared.
+"""
+from __future__ import annotations
+import argparse
+import builtins
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.index import KeyIndex, SearchIndex
+from app.notes_app import (add_note, build_seen, delete_note, edit_note, find_note,
+                           load_notes, rename_category, save_notes, search_notes)
+from app.utils import load_notes_safe, normalize
+from corpus import WORDS, make_corpus
+
+
+def parse_size(s: str) -> int:
+    s = s.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(s[-1:], 1)
+    return int(float(s.rstrip("km")) * scale)
+
+
+@contextlib.contextmanager
+def quiet(replies=None):
+    """Silence the ops' prints and answer their input() prompts."""
+    real_input = builtins.input
+    if replies is not None:
+        builtins.input = lambda prompt="": next(replies)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        builtins.input = real_input
+#--------------------------------------------------------------------------------
+
+class Context:
+    """One corpus size: the files and structures the ops run against."""
+
+    def __init__(self, n: int, workdir: str, args):
+        self.n = n
+        self.rnd = random.Random(n)
+        self.notes = make_corpus(n, args.categories, args.min_words, args.max_words, args.dup_ratio)
+        self.texts = [t for items in self.notes.values() for t in items]
+        self.path = os.path.join(workdir, f"notes_{n}.json")
+        self.out = os.path.join(workdir, f"saved_{n}.json")
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.notes, f, ensure_ascii=False)
+        # structures built lazily: not every op needs them
+        self._seen = self._key_index = self._search_index = None
+        self.work = {cat: list(items) for cat, items in self.notes.items()}  # mutated by ops
+        self.counter = 0
+
+    @property
+    def seen(self):
+        if self._seen is None:
+            self._seen = build_seen(self.work)
+        return self._seen
+
+    @property
+    def key_index(self):
+        if self._key_index is None:
+            self._key_index = KeyIndex.build(self.notes)
+        return self._key_index
+
+    @property
+    def search_index(self):
+        if self._search_index is None:
+            self._search_index = SearchIndex.build(self.notes)
+        return self._search_index
+
+    def random_text(self) -> str:
+        return self.texts[self.rnd.randrange(len(self.texts))]
+
+    def random_location(self) -> tuple[str, int]:
+        cats = [c for c, items in self.work.items() if items]
+        cat = self.rnd.choice(cats)
+        return cat, self.rnd.randrange(len(self.work[cat])) + 1
+#--------------------------------------------------------------------------------
+# One function per op: called once per iteration with the size context.
+
+def op_load_notes(ctx):
+    load_notes(ctx.path)
+
+def op_load_notes_safe(ctx):
+    load_notes_safe(ctx.path)
+
+def op_save_notes(ctx):
+    save_notes(ctx.notes, ctx.out)
+
+def op_build_seen(ctx):
+    build_seen(ctx.notes)
+
+def op_normalize(ctx):
+    normalize(ctx.random_text())
+
+def op_find_note(ctx):
+    find_note(ctx.notes, ctx.random_text())
+
+def op_find_note_indexed(ctx):
+    find_note(ctx.notes, ctx.random_text(), ctx.key_index)
+
+def op_add_note(ctx):
+    ctx.counter += 1
+    with quiet():
+        add_note(ctx.work, f"bench note {ctx.counter}", ctx.rnd.choice(list(ctx.work)), ctx.seen)
+
+def op_delete_note(ctx):
+    cat, idx = ctx.random_location()
+    seen = ctx.seen
+    with quiet(iter(["y"])):
+        delete_note(ctx.work, cat, idx, seen)
+
+def op_search_notes(ctx):
+    with quiet():
+        search_notes(ctx.notes, ctx.rnd.choice(WORDS))
+
+def op_search_notes_indexed(ctx):
+    index = ctx.search_index
+    with quiet():
+        search_notes(ctx.notes, ctx.rnd.choice(WORDS), index)
+
+def op_edit_note(ctx):
+    cat, idx = ctx.random_location()
+    ctx.counter += 1
+    seen = ctx.seen
+    with quiet(iter([cat, str(idx), f"edited note {ctx.counter}", "y"])):
+        edit_note(ctx.work, seen)
+
+def op_rename_category(ctx):
+    old = next(iter(ctx.work))
+    with quiet():
+        rename_category(ctx.work, old, f"renamed{ctx.counter}")
+    ctx.counter += 1
+
+
+OPS = {name[3:]: fn for name, fn in globals().items() if name.startswith("op_")}
+#--------------------------------------------------------------------------------
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_op(fn, ctx, min_time: float, max_iters: int, memory: bool) -> dict:
+    fn(ctx)  # warm-up (also builds any lazy structure outside the timing)
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < max_iters and (not samples or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter()
+        fn(ctx)
+        samples.append(time.perf_counter() - t0)
+    result = {
+        "iterations": len(samples),
+        "ops_per_s": len(samples) / sum(samples) if sum(samples) else float("inf"),
+        "p50_ms": 1000 * percentile(samples, 0.50),
+        "p99_ms": 1000 * percentile(samples, 0.99),
+    }
+    if memory:
+        tracemalloc.start()
+        fn(ctx)
+        result["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return result
+
+
+def compare(results: list[dict], baseline_path: str, tolerance: float) -> list[str]:
+    """Print ops/s against a saved run; return the regressions."""
+    with open(baseline_path, encoding="utf-8") as f:
+        base = {(r["op"], r["size"]): r for r in json.load(f)["results"]}
+    regressions = []
+    print(f"\nvs baseline {baseline_path}:")
+    for r in results:
+        old = base.get((r["op"], r["size"]))
+        if old is None:
+            continue
+        ratio = r["ops_per_s"] / old["ops_per_s"] if old["ops_per_s"] else float("inf")
+        flag = ""
+        if ratio < 1 - tolerance:
+            flag = "  REGRESSION"
+            regressions.append(f"{r['op']}@{r['size']}")
+        print(f"  {r['op']:<22} {r['size']:>9,}  {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10k,100k,1M", help="comma-separated, e.g. 10k,1M")
+    parser.add_argument("--ops", default=",".join(OPS), help="comma-separated subset of: " + ", ".join(OPS))
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--min-words", type=int, default=2)
+    parser.add_argument("--max-words", type=int, default=12)
+    parser.add_argument("--dup-ratio", type=float, default=0.02)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per (op, size)")
+    parser.add_argument("--max-iters", type=int, default=10_000)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("-o", "--output", default="bench_output.json")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed ops/s drop vs baseline")
+    parser.add_argument("--fail", action="store_true", help="exit 1 on any regression")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    ops = [o.strip() for o in args.ops.split(",") if o.strip()]
+    unknown = [o for o in ops if o not in OPS]
+    if unknown:
+        parser.error(f"unknown op(s): {', '.join(unknown)}")
+
+    results = []
+    print(f"{'op':<22} {'size':>9} {'iters':>6} {'ops/s':>12} {'p50 ms':>10} {'p99 ms':>10} {'peak KB':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in sizes:
+            ctx = Context(n, workdir, args)
+            for op in ops:
+                r = {"op": op, "size": n, **run_op(OPS[op], ctx, args.min_time, args.max_iters, not args.no_memory)}
+                results.append(r)
+                print(f"{op:<22} {n:>9,} {r['iterations']:>6} {r['ops_per_s']:>12,.1f} "
+                      f"{r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} {r.get('peak_kb', 0):>10,.0f}")
+
+    report = {
+        "meta": {"date": datetime.now().isoformat(timespec="seconds"),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "args": vars(args)},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions and args.fail:
+            print("regressions: " + ", ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
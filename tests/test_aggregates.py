@@ -0,0 +1,57 @@
+import random
+
+from app import notes_app
+from app.aggregates import NoteStats
+from app.notes_app import (add_note, category_counts, category_note_lengths, category_token_counts, category_word_counts,
+                           delete_note, edit_note_text, move_note_to, rename_category, show_stats)
+
+
+def test_totals_follow_every_mutator():
+    rng = random.Random(3)
+    words = ["milk", "urgent", "call", "bread", "Mom", "tax"]
+    notes, seen = {}, set()
+    stats = NoteStats.build(notes)
+    assert category_word_counts(notes, "urgent", stats) == {}   # counted from now on by the hooks
+    for step in range(600):
+        cats = [c for c in notes if notes[c]]
+        roll = rng.random()
+        if roll < 0.5 or not cats:
+            text = " ".join(rng.choice(words) for _ in range(3)) + f" {step}"
+            add_note(notes, text, rng.choice("abc"), seen, hooks=stats)
+        elif roll < 0.7:
+            cat = rng.choice(cats)
+            delete_note(notes, cat, rng.randint(1, len(notes[cat])), seen, hooks=stats, ask=False)
+        elif roll < 0.85:
+            cat = rng.choice(cats)
+            move_note_to(notes, cat, rng.randint(1, len(notes[cat])), rng.choice("abc"), seen, hooks=stats)
+        elif roll < 0.95:
+            cat = rng.choice(cats)
+            edit_note_text(notes, cat, rng.randint(1, len(notes[cat])), f"urgent tax {step}", seen, hooks=stats)
+        else:
+            rename_category(notes, rng.choice(cats), rng.choice("abc"), hooks=stats)
+    assert stats.verify(notes) == []
+    assert category_counts(notes, stats) == category_counts(notes)
+    assert category_note_lengths(notes, stats) == category_note_lengths(notes)
+    for word in words:
+        assert category_token_counts(notes, word, stats) == category_token_counts(notes, word)
+    assert stats.substrings["urgent"] and category_word_counts(notes, "URGENT", stats) == category_word_counts(notes, "urgent")
+
+
+def test_token_counts_are_by_whole_word():
+    notes = {"work": ["send urgent email", "urgently needed"], "home": []}
+    stats = NoteStats.build(notes)
+    assert category_token_counts(notes, "Urgent", stats) == {"work": 1, "home": 0}
+    assert category_token_counts(notes, "urgent") == {"work": 1, "home": 0}
+    assert category_word_counts(notes, "urgent") == {"work": 2, "home": 0}   # substring scan
+
+
+def test_verify_mode_falls_back_to_the_scan(monkeypatch, capsys):
+    notes = {"work": ["a", "b"], "home": ["c"]}
+    stats = NoteStats.build(notes)
+    stats.counts["work"] = 7
+    assert stats.verify(notes) == ["work"]
+    monkeypatch.setattr(notes_app, "VERIFY_STATS", True)
+    show_stats(notes, stats)
+    out = capsys.readouterr().out
+    assert "[WARN] stats aggregates out of step" in out and "work: 2 note(s)" in out
+    assert stats.verify(notes) == []
@@ -0,0 +1,65 @@
+import time
+
+from app.autosave import Autosaver
+from app.hooks import HookList
+from app.journal import Journal
+from app.notes_app import add_note
+
+
+def wait_for(cond, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not cond() and time.monotonic() < end:
+        time.sleep(0.01)
+    return cond()
+
+
+def test_burst_of_changes_is_written_once():
+    writes = []
+    saver = Autosaver(lambda: "state", lambda data: writes.append(data) or True, debounce=0.05)
+    for _ in range(20):
+        saver.touch()
+    assert wait_for(lambda: not saver.dirty)
+    time.sleep(0.1)
+    assert writes == ["state"]
+    saver.close()
+    assert writes == ["state"]      # nothing new to flush
+
+
+def test_failed_write_keeps_state_dirty_and_retries():
+    results, fallbacks = [False, True], []
+    saver = Autosaver(lambda: "state", lambda data: results.pop(0), debounce=0.01,
+                      retry=0.05, fallback=lambda: fallbacks.append(1))
+    saver.touch()
+    assert wait_for(lambda: fallbacks)
+    assert saver.failures == 1
+    assert wait_for(lambda: not saver.dirty)
+    assert saver.close()
+
+
+def test_close_flushes_synchronously():
+    writes = []
+    saver = Autosaver(lambda: "state", lambda data: writes.append(data) or True, debounce=60)
+    saver.touch()
+    assert saver.dirty and not writes
+    assert saver.close()
+    assert writes == ["state"]
+
+
+def test_journal_checkpoints_survive_a_failed_snapshot_write(tmp_path, monkeypatch):
+    j = Journal(str(tmp_path / "notes.journal"), str(tmp_path / "notes.json"))
+    notes = j.open()
+    saver = Autosaver(j.checkpoint, j.write_checkpoint, debounce=60, fallback=j.sync)
+    hooks = HookList([j, saver])
+    with saver.lock:
+        add_note(notes, "buy milk", "home", set(), hooks=hooks)
+
+    monkeypatch.setattr("app.notes_app.save_notes", lambda notes, filename="": False)
+    assert not saver.flush() and saver.dirty
+    monkeypatch.undo()
+    assert saver.close() and not saver.dirty
+    j.close(compact=False)
+
+    reopened = Journal(str(tmp_path / "notes.journal"), str(tmp_path / "notes.json"))
+    assert reopened.open() == {"home": ["buy milk"]}
+    assert not (tmp_path / "notes.journal.old").exists()
+    reopened.close(compact=False)
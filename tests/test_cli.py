@@ -0,0 +1,65 @@
+import io
+import json
+
+from app.cli import main
+from app.notes_app import edit_note_text, move_note_to
+from app.utils import load_notes_safe
+
+
+def run(tmp_path, *argv, stdin=None, monkeypatch=None):
+    if stdin is not None:
+        monkeypatch.setattr("sys.stdin", io.StringIO(stdin))
+    return main(["--file", str(tmp_path / "notes.json"), *argv])
+
+
+def saved(tmp_path):
+    return load_notes_safe(str(tmp_path / "notes.json"))
+
+
+def test_add_batch_from_stdin_saves_once(tmp_path, monkeypatch, capsys):
+    saves = []
+    monkeypatch.setattr("app.notes_app.save_notes",
+                        lambda notes, filename="": saves.append(filename) or True)
+    lines = "work|send invoice\nhome|buy milk\nhome|BUY  milk\n\nwalk dog\n"
+    run(tmp_path, "add", "--split", stdin=lines, monkeypatch=monkeypatch)
+    assert "Added 3 note(s), skipped 1 duplicate(s) and 0 empty." in capsys.readouterr().out
+    assert len(saves) == 1
+
+
+def test_delete_and_move_positions_are_applied_last_first(tmp_path, monkeypatch):
+    run(tmp_path, "add", "a", "b", "c", "d", "-c", "x")
+    run(tmp_path, "delete", "x", "1", "3")
+    assert saved(tmp_path) == {"x": ["b", "d"]}
+    run(tmp_path, "move", "--from", "-", stdin="x|1|y\nx|2|y\n", monkeypatch=monkeypatch)
+    assert saved(tmp_path) == {"x": [], "y": ["d", "b"]}
+
+
+def test_import_skips_duplicates_and_export_writes_json(tmp_path, capsys):
+    other = tmp_path / "other.json"
+    other.write_text(json.dumps({"home": ["buy milk", "walk dog"]}), encoding="utf-8")
+    run(tmp_path, "add", "Buy milk", "-c", "home")
+    run(tmp_path, "import", str(other))
+    assert "Imported 1 note(s), skipped 1" in capsys.readouterr().out
+
+    run(tmp_path, "export", "-c", "home")
+    assert json.loads(capsys.readouterr().out) == {"home": ["Buy milk", "walk dog"]}
+
+
+def test_read_only_commands_do_not_rewrite_the_file(tmp_path, capsys):
+    run(tmp_path, "add", "buy milk")
+    before = (tmp_path / "notes.json").stat().st_mtime_ns
+    run(tmp_path, "search", "milk")
+    run(tmp_path, "stats")
+    assert "found in general: 1. buy [milk]" in capsys.readouterr().out
+    assert (tmp_path / "notes.json").stat().st_mtime_ns == before
+
+
+def test_non_interactive_move_and_edit_keep_guards(capsys):
+    notes = {"a": ["x", "y"], "b": ["X"]}
+    seen = {"x", "y"}
+    assert move_note_to(notes, "a", 1, "b", seen) is None          # duplicate in dest
+    assert move_note_to(notes, "a", 2, "c", seen) == "y"
+    assert notes == {"a": ["x"], "b": ["X"], "c": ["y"]}
+    assert not edit_note_text(notes, "a", 1, "Y", seen)            # exists elsewhere
+    assert edit_note_text(notes, "a", 1, "z", seen)
+    assert notes["a"] == ["z"] and "z" in seen and "x" not in seen
@@ -0,0 +1,57 @@
+import io
+import json
+
+import pytest
+
+from app.cli import main as cli
+from app.formats import READERS, WRITERS, guess_format, write_notes
+from app.utils import load_notes_safe
+
+
+NOTES = {
+    "work": ["send invoice, then call", 'say "hi"', "two\nlines", "a\n\nb", "trailing  ", "ends\n"],
+    "café": ["crème brûlée"],
+}
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv", "md"])
+def test_round_trip(fmt):
+    text = "".join(WRITERS[fmt](NOTES))
+    pairs = list(READERS[fmt](io.StringIO(text, newline="")))
+    assert pairs == [(cat, note) for cat, items in NOTES.items() for note in items]
+
+
+def test_markdown_leaves_out_notes_with_carriage_returns(capsys):
+    out = io.StringIO()
+    assert write_notes({"x": ["one\r\ntwo", "fine"]}, out, "md") == 1
+    assert list(READERS["md"](io.StringIO(out.getvalue(), newline=""))) == [("x", "fine")]
+    assert "carriage return" in capsys.readouterr().err
+
+
+def test_json_writer_matches_json_dump():
+    for notes in (NOTES, {}, {"empty": [], "x": ["a"]}):
+        assert "".join(WRITERS["json"](notes)) == json.dumps(notes, indent=2, ensure_ascii=False) + "\n"
+
+
+def test_writes_are_batched():
+    writes = []
+    out = io.StringIO()
+    out.write = writes.append
+    assert write_notes({"x": [f"note {i}" for i in range(10_000)]}, out, "jsonl") == 10_000
+    assert len(writes) == 3                      # 4096 lines per write
+
+
+def test_cli_export_and_import_by_extension(tmp_path, capsys):
+    path = str(tmp_path / "notes.d")
+    cli(["--file", path, "add", "buy milk", "call mom", "-c", "home"])
+    for ext in ("jsonl", "csv", "md"):
+        assert guess_format(f"out.{ext}") == ext
+        cli(["--file", path, "export", "-o", str(tmp_path / f"out.{ext}")])
+    capsys.readouterr()
+
+    other = str(tmp_path / "other.json")
+    (tmp_path / "in.csv").write_text("text,category\nBUY MILK,home\nwalk dog,\n", encoding="utf-8")
+    cli(["--file", other, "import", str(tmp_path / "out.md"), str(tmp_path / "in.csv")])
+    out = capsys.readouterr().out
+    assert "Imported 3 note(s), skipped 1 duplicate(s)" in out and "notes/s" in out
+    assert load_notes_safe(other) == {"home": ["buy milk", "call mom"], "general": ["walk dog"]}
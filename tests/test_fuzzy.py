@@ -0,0 +1,49 @@
+from app.fuzzy import bounded_distance, fuzzy_matches
+from app.index import TrigramIndex
+from app.notes_app import add_note, delete_note, edit_note_text, search_notes
+
+
+NOTES = {
+    "work": ["team meeting on monday", "send invoice", "meet the new intern"],
+    "home": ["buy milk", "meeting with the plumber", "call mom"],
+}
+
+
+def test_bounded_distance_gives_up_past_the_limit():
+    assert bounded_distance("metting", "meeting", 1) == 1
+    assert bounded_distance("kitten", "sitting", 3) == 3
+    assert bounded_distance("kitten", "sitting", 2) == 3      # limit + 1
+    assert bounded_distance("abc", "abcdef", 1) == 2
+
+
+def test_typos_are_ranked_by_distance():
+    index = TrigramIndex.build(NOTES)
+    matches = fuzzy_matches(NOTES, "metting", index)
+    assert [(d, cat, pos) for d, cat, pos, _ in matches] == [(1, "work", 0), (1, "home", 1)]
+    assert fuzzy_matches(NOTES, "invoce snd", index) == [(2, "work", 1, "send invoice")]
+    assert fuzzy_matches(NOTES, "metting", index, k=1)[0][3] == "team meeting on monday"
+    assert fuzzy_matches(NOTES, "xyzzy", index) == []
+
+
+def test_index_and_scan_agree():
+    index = TrigramIndex.build(NOTES)
+    for term in ["metting", "mom", "plumbr", "buy mlk", "the"]:
+        assert fuzzy_matches(NOTES, term, index) == fuzzy_matches(NOTES, term)
+
+
+def test_index_follows_mutations():
+    notes = {cat: list(items) for cat, items in NOTES.items()}
+    index = TrigramIndex.build(notes)
+    seen = {"x"}
+    add_note(notes, "dentist appointment", "home", seen, hooks=index)
+    delete_note(notes, "work", 1, seen, hooks=index, ask=False)
+    edit_note_text(notes, "home", 1, "buy oat milk", seen, hooks=index)
+    fresh = TrigramIndex.build(notes)
+    assert index.positions() == fresh.positions()
+    assert fuzzy_matches(notes, "dentst", index)[0][3] == "dentist appointment"
+
+
+def test_search_falls_back_to_closest_notes(capsys):
+    search_notes(NOTES, "plumbr", fuzzy=TrigramIndex.build(NOTES))
+    out = capsys.readouterr().out
+    assert "Closest notes" in out and "~1 home: 2. meeting with the plumber" in out
@@ -0,0 +1,95 @@
+import json
+import random
+
+from app.cli import main as cli
+from app.ids import NoteIds
+from app.journal import Journal
+from app.notes_app import add_note, delete_note, move_note_to, save_notes
+
+
+def test_ids_follow_positions_through_tombstones_and_compaction():
+    rng = random.Random(7)
+    ids, expected, handed = NoteIds(), {"a": [], "b": []}, set()
+    for _ in range(3000):
+        cat = rng.choice("ab")
+        other = "b" if cat == "a" else "a"
+        roll = rng.random()
+        if roll < 0.5 or not expected[cat]:
+            expected[cat].append(ids.insert(cat))
+            assert expected[cat][-1] not in handed      # never reused
+            handed.add(expected[cat][-1])
+        elif roll < 0.85:
+            pos = rng.randrange(len(expected[cat]))
+            assert ids.remove(cat, pos) == expected[cat].pop(pos)
+        else:
+            pos = rng.randrange(len(expected[cat]))
+            expected[other].append(ids.move(cat, pos, other))
+            assert expected[other][-1] == expected[cat].pop(pos)
+    for cat, order in expected.items():
+        assert ids.ids_of(cat) == order
+        assert all(ids.locate(nid) == (cat, i) and ids.id_at(cat, i) == nid for i, nid in enumerate(order))
+
+
+def test_deferred_categories_are_filled_when_first_needed():
+    notes = {"a": ["x", "y"], "b": ["z"]}
+    stored = {"a": [7, 3], "b": [5]}
+    asked = []
+    ids = NoteIds()
+    ids.reset(notes, lambda cat: asked.append(cat) or stored[cat], next_id=8, later={"b"}.__contains__)
+    assert asked == ["a"]
+    assert ids.ids_of("b") == [5] and asked == ["a", "b"]
+    ids.reset(notes, lambda cat: asked.append(cat) or stored[cat], next_id=8, later=lambda cat: True)
+    assert ids.locate(5) == ("b", 0)            # an unknown id fills them all
+    assert ids.insert("a") == 8 and ids.to_dict() == {"a": [7, 3, 8], "b": [5]}
+
+
+def open_journal(tmp_path, snapshot="notes.d"):
+    j = Journal(str(tmp_path / "notes.journal"), str(tmp_path / snapshot))
+    return j, j.open()
+
+
+def test_ids_are_logged_and_survive_compaction(tmp_path):
+    j, notes = open_journal(tmp_path)
+    seen = set()
+    for text in ["a", "b", "c"]:
+        add_note(notes, text, "x", seen, hooks=j)
+    delete_note(notes, "x", 1, seen, hooks=j, ask=False)
+    move_note_to(notes, "x", 1, "y", seen, hooks=j)
+    ops = [json.loads(line) for line in (tmp_path / "notes.journal").read_text().splitlines()]
+    assert [(op["op"], op["id"]) for op in ops] == [("add", 1), ("add", 2), ("add", 3), ("delete", 1), ("move", 2)]
+    j.close()                                   # compacts into the shards
+
+    j, notes = open_journal(tmp_path)
+    assert j.ids.to_dict() == {"x": [3], "y": [2]}
+    add_note(notes, "d", "x", seen, hooks=j)
+    assert j.ids.ids_of("x") == [3, 4]          # 1 is not handed out again
+    j.close(compact=False)
+
+
+def test_legacy_files_get_ids_in_note_order(tmp_path):
+    save_notes({"home": ["a", "b"], "work": ["c"]}, str(tmp_path / "notes.json"))
+    j, notes = open_journal(tmp_path, "notes.json")
+    assert j.ids.to_dict() == {"home": [1, 2], "work": [3]}
+    j.close()
+    data = json.loads((tmp_path / "notes.json").read_text())
+    assert data["ids"] == {"home": [1, 2], "work": [3]} and data["next_note_id"] == 4
+
+
+def test_sessions_never_hand_out_the_same_id(tmp_path):
+    a, notes_a = open_journal(tmp_path)
+    b, notes_b = open_journal(tmp_path)
+    add_note(notes_a, "from a", "x", set(), hooks=a)
+    add_note(notes_b, "from b", "x", set(), hooks=b)   # b catches up with a first
+    assert b.ids.to_dict() == {"x": [1, 2]}
+    a.close(compact=False)
+    b.close(compact=False)
+
+
+def test_cli_addresses_notes_by_id(tmp_path, capsys):
+    path = str(tmp_path / "notes.d")
+    cli(["--file", path, "add", "a", "b", "c", "-c", "x"])
+    cli(["--file", path, "delete", "#1", "#3"])
+    cli(["--file", path, "move", "#2", "--to", "y"])
+    capsys.readouterr()
+    cli(["--file", path, "show", "--ids"])
+    assert capsys.readouterr().out == "\nX:\n  (no notes)\n\nY:\n1. [#2] b\n"
@@ -0,0 +1,82 @@
+import json
+
+from app.journal import Journal
+from app.notes_app import add_note, delete_note, rename_category
+from app.utils import load_notes_safe
+
+
+def open_journal(tmp_path, **kw):
+    j = Journal(str(tmp_path / "notes.journal"), str(tmp_path / "notes.json"), **kw)
+    return j, j.open()
+
+
+def test_ops_are_replayed_without_snapshot(tmp_path, monkeypatch):
+    j, notes = open_journal(tmp_path)
+    seen = set()
+    add_note(notes, "buy milk", "home", seen, hooks=j)
+    add_note(notes, "walk dog", "home", seen, hooks=j)
+    monkeypatch.setattr("builtins.input", lambda prompt="": "y")
+    delete_note(notes, "home", 1, seen, hooks=j)
+    rename_category(notes, "home", "chores", hooks=j)
+    j.close(compact=False)
+
+    assert not (tmp_path / "notes.json").exists()
+    lines = (tmp_path / "notes.journal").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(l)["op"] for l in lines] == ["add", "add", "delete", "rename"]
+
+    _, reloaded = open_journal(tmp_path)
+    assert reloaded == {"chores": ["walk dog"]}
+
+
+def test_compaction_writes_snapshot_and_empties_journal(tmp_path):
+    j, notes = open_journal(tmp_path, compact_ops=3)
+    seen = set()
+    for text in ["a1", "a2", "a3", "a4"]:
+        add_note(notes, text, "x", seen, hooks=j)
+    j.close()
+
+    assert (tmp_path / "notes.journal").read_text(encoding="utf-8") == ""
+    assert not (tmp_path / "notes.journal.old").exists()
+    # the snapshot stays readable by the plain loader
+    assert load_notes_safe(str(tmp_path / "notes.json")) == {"x": ["a1", "a2", "a3", "a4"]}
+    _, reloaded = open_journal(tmp_path)
+    assert reloaded == {"x": ["a1", "a2", "a3", "a4"]}
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    (tmp_path / "notes.journal").write_text(
+        '{"seq": 1, "op": "add", "cat": "x", "text": "kept"}\n{"seq": 2, "op": "ad',
+        encoding="utf-8")
+    j, notes = open_journal(tmp_path)
+    assert notes == {"x": ["kept"]}
+    add_note(notes, "after crash", "x", set(), hooks=j)
+    j.close(compact=False)
+    _, reloaded = open_journal(tmp_path)
+    assert reloaded == {"x": ["kept", "after crash"]}
+
+
+def test_appends_and_other_sessions_go_on_during_a_snapshot_write(tmp_path, monkeypatch):
+    import threading
+    import app.notes_app
+    real_save, started, release = app.notes_app.save_notes, threading.Event(), threading.Event()
+
+    def slow_save(notes, filename=""):
+        started.set()
+        release.wait(5)
+        return real_save(notes, filename)
+    monkeypatch.setattr("app.notes_app.save_notes", slow_save)
+
+    a, notes_a = open_journal(tmp_path)
+    b, notes_b = open_journal(tmp_path)
+    add_note(notes_a, "before", "x", set(), hooks=a)
+    a.compact()                                   # the write blocks in slow_save
+    assert started.wait(5)
+    add_note(notes_a, "during a", "x", set(), hooks=a)    # neither waits for it
+    add_note(notes_b, "during b", "x", set(), hooks=b)
+    assert b.checkpoint() is None                 # a is compacting: b leaves it alone
+    release.set()
+    a.close(compact=False)
+    b.close(compact=False)
+    assert not (tmp_path / "notes.journal.old").exists()
+    _, reloaded = open_journal(tmp_path)
+    assert reloaded == {"x": ["before", "during a", "during b"]}
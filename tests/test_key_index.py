@@ -0,0 +1,112 @@
+import threading
+
+from app.hooks import LazyIndex
+from app.index import KeyIndex
+from app.notes_app import (add_note, check_seen, delete_note, edit_note, find_note,
+                           move_note, rename_category)
+
+
+def answers(monkeypatch, *replies):
+    it = iter(replies)
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(it))
+
+
+def test_key_index_is_a_refcounted_seen():
+    notes = {"home": ["Buy milk", "walk dog"], "work": ["buy   MILK!"]}
+    seen = KeyIndex.build(notes)
+    assert "buy milk" in seen
+    assert set(seen) == {"buy milk", "walk dog"}
+    assert seen.count("buy milk") == 2
+    assert seen.where("walk dog") == {("home", 1)}
+    assert check_seen(notes, seen) == []
+
+
+def test_lazy_index_is_built_on_first_use():
+    notes = {"home": ["buy milk"]}
+    seen = LazyIndex(KeyIndex, notes)
+    notes["home"].append("walk dog")
+    seen.added("home", 1, "walk dog")           # before the build: the build sees it
+    assert not seen.built and isinstance(seen, KeyIndex)
+    assert "walk dog" in seen and seen.where("buy milk") == {("home", 0)}
+    add_note(notes, "Walk Dog", "work", seen)   # duplicate, rejected
+    add_note(notes, "pay rent", "work", seen)
+    assert seen.built and check_seen(notes, seen) == []
+    seen.reloaded(notes)
+    assert not seen.built and seen.count("pay rent") == 1
+
+
+def test_find_note_lookup_matches_scan():
+    notes = {"home": ["walk dog"], "work": ["x", "Walk  Dog"]}
+    seen = KeyIndex.build(notes)
+    assert find_note(notes, "WALK dog", seen) == find_note(notes, "WALK dog") == ("home", 1)
+    assert find_note(notes, "nothing", seen) is None
+
+
+def test_mutators_keep_key_index_consistent(monkeypatch):
+    notes = {}
+    seen = KeyIndex.build(notes)   # empty to start with
+
+    add_note(notes, "buy milk", "home", seen)
+    add_note(notes, "walk dog", "home", seen)
+    add_note(notes, "pay rent", "work", seen)
+    add_note(notes, "Buy Milk", "work", seen)     # duplicate, rejected
+    assert check_seen(notes, seen) == []
+
+    answers(monkeypatch, "y")
+    delete_note(notes, "home", 1, seen)
+    assert "buy milk" not in seen
+    assert seen.where("walk dog") == {("home", 0)}
+
+    answers(monkeypatch, "home", "1", "work", "y")
+    move_note(notes, seen)
+    answers(monkeypatch, "work", "1", "pay the rent", "y")
+    edit_note(notes, seen)
+    rename_category(notes, "work", "general", hooks=seen)
+    assert check_seen(notes, seen) == []
+    assert seen.where("walk dog") == {("general", 1)}
+
+
+def test_check_seen_reports_drift():
+    notes = {"home": ["buy milk"]}
+    seen = KeyIndex.build(notes)
+    notes["home"].append("walk dog")   # mutated behind the index's back
+    assert check_seen(notes, seen)
+
+
+def test_move_and_edit_prompt_outside_the_lock(monkeypatch):
+    notes = {"home": ["walk dog"], "work": ["pay rent"]}
+    seen = KeyIndex.build(notes)
+    lock = threading.Lock()
+    replies = iter(["home", "1", "work", "y", "work", "2", "walk the dog", "y"])
+
+    def reply(prompt=""):
+        assert not lock.locked()
+        return next(replies)
+    monkeypatch.setattr("builtins.input", reply)
+    assert move_note(notes, seen, lock=lock) == "walk dog"
+    assert edit_note(notes, seen, lock=lock)
+    assert notes == {"home": [], "work": ["pay rent", "walk the dog"]} and check_seen(notes, seen) == []
+
+
+def test_changes_loaded_during_a_prompt_do_not_retarget_it(monkeypatch, capsys):
+    notes = {"home": ["buy milk", "walk dog", "call mom"]}
+    seen = KeyIndex.build(notes)
+    lock = threading.Lock()
+    replies = iter(["y", "y", "home", "2", "walk the dog", "y"])
+
+    def reply(prompt=""):
+        assert not lock.locked()
+        if prompt.startswith(("Are you sure", "Apply")):   # another session's delete is loaded meanwhile
+            del notes["home"][0]
+            seen.reloaded(notes)
+        return next(replies)
+    monkeypatch.setattr("builtins.input", reply)
+    assert delete_note(notes, "home", 3, seen, lock=lock) == "call mom"
+    assert notes == {"home": ["walk dog"]}
+    assert delete_note(notes, "home", 1, seen, lock=lock) is None   # "walk dog" went meanwhile
+    assert "changed meanwhile" in capsys.readouterr().out
+
+    notes["home"][:] = ["pay rent", "walk dog"]
+    seen.reloaded(notes)
+    assert edit_note(notes, seen, lock=lock)
+    assert notes == {"home": ["walk the dog"]} and check_seen(notes, seen) == []
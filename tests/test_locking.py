@@ -0,0 +1,106 @@
+import json
+import subprocess
+import sys
+import threading
+
+from app.index import KeyIndex
+from app.journal import Journal, snapshot_etag
+from app.locking import FileLock
+from app.notes_app import add_note, delete_note
+from app.shards import read_manifest
+
+
+def session(tmp_path, snapshot="notes.json"):
+    j = Journal(str(tmp_path / "notes.journal"), str(tmp_path / snapshot))
+    notes = j.open()
+    seen = KeyIndex.build(notes)
+    j.peers = seen
+    return j, notes, seen
+
+
+def test_second_session_merges_instead_of_overwriting(tmp_path):
+    a, notes_a, seen_a = session(tmp_path)
+    b, notes_b, seen_b = session(tmp_path)
+    add_note(notes_a, "buy milk", "home", seen_a, hooks=a)
+    add_note(notes_b, "send invoice", "work", seen_b, hooks=b)
+    assert notes_b == {"home": ["buy milk"], "work": ["send invoice"]}
+    assert "buy milk" in seen_b
+    a.close()
+    b.close()
+    _, reloaded, _ = session(tmp_path)
+    assert reloaded == {"home": ["buy milk"], "work": ["send invoice"]}
+
+
+def test_concurrent_duplicate_is_dropped(tmp_path, capsys):
+    a, notes_a, seen_a = session(tmp_path)
+    b, notes_b, seen_b = session(tmp_path)
+    add_note(notes_a, "buy milk", "home", seen_a, hooks=a)
+    add_note(notes_b, "Buy  MILK", "shopping", seen_b, hooks=b)
+    assert "was added by another session" in capsys.readouterr().out
+    assert notes_b["home"] == ["buy milk"] and not notes_b.get("shopping")
+    a.close(compact=False)
+    b.close(compact=False)
+    ops = (tmp_path / "notes.journal").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(l)["text"] for l in ops] == ["buy milk"]
+
+
+def test_stale_positions_are_found_again_by_text(tmp_path):
+    a, notes_a, seen_a = session(tmp_path)
+    for text in ["a", "b", "c"]:
+        add_note(notes_a, text, "x", seen_a, hooks=a)
+    b, notes_b, seen_b = session(tmp_path)
+    delete_note(notes_a, "x", 1, seen_a, hooks=a, ask=False)   # "a"
+    delete_note(notes_b, "x", 3, seen_b, hooks=b, ask=False)   # "c", now at position 2
+    assert notes_b == {"x": ["b"]}
+    a.close(compact=False)
+    b.close(compact=False)
+    assert session(tmp_path)[1] == {"x": ["b"]}
+
+
+def test_compaction_of_one_session_is_seen_by_the_other(tmp_path):
+    a, notes_a, seen_a = session(tmp_path, "notes.d")
+    b, notes_b, seen_b = session(tmp_path, "notes.d")
+    add_note(notes_a, "one", "x", seen_a, hooks=a)
+    a.compact(wait=True)
+    assert snapshot_etag(str(tmp_path / "notes.d")) == 1
+    add_note(notes_b, "two", "x", seen_b, hooks=b)
+    assert list(notes_b["x"]) == ["one", "two"]
+    b.close()
+    a.close()      # a's compaction reloads b's note before writing
+    assert read_manifest(str(tmp_path / "notes.d"))["etag"] == 3
+    assert list(session(tmp_path, "notes.d")[1]["x"]) == ["one", "two"]
+
+
+def test_readers_do_not_wait_for_a_writer(tmp_path):
+    a, notes_a, seen_a = session(tmp_path)
+    add_note(notes_a, "buy milk", "home", seen_a, hooks=a)
+    a.lock.acquire()                       # a writer holds the lock...
+    try:
+        other = FileLock(str(tmp_path / "notes.journal.lock"))
+        waiter = threading.Thread(target=other.acquire, daemon=True)
+        waiter.start()
+        waiter.join(0.2)
+        assert waiter.is_alive()           # ...other writers wait
+        reader = Journal(str(tmp_path / "notes.journal"), str(tmp_path / "notes.json"))
+        assert reader.open() == {"home": ["buy milk"]}   # readers do not
+        reader.close(compact=False)
+    finally:
+        a.lock.release()
+    waiter.join(5)
+    assert not waiter.is_alive()
+    other.release()
+    a.close()
+
+
+def test_parallel_batch_processes_lose_nothing(tmp_path):
+    procs = []
+    for name in ("p", "q"):
+        lines = "".join(f"{name} note {i}\n" for i in range(150))
+        (tmp_path / f"{name}.txt").write_text(lines, encoding="utf-8")
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "app", "--file", str(tmp_path / "notes.d"),
+             "add", "-c", name, "-i", str(tmp_path / f"{name}.txt")],
+            stdout=subprocess.DEVNULL))
+    assert [p.wait(60) for p in procs] == [0, 0]
+    _, notes, _ = session(tmp_path, "notes.d")
+    assert {cat: len(notes[cat]) for cat in notes} == {"p": 150, "q": 150}
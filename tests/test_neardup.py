@@ -0,0 +1,56 @@
+from app.cli import main as cli
+from app.neardup import NearDupIndex, find_clusters, jaccard, minhash, token_set
+from app.notes_app import add_note, delete_note
+
+
+NOTES = {
+    "home": ["buy milk tomorrow", "call mom", "water the plants"],
+    "work": ["send invoice to acme", "team meeting on monday"],
+}
+
+
+def test_signature_depends_on_the_word_set_only():
+    assert minhash(token_set("buy milk tomorrow")) == minhash(token_set("Tomorrow: buy MILK!"))
+    assert minhash(token_set("buy milk")) != minhash(token_set("buy bread"))
+    assert minhash(token_set("  ")) == []
+    assert jaccard(token_set("buy milk"), token_set("buy milk tomorrow")) == 2 / 3
+
+
+def test_add_note_warns_about_near_duplicates(capsys):
+    notes = {cat: list(items) for cat, items in NOTES.items()}
+    near = NearDupIndex.build(notes)
+    assert add_note(notes, "tomorrow buy milk", "todo", {"x"}, hooks=near, near=near)
+    out = capsys.readouterr().out
+    assert "Similar note(s)" in out and "100% home: 1. buy milk tomorrow" in out
+    assert add_note(notes, "plan the trip", "todo", {"x"}, hooks=near, near=near)
+    assert "Similar" not in capsys.readouterr().out
+    assert near.near(notes, "buy milk tomorrow") == [(1.0, "home", 0), (1.0, "todo", 0)]
+
+
+def test_index_follows_mutations():
+    notes = {cat: list(items) for cat, items in NOTES.items()}
+    near = NearDupIndex.build(notes)
+    delete_note(notes, "home", 1, {"x"}, hooks=near, ask=False)
+    assert near.positions() == NearDupIndex.build(notes).positions()
+    assert near.near(notes, "mom call") == [(1.0, "home", 0)]
+
+
+def test_clusters_group_reworded_notes():
+    notes = {cat: list(items) for cat, items in NOTES.items()}
+    notes["todo"] = ["Tomorrow, buy milk", "meeting monday team", "buy milk"]
+    assert find_clusters(notes) == [
+        [("home", 0), ("todo", 0), ("todo", 2)],
+        [("work", 1), ("todo", 1)],
+    ]
+    assert find_clusters(notes, threshold=0.9) == [[("home", 0), ("todo", 0)]]
+    assert find_clusters(NOTES) == []
+
+
+def test_cli_dupes_and_similar_add(tmp_path, capsys):
+    path = str(tmp_path / "notes.d")
+    cli(["--file", path, "add", "buy milk tomorrow", "call mom", "-c", "home"])
+    cli(["--file", path, "add", "--similar", "Tomorrow: buy milk!", "-c", "todo"])
+    assert "100% home: 1. buy milk tomorrow" in capsys.readouterr().out
+    cli(["--file", path, "dupes"])
+    out = capsys.readouterr().out
+    assert "1 group(s)" in out and "todo: 1. Tomorrow: buy milk!" in out
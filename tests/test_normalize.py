@@ -1,4 +1,5 @@
-from app.utils import normalize
+import json
+from app.utils import Note, normalize, normalize_many
 
 def test_variants_collapse_to_same():
     samples = ["To-do", " to do  ", "TO   DO!!"]
@@ -7,3 +8,23 @@ def test_variants_collapse_to_same():
 
 def test_numbers_and_text():
     assert normalize("Budget-2025!!  ") == "budget 2025"
+
+def test_note_carries_its_key():
+    n = Note("  TO   DO!! ")
+    assert n == "  TO   DO!! "
+    assert n.key == "to do"
+    assert normalize(n) == "to do"
+    assert json.dumps([n]) == json.dumps(["  TO   DO!! "])
+
+
+def test_note_key_is_computed_on_first_use():
+    n = Note("Buy MILK!")
+    assert n._key is None            # loading/listing never normalizes
+    assert n.key == "buy milk" and n._key == "buy milk"
+    assert Note("x", "given").key == "given"
+
+
+def test_normalize_many_matches_normalize():
+    texts = ["  Buy MILK!! ", "café résumé", "Straße ½ K", "", "a\x00b", "TODO:Budget-2025"]
+    assert normalize_many(texts) == [normalize(t) for t in texts]
+    assert normalize_many(texts[:4]) == [normalize(t) for t in texts[:4]]
@@ -0,0 +1,85 @@
+import io
+
+import pytest
+
+from app.cli import main as cli
+from app.notes_app import iter_grouped, search_notes, show_notes_grouped, show_numbered
+from app.paging import write_paged
+
+
+NOTES = {
+    "home": ["buy milk", "call mom", "milk the cow"],
+    "empty": [],
+    "work": ["send invoice", "order milk for the office"],
+}
+
+
+class Writes(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def write(self, s):
+        self.calls += 1
+        return super().write(s)
+
+
+def test_one_write_per_page_and_pause_can_stop():
+    out = Writes()
+    render = lambda page: "".join(f"{n}\n" for n in page)
+    assert write_paged(range(10), render, size=4, out=out) == 10
+    assert out.calls == 3 and out.getvalue().split() == [str(n) for n in range(10)]
+
+    out, asked = Writes(), []
+    pause = lambda: asked.append(1) or len(asked) < 2
+    assert write_paged(range(10), render, size=3, pause=pause, out=out) == 6
+    assert out.calls == 2 and len(asked) == 2
+
+
+def test_entries_are_formatted_only_when_shown():
+    formatted = []
+    render = lambda page: formatted.extend(page) or ""
+    write_paged(iter(range(1000)), render, offset=5, limit=3, out=Writes())
+    assert formatted == [5, 6, 7]
+
+
+def test_grouped_window_repeats_the_heading(capsys):
+    assert show_notes_grouped(NOTES, offset=2, limit=3) == 3
+    assert capsys.readouterr().out == "\nHOME:\n3. milk the cow\n\nEMPTY:\n  (no notes)\n\nWORK:\n1. send invoice\n"
+    assert list(iter_grouped(NOTES, 4)) == [("work", 0, "send invoice"), ("work", 1, "order milk for the office")]
+    assert show_notes_grouped(NOTES, offset=99) == 0
+
+
+def test_show_numbered_output_unchanged(capsys):
+    show_numbered(["a", "b"])
+    show_numbered([])
+    assert capsys.readouterr().out == "1. a\n2. b\n  (no notes)\n"
+
+
+def test_search_window(capsys):
+    search_notes(NOTES, "milk", offset=1, limit=1)
+    assert capsys.readouterr().out == "found in home: 3. [milk] the cow\n"
+    search_notes(NOTES, "milk", offset=3)
+    assert capsys.readouterr().out == "No results after the first 3.\n"
+
+
+def test_cli_show_and_search_take_limit_and_offset(tmp_path, capsys):
+    path = str(tmp_path / "notes.d")
+    cli(["--file", path, "add", "buy milk", "call mom", "milk the cow", "-c", "home"])
+    capsys.readouterr()
+    cli(["--file", path, "show", "--offset", "1", "--limit", "1"])
+    assert capsys.readouterr().out == "\nHOME:\n2. call mom\n"
+    cli(["--file", path, "search", "milk", "--limit", "1"])
+    assert capsys.readouterr().out == "found in home: 1. buy [milk]\n"
+
+
+def test_negative_windows_are_refused(tmp_path, capsys):
+    path = str(tmp_path / "notes.d")
+    for argv, why in ((["show", "--offset", "-1"], "must be 0 or more, not -1"),
+                      (["search", "milk", "--limit", "-1"], "must be 0 or more, not -1"),
+                      (["show", "--limit", "x"], "not a whole number: 'x'")):
+        with pytest.raises(SystemExit):
+            cli(["--file", path, *argv])
+        assert why in capsys.readouterr().err
+    with pytest.raises(ValueError):
+        next(iter_grouped(NOTES, -1))
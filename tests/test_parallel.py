@@ -0,0 +1,39 @@
+import re
+
+from app.notes_app import add_note, iter_matches, search_notes
+from app.parallel import ParallelSearch
+
+
+NOTES = {
+    "home": [f"buy milk {i}" if i % 7 == 0 else f"note {i}" for i in range(50)],
+    "empty": [],
+    "café": ["crème brûlée", "lait ou milk ?"],            # non-ASCII: decoded note by note
+    "work": [f"Milk order {i}" if i % 5 == 0 else f"task {i}" for i in range(23)],
+}
+
+
+def test_parallel_scan_matches_the_serial_one_in_order():
+    with ParallelSearch(workers=2, min_notes=10, chunk=4) as parallel:
+        assert list(iter_matches(NOTES, "milk", parallel=parallel)) == list(iter_matches(NOTES, "milk"))
+        pattern = re.compile(r"\b1\d\b")                 # any query, not just a substring
+        serial = [(c, p) for c, items in NOTES.items() for p, n in enumerate(items) if pattern.search(n)]
+        assert [(c, p) for c, p, _ in parallel.matches(NOTES, r"/\b1\d\b/")] == serial
+        assert [c for c, _, _ in parallel.matches(NOTES, "cat:work NOT milk")] == ["work"] * 18
+
+
+def test_mutations_refresh_the_snapshot(capsys):
+    notes = {cat: list(items) for cat, items in NOTES.items()}
+    with ParallelSearch(workers=2, min_notes=10, chunk=8) as parallel:
+        search_notes(notes, "milk", parallel=parallel)
+        first = parallel.version
+        add_note(notes, "oat milk", "home", set(), hooks=parallel)
+        capsys.readouterr()
+        search_notes(notes, "oat", parallel=parallel)
+        assert parallel.version == first + 1
+        assert capsys.readouterr().out == "found in home: 51. [oat] milk\n"
+
+
+def test_small_stores_stay_serial():
+    with ParallelSearch(workers=2) as parallel:
+        assert len(list(iter_matches(NOTES, "milk", parallel=parallel))) == 14
+        assert parallel.version == 0 and parallel._pool is None
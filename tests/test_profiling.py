@@ -0,0 +1,56 @@
+import json
+
+from app import profiling
+from app.profiling import span, traced
+
+
+def test_disabled_is_a_no_op(monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", False)
+    profiling.reset()
+
+    def f():
+        return 1
+    assert traced(f) is f
+    assert traced(name="x")(f) is f
+    with span("block"):
+        pass
+    assert profiling.stats() == {}
+
+
+def test_enabled_records_counts_times_and_histogram(monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    profiling.reset()
+
+    @traced(name="op")
+    def op(x):
+        if x < 0:
+            raise ValueError
+        return x * 2
+
+    assert op(2) == 4 and op.__name__ == "op"
+    try:
+        op(-1)
+    except ValueError:
+        pass
+    with span("block"):
+        pass
+
+    st = profiling.stats()
+    assert st["op"]["count"] == 2 and st["block"]["count"] == 1
+    assert sum(st["op"]["hist_us"].values()) == 2
+    assert 0 <= st["op"]["min_s"] <= st["op"]["mean_s"] <= st["op"]["max_s"]
+    profiling.reset()
+
+
+def test_dump_writes_stats_and_chrome_trace(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    monkeypatch.setattr(profiling, "PROFILE", str(tmp_path / "prof.json"))
+    profiling.reset()
+    with span("save"):
+        pass
+    profiling.dump(str(tmp_path / "prof.json"))
+    profiling.reset()
+
+    assert json.loads((tmp_path / "prof.json").read_text())["save"]["count"] == 1
+    events = json.loads((tmp_path / "prof.trace.json").read_text())["traceEvents"]
+    assert [(e["name"], e["ph"]) for e in events] == [("save", "X")]
@@ -0,0 +1,51 @@
+import pytest
+
+from app.index import SearchIndex
+from app.notes_app import iter_matches, search_notes
+from app.query import QueryError, compile_query
+
+
+NOTES = {
+    "work": ["send invoice 12", "invoice paid", "call bob (urgent)"],
+    "home": ["buy milk", "Invoice for the plumber", "buy  milk later"],
+}
+
+
+def found(query, index=None):
+    return [(cat, pos) for cat, pos, _ in iter_matches(NOTES, query, index)]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("invoice", [("work", 0), ("work", 1), ("home", 1)]),
+    ("invoice AND NOT paid", [("work", 0), ("home", 1)]),
+    ("cat:work invoice", [("work", 0), ("work", 1)]),
+    ('"buy milk" OR cat:work', [("work", 0), ("work", 1), ("work", 2), ("home", 0)]),
+    (r"/inv\w+\s+\d+/", [("work", 0)]),
+    ("NOT cat:home", [("work", 0), ("work", 1), ("work", 2)]),
+    ("buy milk", [("home", 0)]),                       # plain text: one phrase, as before
+    ("(milk OR bob) NOT later", [("work", 2), ("home", 0)]),
+])
+def test_queries_with_and_without_an_index(query, expected):
+    assert found(query) == expected
+    assert found(query, SearchIndex.build(NOTES)) == expected
+
+
+def test_cheap_predicates_run_first():
+    query = compile_query("/x/ AND cat:home AND milk")
+    node = query.for_category("home")                  # the filter is decided per category
+    assert query.for_category("work") is False
+    assert [type(c).__name__ for c in node.children] == ["_Text", "_Text"]
+    assert node.children[0].text == "milk"             # literal before regex
+
+
+@pytest.mark.parametrize("query", ["(milk", "milk AND", "/[/", "NOT", '""', ")"])
+def test_malformed_queries(query, capsys):
+    with pytest.raises(QueryError):
+        compile_query(query)
+    search_notes(NOTES, query)
+    assert capsys.readouterr().out.startswith("Bad query:")
+
+
+def test_highlights_only_the_wanted_terms(capsys):
+    search_notes(NOTES, "invoice NOT paid cat:work")
+    assert capsys.readouterr().out == "found in work: 1. send [invoice] 12\n"
@@ -0,0 +1,44 @@
+from app.cli import main as cli
+from app.index import SearchIndex
+from app.notes_app import add_note, delete_note
+from app.ranking import ranked_matches
+
+
+NOTES = {
+    "home": ["buy milk", "milk milk milk, the cow wants milking", "call mom about the milk bill and the rent and the car"],
+    "work": ["order milk for the office", "send the invoice"],
+}
+
+
+def test_rare_terms_weigh_more_and_ties_keep_note_order():
+    top = ranked_matches(NOTES, "the invoice")
+    assert top[0][1:3] == ("work", 1)                  # "invoice" is rarer than "the"
+    scores = [s for s, *_ in ranked_matches(NOTES, "milk")]
+    assert scores == sorted(scores, reverse=True)
+    ranked = [(c, p) for _, c, p, _ in ranked_matches(NOTES, "milk")]
+    assert ranked[0] == ("home", 1)                    # repeated, and in a short note
+    assert ranked.index(("home", 0)) < ranked.index(("home", 2))   # shorter note first
+
+
+def test_top_k_and_category_filter():
+    assert len(ranked_matches(NOTES, "milk", k=2)) == 2
+    assert [c for _, c, *_ in ranked_matches(NOTES, "milk", categories=["Work"])] == ["work"]
+    assert ranked_matches(NOTES, "zebra") == [] and ranked_matches(NOTES, "  ") == []
+
+
+def test_index_statistics_follow_the_mutators():
+    notes = {cat: list(items) for cat, items in NOTES.items()}
+    index = SearchIndex.build(notes)
+    add_note(notes, "milk and honey", "home", set(), hooks=index)
+    delete_note(notes, "work", 2, set(), hooks=index, ask=False)
+    fresh = SearchIndex.build(notes)
+    assert index.tokens == fresh.tokens
+    assert ranked_matches(notes, "milk honey", index) == ranked_matches(notes, "milk honey", fresh)
+
+
+def test_cli_rank(tmp_path, capsys):
+    path = str(tmp_path / "notes.d")
+    cli(["--file", path, "add", "buy milk", "send the invoice", "-c", "x"])
+    capsys.readouterr()
+    cli(["--file", path, "search", "invoice", "--rank"])
+    assert capsys.readouterr().out.split(": ", 1)[1] == "2. send the invoice\n"
@@ -0,0 +1,68 @@
+from app.index import SearchIndex
+from app.notes_app import add_note, delete_note, edit_note, move_note, rename_category, search_notes
+
+
+def answers(monkeypatch, *replies):
+    it = iter(replies)
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(it))
+
+
+def assert_in_sync(notes, index):
+    assert index.positions() == SearchIndex.build(notes).positions()
+
+
+def test_candidates_match_substrings_of_tokens():
+    notes = {"home": ["Buy milk", "walk dog"], "work": ["Send invoice #12"]}
+    index = SearchIndex.build(notes)
+    assert index.candidates("mil") == {("home", 0)}
+    assert index.candidates("invoice 12") == {("work", 0)}
+    assert index.candidates("milk dog") == set()
+    assert index.candidates("!!") is None
+
+
+def test_mutators_keep_index_in_sync(monkeypatch):
+    notes = {"home": ["buy milk", "walk dog", "call mom"]}
+    seen = {"buy milk", "walk dog", "call mom"}
+    index = SearchIndex.build(notes)
+
+    add_note(notes, "pay rent", "work", seen, hooks=index)
+    assert_in_sync(notes, index)
+
+    answers(monkeypatch, "y")
+    delete_note(notes, "home", 1, seen, hooks=index)
+    assert_in_sync(notes, index)
+
+    answers(monkeypatch, "home", "2", "work", "y")
+    move_note(notes, seen, hooks=index)
+    assert_in_sync(notes, index)
+
+    answers(monkeypatch, "work", "1", "pay the rent", "y")
+    edit_note(notes, seen, hooks=index)
+    assert_in_sync(notes, index)
+
+    rename_category(notes, "home", "work", hooks=index)
+    assert_in_sync(notes, index)
+    assert notes == {"work": ["pay the rent", "call mom", "walk dog"]}
+
+
+def test_indexed_search_prints_same_as_scan(capsys):
+    notes = {"home": ["Buy milk", "milkshake", "walk dog"], "work": ["milk run", "x"]}
+    search_notes(notes, "MILK")
+    scanned = capsys.readouterr().out
+    search_notes(notes, "MILK", SearchIndex.build(notes))
+    assert capsys.readouterr().out == scanned
+    assert "found in home: 2. [milk]shake" in scanned
+
+
+def test_delete_leaves_the_other_postings_alone():
+    notes = {"home": [f"note {i}" for i in range(100)]}
+    index = SearchIndex.build(notes)
+    last = index.postings["99"]
+    delete_note(notes, "home", 1, set(), hooks=index, ask=False)
+    assert index.postings["99"] is last and last == {("home", 99)}   # slot, untouched
+    assert index.candidates("99") == {("home", 98)}                 # position
+    for _ in range(60):   # past the tombstone limit: the category is compacted
+        delete_note(notes, "home", 1, set(), hooks=index, ask=False)
+    assert_in_sync(notes, index)
+    assert index.rows["home"].dead == 10   # compacted at 51 dead (to 49 live), 10 deleted since
+    assert index.candidates("note") == {("home", pos) for pos in range(39)}
@@ -1,7 +1,29 @@
 # tests/test_seen_integration.py
-from app.notes_app import build_seen
+from app.index import KeyIndex
+from app.notes_app import build_seen, bulk_add
 
 def test_build_seen_uses_normalize():
     notes = {"General": ["To-do", "TO   DO!!"], "Work": [" to do  "]}
     s = build_seen(notes)
     assert s == {"to do"}
+
+
+def test_bulk_add_dedupes_against_seen_and_within_batch():
+    notes = {"home": ["buy milk"]}
+    seen = KeyIndex.build(notes)
+    texts = iter(["Buy  milk!", "walk dog", "", "  ", "WALK DOG", "call mom"])
+    summary = bulk_add(notes, texts, "Home", seen, chunk_size=4)
+    assert summary == {"added": 2, "duplicates": 2, "empty": 2}
+    assert notes == {"home": ["buy milk", "walk dog", "call mom"]}
+    assert seen.where("call mom") == {("home", 2)}
+
+    assert bulk_add(notes, ["walk dog"], "empty", seen)["added"] == 0
+    assert "empty" not in notes   # category only created when something is added
+
+
+def test_bulk_add_process_pool_gives_same_result():
+    texts = [f"Note {i % 7}!" for i in range(20)]
+    serial, pooled = {}, {}
+    assert bulk_add(serial, texts, "x", set(), chunk_size=4) == \
+        bulk_add(pooled, texts, "x", set(), chunk_size=4, workers=2)
+    assert serial == pooled and len(serial["x"]) == 7
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import sqlite3
+import threading
+
+from app.journal import Journal
+from app.server import NotesServer
+
+
+async def call(port, method, path, body=None, raw=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = raw if raw is not None else json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def serve(tmp_path, scenario, storage="notes.d"):
+    async def run():
+        server = NotesServer(str(tmp_path / storage))
+        port = await server.start(port=0)
+        try:
+            return await scenario(port, server)
+        finally:
+            await server.close()
+    return asyncio.run(run())
+
+
+def test_crud_endpoints(tmp_path):
+    async def scenario(port, server):
+        assert await call(port, "POST", "/notes", {"text": "buy milk", "category": "Home"}) == (201, {"category": "home", "id": 1})
+        status, body = await call(port, "POST", "/notes", {"text": "BUY milk"})
+        assert status == 409 and "Duplicate" in body["error"]
+        await call(port, "POST", "/notes", {"text": "walk dog", "category": "home"})
+        assert (await call(port, "GET", "/search?q=milk"))[1] == [{"category": "home", "position": 1, "id": 1, "text": "buy milk"}]
+        assert (await call(port, "GET", "/search?q=mlk&fuzzy=1"))[1] == [
+            {"category": "home", "position": 1, "id": 1, "text": "buy milk", "distance": 1}]
+        assert (await call(port, "GET", "/search?q=milk+AND+NOT+cat%3Ahome"))[1] == []
+        assert (await call(port, "GET", "/search?q=%28milk"))[0] == 400
+        ranked = (await call(port, "GET", "/search?q=dog+milk&rank=1&k=1"))[1]
+        assert len(ranked) == 1 and ranked[0]["score"] > 0
+        assert (await call(port, "PUT", "/notes/home/2", {"text": "walk the dog"}))[0] == 200
+        assert (await call(port, "POST", "/notes/home/1/move", {"to": "shop"}))[1]["moved"] == "buy milk"
+        assert (await call(port, "POST", "/categories/shop/rename", {"to": "errands"}))[0] == 200
+        assert (await call(port, "DELETE", "/notes/home/9"))[0] == 409
+        assert (await call(port, "GET", "/stats"))[1] == {"home": 1, "errands": 1}
+        assert (await call(port, "GET", "/nope"))[0] == 404
+        assert (await call(port, "POST", "/notes", raw=b"{"))[0] == 400
+        assert (await call(port, "DELETE", "/notes/home/x"))[0] == 400
+    serve(tmp_path, scenario)
+    reopened = Journal(str(tmp_path / "notes.journal"), str(tmp_path / "notes.d"))
+    assert dict(reopened.open().items()) == {"home": ["walk the dog"], "errands": ["buy milk"]}
+    reopened.close(compact=False)
+
+
+def test_concurrent_writes_are_batched(tmp_path):
+    async def scenario(port, server):
+        results = await asyncio.gather(*(call(port, "POST", "/notes", {"text": f"note {i % 50}", "category": "x"})
+                                         for i in range(100)))
+        assert sorted(status for status, _ in results) == [201] * 50 + [409] * 50
+        assert server.batches < 100
+        return (await call(port, "GET", "/notes?category=x"))[1]["x"]
+    assert sorted(serve(tmp_path, scenario)) == sorted(f"note {i}" for i in range(50))
+
+
+def test_sqlite_backend(tmp_path):
+    async def scenario(port, server):
+        await call(port, "POST", "/notes", {"text": "buy milk", "category": "home"})
+        assert (await call(port, "POST", "/notes", {"text": "Buy Milk"}))[0] == 409
+        return (await call(port, "GET", "/search?q=milk"))[1]
+    assert serve(tmp_path, scenario, "notes.db") == [{"category": "home", "position": 1, "id": 1, "text": "buy milk"}]
+
+
+def test_reads_are_served_while_the_writer_waits_for_its_lock(tmp_path):
+    async def scenario(port, server):
+        holding, release = threading.Event(), threading.Event()
+
+        def checkpoint():   # the autosaver copying the notes under the lock
+            with server.autosave.lock:
+                holding.set()
+                release.wait(5)
+        worker = threading.Thread(target=checkpoint)
+        worker.start()
+        holding.wait(5)
+        write = asyncio.ensure_future(call(port, "POST", "/notes", {"text": "buy milk", "category": "home"}))
+        assert await asyncio.wait_for(call(port, "GET", "/notes"), 1) == (200, {})
+        assert not write.done()
+        release.set()
+        assert (await write)[0] == 201
+        worker.join()
+    serve(tmp_path, scenario)
+
+    async def sqlite_scenario(port, server):
+        other = sqlite3.connect(server.store.path, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")   # another process writing the database
+        write = asyncio.ensure_future(call(port, "POST", "/notes", {"text": "buy milk", "category": "home"}))
+        assert await asyncio.wait_for(call(port, "GET", "/stats"), 1) == (200, {})
+        assert not write.done()
+        other.execute("COMMIT")
+        other.close()
+        assert (await write)[0] == 201
+    serve(tmp_path, sqlite_scenario, "notes.db")
+
+
+def test_notes_addressed_by_id(tmp_path):
+    async def scenario(port, server):
+        for text in ("a", "b", "c"):
+            await call(port, "POST", "/notes", {"text": text, "category": "x"})
+        assert (await call(port, "DELETE", "/ids/1"))[1] == {"deleted": "a"}
+        assert (await call(port, "PUT", "/ids/3", {"text": "c2"}))[0] == 200   # now position 2
+        assert (await call(port, "POST", "/ids/2/move", {"to": "y"}))[1]["moved"] == "b"
+        assert (await call(port, "DELETE", "/ids/1"))[0] == 404
+        assert (await call(port, "DELETE", "/ids/zz"))[0] == 400
+        return (await call(port, "GET", "/notes"))[1]
+    assert serve(tmp_path, scenario) == {"x": ["c2"], "y": ["b"]}
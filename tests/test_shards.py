@@ -0,0 +1,159 @@
+import json
+import os
+
+from app import shards
+from app.journal import Journal
+from app.locking import SharedLock
+from app.notes_app import add_note, category_counts, delete_note, load_notes, rename_category, save_notes
+from app.shards import ShardedNotes, migrate_to_shards, read_manifest
+from app.store import NotesStore
+
+
+DATA = {"work": ["send invoice", "café ☕ at 10"], "home": ["buy milk"]}
+
+
+def files(path):
+    return {cat: e["file"] for cat, e in read_manifest(str(path))["shards"].items()}
+
+
+def test_save_rewrites_only_changed_categories(tmp_path):
+    path = str(tmp_path / "notes.d")
+    assert save_notes(DATA, path)
+    before = files(path)
+    changed = {"work": DATA["work"], "home": ["buy milk", "walk dog"]}
+    assert save_notes(changed, path)
+    after = files(path)
+    assert after["work"] == before["work"] and after["home"] != before["home"]
+    assert sorted(os.listdir(path)) == sorted([*after.values(), "manifest.json"])
+    notes, _ = load_notes(path)
+    assert dict(notes.items()) == changed
+
+
+def test_shards_load_on_demand(tmp_path):
+    path = str(tmp_path / "notes.d")
+    save_notes(DATA, path)
+    notes, seen = load_notes(path)
+    assert isinstance(notes, ShardedNotes)
+    assert category_counts(notes) == {"work": 2, "home": 1}
+    assert notes.loaded() == []
+
+    add_note(notes, "walk dog", "home", set())
+    assert notes.loaded() == ["home"]
+    work_file = files(path)["work"]
+    assert save_notes(notes, path)
+    assert files(path)["work"] == work_file
+    assert load_notes(path)[0]["home"] == ["buy milk", "walk dog"]
+
+
+def test_superseded_shards_outlive_their_readers(tmp_path):
+    path = str(tmp_path / "notes.d")
+    save_notes(DATA, path)
+    old = files(path)["home"]
+    reader, _ = load_notes(path)   # nothing read yet
+    changed = {**DATA, "home": ["walk dog"]}
+    assert save_notes(changed, path)   # e.g. another session's compaction
+    assert reader["home"] == ["buy milk"]   # still its own snapshot
+    assert old in os.listdir(path)
+    del reader
+
+    other = SharedLock(path + shards.READERS_LOCK)   # a session elsewhere has it open
+    save_notes(changed, path)
+    assert old in os.listdir(path)
+    other.close()
+    save_notes(changed, path)
+    assert sorted(os.listdir(path)) == sorted([*files(path).values(), "manifest.json"])
+
+
+def test_rename_is_a_manifest_update(tmp_path):
+    path = str(tmp_path / "notes.d")
+    save_notes(DATA, path)
+    notes, _ = load_notes(path)
+    work_file = files(path)["work"]
+    rename_category(notes, "work", "job")
+    assert notes.loaded() == []
+    save_notes(notes, path)
+    assert files(path) == {"job": work_file, "home": files(path)["home"]}
+
+
+def test_migrates_legacy_list_and_wrapped_files(tmp_path):
+    legacy = tmp_path / "legacy.json"
+    legacy.write_text(json.dumps(["one", "two"]), encoding="utf-8")
+    assert migrate_to_shards(str(legacy), str(tmp_path / "a.d"))
+    assert dict(load_notes(str(tmp_path / "a.d"))[0].items()) == {"general": ["one", "two"]}
+
+    wrapped = tmp_path / "wrapped.json"
+    wrapped.write_text(json.dumps({"notes": DATA, "journal_seq": 7}), encoding="utf-8")
+    assert migrate_to_shards(str(wrapped), str(tmp_path / "b.d"))
+    assert read_manifest(str(tmp_path / "b.d"))["journal_seq"] == 7
+
+
+def test_corrupt_shard_is_backed_up(tmp_path, capsys):
+    path = tmp_path / "notes.d"
+    save_notes(DATA, str(path))
+    (path / files(path)["home"]).write_text("[not json", encoding="utf-8")
+    notes, _ = load_notes(str(path))
+    assert notes["home"] == [] and notes["work"] == DATA["work"]
+    out = capsys.readouterr().out
+    assert "checksum" in out and "corrupt" in out
+    assert any(name.endswith("_corrupt.json") for name in os.listdir(path))
+
+
+def test_journal_compacts_into_shards(tmp_path):
+    j = Journal(str(tmp_path / "notes.journal"), str(tmp_path / "notes.d"))
+    notes = j.open()
+    add_note(notes, "buy milk", "home", set(), hooks=j)
+    j.close()
+    assert read_manifest(str(tmp_path / "notes.d"))["journal_seq"] == 1
+    j2 = Journal(str(tmp_path / "notes.journal"), str(tmp_path / "notes.d"))
+    assert dict(j2.open().items()) == {"home": ["buy milk"]}
+    j2.close(compact=False)
+
+
+def test_compaction_encodes_only_the_categories_ops_touched(tmp_path, monkeypatch):
+    path = str(tmp_path / "notes.d")
+    save_notes({**DATA, "misc": ["x"]}, path)
+    before = files(path)
+    j = Journal(str(tmp_path / "notes.journal"), path)
+    notes = j.open(into=NotesStore())
+    add_note(notes, "walk dog", "home", set(), hooks=j)
+    rename_category(notes, "misc", "other", hooks=j)
+    encoded = []
+    real = shards._encode
+    monkeypatch.setattr(shards, "_encode", lambda items, ids=None: encoded.append(list(items)) or real(items, ids))
+    j.close()
+
+    assert encoded == [["buy milk", "walk dog"]]
+    after = files(path)
+    assert after["work"] == before["work"] and after["other"] == before["misc"]
+    assert after["home"] != before["home"]
+    j = Journal(str(tmp_path / "notes.journal"), path)
+    assert dict(j.open().items()) == {"work": DATA["work"], "home": ["buy milk", "walk dog"], "other": ["x"]}
+    j.close(compact=False)
+
+
+def test_journal_reads_only_the_categories_used(tmp_path):
+    path = str(tmp_path / "notes.d")
+    j = Journal(str(tmp_path / "notes.journal"), path)
+    notes = j.open()
+    for text, cat in [("a", "work"), ("b", "home"), ("c", "misc"), ("d", "work")]:
+        add_note(notes, text, cat, set(), hooks=j)
+    j.close()                                   # shards written with their ids
+    before = files(path)
+
+    j = Journal(str(tmp_path / "notes.journal"), path)
+    notes = j.open(into=NotesStore())
+    assert isinstance(notes, ShardedNotes) and notes.loaded() == []
+    add_note(notes, "e", "home", set(), hooks=j)
+    assert notes.loaded() == ["home"]
+    delete_note(notes, "misc", 1, set(), hooks=j, ask=False)   # empties a category with deferred ids
+    ops = [json.loads(line) for line in (tmp_path / "notes.journal").read_text().splitlines()]
+    assert [(op["op"], op["id"]) for op in ops] == [("add", 5), ("delete", 3)]
+    j.close()                                   # the unread category is kept as it is
+    after = files(path)
+    assert after["work"] == before["work"] and "misc" not in after
+
+    j = Journal(str(tmp_path / "notes.journal"), path)
+    notes = j.open()
+    assert j.ids.to_dict() == {"work": [1, 4], "home": [2, 5]}
+    assert dict(notes.items()) == {"work": ["a", "d"], "home": ["b", "e"]}
+    j.close(compact=False)
@@ -0,0 +1,93 @@
+import json
+
+from app.journal import Journal, snapshot_etag
+from app.notes_app import LazySeen, add_note, category_counts, load_notes, show_stats
+from app.snapshot import (LazyNotes, is_snapshot, json_to_snapshot, load_snapshot,
+                          snapshot_to_json, write_snapshot)
+from app.utils import load_notes_safe
+
+
+DATA = {"work": ["send invoice", "café ☕ at 10"], "empty": [], "home": ["buy milk"]}
+
+
+def test_round_trip_through_json(tmp_path):
+    src, snap, back = tmp_path / "in.json", tmp_path / "notes.snap", tmp_path / "out.json"
+    src.write_text(json.dumps(DATA), encoding="utf-8")
+    json_to_snapshot(str(src), str(snap))
+    assert is_snapshot(str(snap)) and not is_snapshot(str(src))
+    assert snapshot_to_json(str(snap), str(back))
+    assert load_notes_safe(str(back)) == DATA
+
+
+def test_counts_do_not_decode_notes(tmp_path, capsys, monkeypatch):
+    path = str(tmp_path / "notes.snap")
+    write_snapshot(DATA, path)
+    notes = load_snapshot(path)
+    monkeypatch.setattr(LazyNotes, "_decode", lambda self, i: (_ for _ in ()).throw(AssertionError))
+    monkeypatch.setattr(LazyNotes, "__iter__", lambda self: (_ for _ in ()).throw(AssertionError))
+    assert category_counts(notes) == {"work": 2, "empty": 0, "home": 1}
+    show_stats(notes)
+    assert "Total: 3 note(s)" in capsys.readouterr().out
+
+
+def test_load_notes_opens_snapshot_lazily_and_copies_on_write(tmp_path):
+    path = str(tmp_path / "notes.snap")
+    write_snapshot(DATA, path)
+    notes, seen = load_notes(path)
+    assert isinstance(notes["work"], LazyNotes)
+    assert notes["work"][1] == "café ☕ at 10"
+    assert "buy milk" in seen
+
+    add_note(notes, "walk dog", "home", seen)
+    assert notes["home"] == ["buy milk", "walk dog"]
+    # the file itself is untouched until it is written again
+    assert load_snapshot(path)["home"] == ["buy milk"]
+
+
+def test_lazy_seen_works_with_set_operations():
+    seen = LazySeen({"home": ["buy milk"], "work": ["x y"]})
+    assert set(seen) == {"buy milk", "x y"}
+    other = set()
+    other.update(seen)
+    assert other == {"buy milk", "x y"}
+    assert {"x y"} <= seen and seen == {"buy milk", "x y"}
+
+
+def test_journal_compacts_into_a_binary_snapshot(tmp_path):
+    path, log = str(tmp_path / "notes.snap"), str(tmp_path / "notes.journal")
+    write_snapshot(DATA, path)
+    j = Journal(log, path)
+    notes = j.open()
+    assert isinstance(notes["work"], LazyNotes)
+    add_note(notes, "walk dog", "home", set(), hooks=j)
+    ids = j.ids.to_dict()
+    j.close()
+
+    assert is_snapshot(path) and snapshot_etag(path) == 1
+    assert (tmp_path / "notes.journal").read_text(encoding="utf-8") == ""
+    j = Journal(log, path)
+    assert j.open() == {**DATA, "home": ["buy milk", "walk dog"]}
+    assert j.ids.to_dict() == ids
+    j.close(compact=False)
+
+
+def test_migrating_to_a_snapshot_keeps_the_journal_position(tmp_path, monkeypatch, capsys):
+    from app.cli import main as cli
+    from app.notes_app import storage_path
+    monkeypatch.chdir(tmp_path)
+    assert storage_path() == "notes.d"
+    cli(["add", "alpha", "beta"])
+    j = Journal("notes.journal", "notes.d", compact_ops=1 << 30)
+    notes = j.open()
+    add_note(notes, "gamma", "General", set(), hooks=j)   # still only in the journal
+    j.close(compact=False)
+
+    assert cli(["migrate", "notes.snap"]) == 0
+    assert "use notes.snap from now on" in capsys.readouterr().out
+    assert storage_path() == "notes.snap"
+    j = Journal("notes.journal", "notes.snap")
+    assert list(j.open()["general"]) == ["alpha", "beta", "gamma"]
+    j.close(compact=False)
+    # the batch commands now default to the same snapshot as the menu app
+    cli(["add", "delta"])
+    assert list(load_snapshot("notes.snap")["general"]) == ["alpha", "beta", "gamma", "delta"]
@@ -0,0 +1,124 @@
+import sqlite3
+
+import pytest
+
+from app.cli import main as cli
+from app.notes_app import (add_note, delete_note, edit_note_text, load_notes, move_note_to,
+                           rename_category, save_notes, search_notes)
+from app.sqlite_store import SqliteStore, is_sqlite
+
+
+DATA = {"work": ["send invoice", "café ☕ at 10"], "home": ["buy milk", "walk dog"]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "notes.db")
+    assert save_notes(DATA, path) and is_sqlite(path)
+    s = SqliteStore(path)
+    yield s
+    s.close()
+
+
+def reload(store):
+    fresh = SqliteStore(store.path)
+    try:
+        return fresh.load()
+    finally:
+        fresh.close()
+
+
+def test_every_change_is_written_through(store):
+    notes = store.load()
+    add_note(notes, "call mom", "family", store, hooks=store)
+    delete_note(notes, "home", 1, store, hooks=store, ask=False)
+    edit_note_text(notes, "work", 1, "send invoices", store, hooks=store)
+    move_note_to(notes, "work", 2, "home", store, hooks=store)
+    rename_category(notes, "family", "home", hooks=store)
+    assert reload(store) == notes == {
+        "work": ["send invoices"], "home": ["walk dog", "café ☕ at 10", "call mom"]}
+
+
+def test_unique_key_index_acts_as_seen(store, capsys):
+    notes = store.load()
+    assert "buy milk" in store and len(store) == 4
+    add_note(notes, "BUY  milk!", "x", store, hooks=store)
+    assert "Duplicate" in capsys.readouterr().out
+    assert store.replace_all({"a": ["one", "ONE", "two"]}) == 1
+    assert reload(store) == {"a": ["one", "two"]}
+
+
+def test_fts_candidates_give_the_same_search_output(store, capsys):
+    notes = store.load()
+    for term in ["café", "MILK", "in", "voice", "nothing here", 'quote"s']:
+        search_notes(notes, term)
+        scan = capsys.readouterr().out
+        search_notes(notes, term, store)
+        assert capsys.readouterr().out == scan
+    assert store.candidates("in") is None      # below the trigram length
+
+
+def test_ids_are_not_reused_after_a_delete(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)   # a database from before AUTOINCREMENT
+    conn.executescript("CREATE TABLE categories (name TEXT PRIMARY KEY);"
+                       "CREATE TABLE notes (id INTEGER PRIMARY KEY, cat TEXT NOT NULL, "
+                       "ord INTEGER NOT NULL, text TEXT NOT NULL, key TEXT NOT NULL);"
+                       "INSERT INTO categories VALUES ('x');"
+                       "INSERT INTO notes VALUES (1, 'x', 1, 'a', 'a'), (2, 'x', 2, 'b', 'b');")
+    conn.close()
+    store = SqliteStore(path)
+    try:
+        notes = store.load()
+        assert store.ids.to_dict() == {"x": [1, 2]}
+        delete_note(notes, "x", 2, store, hooks=store, ask=False)
+        add_note(notes, "call mom", "x", store, hooks=store)
+        assert store.ids.to_dict() == {"x": [1, 3]}
+        assert store.candidates("mom") == {("x", 1)}
+    finally:
+        store.close()
+    fresh = SqliteStore(path)
+    try:
+        assert fresh.load() == {"x": ["a", "call mom"]} and fresh.ids.to_dict() == {"x": [1, 3]}
+    finally:
+        fresh.close()
+
+
+def test_batch_is_one_transaction(store):
+    notes = store.load()
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            add_note(notes, "first", "x", store, hooks=store)
+            raise RuntimeError
+    assert "first" not in reload(store).get("x", [])
+
+
+def test_a_refused_insert_leaves_memory_as_the_database(store, capsys):
+    notes = store.load()
+    ids = store.ids.to_dict()
+    with pytest.raises(sqlite3.IntegrityError):   # another process stored it since the check
+        add_note(notes, "buy milk", "new", set(), hooks=store)
+    assert "added elsewhere" in capsys.readouterr().out
+    assert notes == reload(store) == DATA and store.ids.to_dict() == ids
+
+
+def test_lock_holds_the_check_until_the_insert(store):
+    notes = store.load()
+    other = sqlite3.connect(store.path, timeout=0)
+    try:
+        with store.lock:
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                other.execute("INSERT INTO notes(cat, ord, text, key) VALUES ('x', 9, 'call mom', 'call mom')")
+            add_note(notes, "call mom", "x", store, hooks=store)
+        assert reload(store)["x"] == ["call mom"]
+    finally:
+        other.close()
+
+
+def test_cli_migrates_and_runs_on_the_database(tmp_path, capsys):
+    src, db = str(tmp_path / "notes.json"), str(tmp_path / "notes.db")
+    save_notes(DATA, src)
+    cli(["--file", src, "migrate", db])
+    cli(["--file", db, "add", "walk DOG", "water plants", "-c", "home"])
+    assert "Added 1 note(s), skipped 1 duplicate(s)" in capsys.readouterr().out
+    assert load_notes(db)[0]["home"] == ["buy milk", "walk dog", "water plants"]
@@ -0,0 +1,50 @@
+import json
+
+from app.notes_app import (add_note, build_seen, category_counts, delete_note,
+                           rename_category, save_notes, show_numbered)
+from app.store import NotesStore, PackedNotes
+from app.utils import Note, load_notes_safe
+
+
+def test_packed_notes_behave_like_a_list():
+    items = PackedNotes(["a", "bb", "ccc"])
+    items.insert(1, "é")
+    items[2] = "BBBB"
+    assert items.pop(0) == "a"
+    del items[-1]
+    items.append("z")
+    assert items == ["é", "BBBB", "z"]
+    assert len(items) == 3 and items[-1] == "z"
+
+
+def test_packed_notes_hold_text_only():
+    items = PackedNotes(["Buy Milk!", Note("café")])
+    items.insert(0, "Call MOM")
+    assert [type(n) for n in items] == [str, str, str]
+    assert items.nbytes() == len("Call MOMBuy Milk!café".encode("utf-8")) + 4 * 4   # u32 offsets
+    assert items.copy() == ["Call MOM", "Buy Milk!", "café"]
+
+
+def test_store_is_a_drop_in_for_the_dict(monkeypatch, capsys):
+    notes = NotesStore({"work": ["call client", "send email"], "home": []})
+    seen = build_seen(notes)
+    assert category_counts(notes) == {"work": 2, "home": 0}
+
+    add_note(notes, "buy milk", "home", seen)
+    add_note(notes, "walk dog", "garden", seen)
+    monkeypatch.setattr("builtins.input", lambda prompt="": "y")
+    assert delete_note(notes, "work", 1, seen) == "call client"
+    rename_category(notes, "garden", "home")
+    assert notes == {"work": ["send email"], "home": ["buy milk", "walk dog"]}
+    assert notes.category_id("work") == 0
+
+    show_numbered(notes["home"])
+    assert "2. walk dog" in capsys.readouterr().out
+
+
+def test_store_saves_as_plain_json(tmp_path):
+    notes = NotesStore({"work": ["send email"]})
+    path = str(tmp_path / "notes.json")
+    assert save_notes(notes, path)
+    assert json.loads(open(path, encoding="utf-8").read()) == {"work": ["send email"]}
+    assert load_notes_safe(path) == notes
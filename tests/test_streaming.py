@@ -0,0 +1,84 @@
+import io
+import json
+
+import pytest
+
+from app.notes_app import load_notes
+from app.streaming import iter_notes
+from app.utils import load_notes_safe
+
+
+def stream(doc, chunk_size=7):
+    meta = {}
+    pairs = list(iter_notes(io.StringIO(doc), meta=meta, chunk_size=chunk_size))
+    return pairs, meta
+
+
+def test_categories_stream_in_file_order_across_chunks():
+    data = {"work": ["send invoice", "call 12345", "quote \" and \\u00e9"], "empty": [], "home": ["x"]}
+    pairs, meta = stream(json.dumps(data, indent=2))
+    assert pairs == list(data.items())
+    assert meta["shape"] == "dict"
+
+
+def test_wrapped_form_and_legacy_list():
+    pairs, meta = stream(json.dumps({"seen": ["a"], "notes": {"w": ["A"]}, "journal_seq": 12}))
+    assert pairs == [("w", ["A"])]
+    assert meta["shape"] == "wrapped" and meta["seen"] == ["a"] and meta["journal_seq"] == 12
+
+    pairs, meta = stream(json.dumps(["one", 2]))
+    assert pairs == [("general", ["one", "2"])]
+    assert meta["shape"] == "list"
+
+
+@pytest.mark.parametrize("doc", ["{bad json", '{"a": ["x"]', '{"a": ["x"]} trailing', ""])
+def test_corrupt_input_raises_like_json_load(doc):
+    with pytest.raises(json.JSONDecodeError):
+        stream(doc)
+
+
+def test_loaders_report_categories_as_they_arrive(tmp_path):
+    p = tmp_path / "notes.json"
+    p.write_text(json.dumps({"Work": ["a"], "Home": ["b", "c"], "bad": "x"}), encoding="utf-8")
+    got = []
+    notes, seen = load_notes(str(p), on_category=lambda cat, items: got.append(cat))
+    assert got == ["work", "home", "bad"]
+    assert notes == {"work": ["a"], "home": ["b", "c"], "bad": ["x"]}
+    assert seen == {"a", "b", "c", "x"}
+
+    got.clear()
+    assert load_notes_safe(str(p), on_category=lambda cat, items: got.append(cat)) == {"Work": ["a"], "Home": ["b", "c"]}
+    assert got == ["Work", "Home"]
+
+
+class Reads(io.StringIO):
+    def __init__(self, doc):
+        super().__init__(doc)
+        self.calls = 0
+
+    def read(self, size=-1):
+        self.calls += 1
+        return super().read(size)
+
+
+def test_malformed_or_long_values_are_not_re_read_chunk_by_chunk():
+    bad = Reads('{"a": ["x", tru x' + " " * 100_000 + "]}")
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_notes(bad, chunk_size=16))
+    assert bad.calls <= 2
+
+    long = Reads(json.dumps({"a": ["y" * 100_000, "z"]}))
+    assert list(iter_notes(long, chunk_size=16)) == [("a", ["y" * 100_000, "z"])]
+    assert long.calls < 30
+
+
+def test_categories_decode_whole_or_note_by_note(monkeypatch, tmp_path):
+    data = {"a": [f"note {i}" for i in range(500)], "b": ["x", 1], "c": []}
+    doc = json.dumps(data)
+    fixed = {cat: [str(x) for x in items] for cat, items in data.items()}
+    assert list(iter_notes(io.StringIO(doc), chunk_size=64)) == list(fixed.items())
+    path = tmp_path / "notes.json"
+    path.write_text(doc, encoding="utf-8")
+    assert all(type(n) is str for items in load_notes_safe(str(path)).values() for n in items)
+    monkeypatch.setattr("app.streaming.MAX_WINDOW", 100)   # "a" no longer fits: element by element
+    assert list(iter_notes(io.StringIO(doc), chunk_size=64)) == list(fixed.items())